@@ -0,0 +1,257 @@
+"""Latency and throughput benchmarks for BlueskyHttpserverSession.
+
+By default the benchmarks run against an in-process FakeBlueskyHttpserver:
+
+    python benchmarks/bench_client.py --output bench_client.json
+
+Results are written as JSON, one record per benchmark case with latency
+percentiles in seconds and sustained calls per second.
+
+The benchmarks clear the queue and the history, only point --url at a
+server that is not in use.
+"""
+
+import argparse
+import concurrent.futures
+import datetime
+import json
+import platform
+import statistics
+import sys
+import time as ttime
+
+import exp_queueclient
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.fake_httpserver import FakeBlueskyHttpserver
+
+
+def latency_summary(latencies):
+    """Summarize a list of latencies in seconds."""
+    sorted_latencies = sorted(latencies)
+
+    def percentile(p):
+        index = min(
+            int(round(p / 100 * (len(sorted_latencies) - 1))), len(sorted_latencies) - 1
+        )
+        return sorted_latencies[index]
+
+    return {
+        "min": sorted_latencies[0],
+        "mean": statistics.mean(sorted_latencies),
+        "p50": percentile(50),
+        "p90": percentile(90),
+        "p99": percentile(99),
+        "max": sorted_latencies[-1],
+    }
+
+
+def run_case(call, calls, concurrency=1):
+    """Call call() calls times from concurrency threads, timing every call."""
+
+    def timed_call(_):
+        start_time = ttime.perf_counter()
+        call()
+        return ttime.perf_counter() - start_time
+
+    start_time = ttime.perf_counter()
+    if concurrency == 1:
+        latencies = [timed_call(i) for i in range(calls)]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(timed_call, range(calls)))
+    elapsed = ttime.perf_counter() - start_time
+
+    return {
+        "calls": calls,
+        "concurrency": concurrency,
+        "latency_s": latency_summary(latencies),
+        "calls_per_second": calls / elapsed,
+    }
+
+
+def _items(count):
+    return [
+        {
+            "name": "count",
+            "args": [["det1", "det2"]],
+            "kwargs": {"num": 10, "delay": 1},
+            "item_type": "plan",
+        }
+        for _ in range(count)
+    ]
+
+
+def bench_status(url, calls, concurrency_levels):
+    results = []
+    for concurrency in concurrency_levels:
+        session = BlueskyHttpserverSession(url, pool_maxsize=max(concurrency, 1))
+        session.status()
+        results.append(
+            {
+                "benchmark": "status",
+                "connection": "warm",
+                **run_case(session.status, calls, concurrency),
+            }
+        )
+        session.close()
+
+    # every call opens a new connection
+    session = BlueskyHttpserverSession(url, keep_alive=False)
+    results.append(
+        {"benchmark": "status", "connection": "cold", **run_case(session.status, calls)}
+    )
+    return results
+
+
+def bench_sized_reads(fake_httpserver, url, calls, sizes):
+    results = []
+    session = BlueskyHttpserverSession(url)
+    for size in sizes:
+        if fake_httpserver is not None:
+            with fake_httpserver.lock:
+                fake_httpserver.queue = [
+                    fake_httpserver._new_queue_item(item) for item in _items(size)
+                ]
+                fake_httpserver.history = [
+                    dict(
+                        history_item,
+                        result={"exit_status": "completed", "run_uids": [], "msg": ""},
+                    )
+                    for history_item in fake_httpserver.queue
+                ]
+        elif size:
+            # the queue and history of a live server are measured as they are
+            continue
+        else:
+            size = None
+        for benchmark, call in (
+            ("queue_get", session.queue_get),
+            ("history_get", session.history_get),
+        ):
+            results.append(
+                {
+                    "benchmark": benchmark,
+                    "connection": "warm",
+                    "size": size,
+                    **run_case(call, calls),
+                }
+            )
+    session.queue_clear()
+    session.history_clear()
+    return results
+
+
+def bench_queue_item_add(url, calls):
+    session = BlueskyHttpserverSession(url)
+    session.queue_clear()
+
+    def queue_item_add():
+        session.queue_item_add(
+            item_name="count", item_args=[["det1", "det2"]], item_kwargs={"num": 10}
+        )
+
+    results = [
+        {
+            "benchmark": "queue_item_add",
+            "connection": "warm",
+            **run_case(queue_item_add, calls),
+        }
+    ]
+    session.queue_clear()
+    return results
+
+
+def bench_environment_lifecycle(url, calls):
+    session = BlueskyHttpserverSession(url)
+
+    def environment_lifecycle():
+        session.environment_open()
+        session.wait_for_status(
+            {"worker_environment_exists": True, "manager_state": "idle"}, timeout=60
+        )
+        session.environment_close()
+        session.wait_for_status(
+            {"worker_environment_exists": False, "manager_state": "idle"}, timeout=60
+        )
+
+    return [
+        {
+            "benchmark": "environment_lifecycle",
+            "connection": "warm",
+            **run_case(environment_lifecycle, calls),
+        }
+    ]
+
+
+def run_benchmarks(
+    url=None,
+    calls=200,
+    sizes=(0, 100, 1000),
+    concurrency_levels=(1, 4, 16),
+    time_scale=0.01,
+):
+    """Run all benchmarks, against url or against a FakeBlueskyHttpserver if url is None."""
+    fake_httpserver = None
+    if url is None:
+        fake_httpserver = FakeBlueskyHttpserver(time_scale=time_scale).start()
+        url = fake_httpserver.url
+
+    try:
+        results = []
+        results.extend(bench_status(url, calls, concurrency_levels))
+        results.extend(
+            bench_sized_reads(fake_httpserver, url, max(calls // 10, 1), sizes)
+        )
+        results.extend(bench_queue_item_add(url, calls))
+        results.extend(bench_environment_lifecycle(url, max(calls // 100, 1)))
+    finally:
+        if fake_httpserver is not None:
+            fake_httpserver.stop()
+
+    return {
+        "metadata": {
+            "exp_queueclient_version": exp_queueclient.__version__,
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "server": "fake" if fake_httpserver is not None else url,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    argument_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    argument_parser.add_argument(
+        "--url", help="benchmark a live bluesky-httpserver instead of the fake"
+    )
+    argument_parser.add_argument(
+        "--calls", type=int, default=200, help="calls per benchmark case"
+    )
+    argument_parser.add_argument("--sizes", type=int, nargs="+", default=[0, 100, 1000])
+    argument_parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 4, 16]
+    )
+    argument_parser.add_argument(
+        "--time-scale", type=float, default=0.01, help="time scale of the fake server"
+    )
+    argument_parser.add_argument("--output", help="JSON output file, default is stdout")
+    args = argument_parser.parse_args(argv)
+
+    benchmark_results = run_benchmarks(
+        url=args.url,
+        calls=args.calls,
+        sizes=args.sizes,
+        concurrency_levels=args.concurrency,
+        time_scale=args.time_scale,
+    )
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(benchmark_results, output_file, indent=2)
+    else:
+        json.dump(benchmark_results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
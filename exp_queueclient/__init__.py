@@ -1,8 +1,37 @@
+import concurrent.futures
 import logging
+import threading
 import time as ttime
 
 import requests
+import urllib3
 
+from .aio import AsyncBlueskyHttpserverSession  # noqa: F401
+from .batch import BatchResult, iter_encoded_chunks
+from .cache import UidCache
+from .coalesce import SingleFlight
+from .codec import default_codec, json_request_kwargs
+from .console import ConsoleBuffer  # noqa: F401
+from .diskcache import DiskCache  # noqa: F401
+from .history import HistoryMirror  # noqa: F401
+from .metrics import SessionMetrics, body_size
+from .tracing import RequestTracer
+from .ratelimit import RateLimiter, RateLimitExceeded  # noqa: F401
+from .reconcile import plan_queue_edits
+from .responses import PlanHistory, PlanQueue, QueueStatus, memoize_json
+from .retry import (  # noqa: F401
+    CircuitBreaker,
+    CircuitOpenError,
+    RequestAttempts,
+    RetryBudget,
+    RetryPolicy,
+    replayable_body,
+    retry_after_seconds,
+)
+from .streaming import MultipartFileStream, iter_json_lines, iter_json_object_members
+from .validation import ItemValidationError, ItemValidator  # noqa: F401
+from .wait import StatusWaiter, WaitResult, poll_intervals  # noqa: F401
+from .watch import StatusChange, StatusWatcher  # noqa: F401
 
 from ._version import get_versions
 
@@ -10,18 +39,217 @@ __version__ = get_versions()["version"]
 del get_versions
 
 
+def _destination_json(pos_dest=None, before_uid=None, after_uid=None):
+    if before_uid is not None:
+        return {"before_uid": before_uid}
+    elif after_uid is not None:
+        return {"after_uid": after_uid}
+    else:
+        return {"pos_dest": "back" if pos_dest is None else pos_dest}
+
+
+# request failures that may succeed when retried
+_transient_request_exceptions = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+def _request_not_sent(ex):
+    """Return True if a request failed before any of it was sent."""
+    if isinstance(ex, requests.ConnectTimeout):
+        return True
+    reason = getattr(ex.args[0], "reason", None) if ex.args else None
+    # NewConnectionError, eg. connection refused, is a ConnectTimeoutError
+    return isinstance(reason, urllib3.exceptions.ConnectTimeoutError)
+
+
+def _prefetch(iterator, executor):
+    """Iterate over iterator, computing the next element in executor ahead of time."""
+    _end = object()
+    next_element = executor.submit(next, iterator, _end)
+    while True:
+        element = next_element.result()
+        if element is _end:
+            return
+        next_element = executor.submit(next, iterator, _end)
+        yield element
+
+
 class BlueskyHttpserverSession:
-    def __init__(self, bluesky_httpserver_url):
+    def __init__(
+        self,
+        bluesky_httpserver_url,
+        pool_connections=1,
+        pool_maxsize=10,
+        pool_block=False,
+        keep_alive=True,
+        use_cache=False,
+        cache_ttl=60.0,
+        trace_sample_every=1,
+        codec=None,
+        request_timeout=None,
+        retry_policy=None,
+        circuit_breaker=None,
+        rate_limiter=None,
+        coalesce_reads=False,
+        read_reuse_window=0.0,
+        validation_max_age=10.0,
+        disk_cache=None,
+    ):
         """
         Parameters
         ----------
         bluesky_httpserver_url: str
           URI specifying host and port, eg. "http://localhost:60610"
+        pool_connections: int
+          number of per-host connection pools to keep, one is enough for a single httpserver
+        pool_maxsize: int
+          maximum number of connections kept alive per host
+        pool_block: bool
+          if True block when all pool_maxsize connections are in use, otherwise open
+          an extra connection that is discarded after the request
+        keep_alive: bool
+          if False ask the server to close the connection after every request
+        use_cache: bool
+          if True queue_get() and history_get() responses are reused until the matching
+          uid in status() changes, their json() must not be modified
+        cache_ttl: float or None
+          seconds a cached response may be reused, None means until its uid changes
+        trace_sample_every: int
+          with DEBUG logging enabled log one request in trace_sample_every requests,
+          requests are not traced at all when DEBUG logging is disabled
+        codec: object, optional
+          JSON codec with dumps() returning bytes and loads(), used for json= request
+          bodies and response.json(), by default orjson if installed and json otherwise
+        request_timeout: float or tuple, optional
+          default requests timeout in seconds for connecting and for reading, None waits
+          indefinitely, a timeout keyword argument of a request takes precedence
+        retry_policy: RetryPolicy, optional
+          retry requests that failed transiently, see retry.RetryPolicy
+        circuit_breaker: CircuitBreaker, optional
+          fail fast while the server is down, see retry.CircuitBreaker
+        rate_limiter: RateLimiter, optional
+          limit the request rate, RateLimiter.for_url(url) shares a limiter between all
+          sessions of the process using the server, see ratelimit.RateLimiter
+        coalesce_reads: bool
+          if True concurrent identical GET requests from threads sharing the session are
+          sent once and share the response, whose json() must not be modified
+        read_reuse_window: float
+          with coalesce_reads, seconds a GET response is reused for identical requests,
+          any POST through the session ends the reuse
+        validation_max_age: float
+          seconds the allowed plans and devices used by validate=True are trusted before
+          their uids are checked again, see item_validator()
+        disk_cache: DiskCache, optional
+          keep the allowed plans and devices on disk so that other processes with the
+          same uids do not download them again in item_validator(), plans_allowed()
+          and devices_allowed(), see diskcache.DiskCache
         """
-        log = logging.getLogger(self.__class__.__name__)
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._tracer = RequestTracer(self._log, sample_every=trace_sample_every)
 
         self._bluesky_httpserver_url = bluesky_httpserver_url
-        log.debug("self.bluesky_httpserver_url: '%s'", self._bluesky_httpserver_url)
+        self._log.debug(
+            "self.bluesky_httpserver_url: '%s'", self._bluesky_httpserver_url
+        )
+
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._pool_block = pool_block
+        self._keep_alive = keep_alive
+        self._request_timeout = request_timeout
+        self._retry_policy = retry_policy
+        self._circuit_breaker = circuit_breaker
+        self._rate_limiter = rate_limiter
+        self._single_flight = (
+            SingleFlight(reuse_window=read_reuse_window) if coalesce_reads else None
+        )
+        # pool counters from connection pools discarded by close()
+        self._closed_pool_stats = {"requests": 0, "connections": 0}
+        self._http_session = self._new_http_session()
+
+        self.metrics = SessionMetrics()
+        self.codec = default_codec() if codec is None else codec
+
+        self._use_cache = use_cache
+        self._uid_cache = UidCache(ttl=cache_ttl)
+
+        self._validation_max_age = validation_max_age
+        # (ItemValidator, monotonic time its uids were last checked)
+        self._item_validator = None
+        self._disk_cache = disk_cache
+
+        # encodes the next chunk of queue_item_add_batch(pipeline=True), started on use
+        self._chunk_executor = None
+        self._chunk_executor_lock = threading.Lock()
+
+    def _new_http_session(self):
+        http_session = requests.Session()
+        http_adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self._pool_connections,
+            pool_maxsize=self._pool_maxsize,
+            pool_block=self._pool_block,
+        )
+        http_session.mount("http://", http_adapter)
+        http_session.mount("https://", http_adapter)
+        if not self._keep_alive:
+            http_session.headers["Connection"] = "close"
+        return http_session
+
+    def _connection_pools(self):
+        # both schemes are mounted on the same adapter
+        for http_adapter in set(self._http_session.adapters.values()):
+            connection_pools = http_adapter.poolmanager.pools
+            for connection_pool_key in connection_pools.keys():
+                yield connection_pools[connection_pool_key]
+
+    def pool_stats(self):
+        """Report connection pool counters for this session.
+
+        Returns
+        -------
+            dict with
+                "requests": number of requests sent
+                "connections": number of new connections opened
+                "hits": number of requests that reused a kept-alive connection
+                "misses": number of requests that had to open a new connection
+        """
+        pool_stats = dict(self._closed_pool_stats)
+        for connection_pool in self._connection_pools():
+            pool_stats["requests"] += connection_pool.num_requests
+            pool_stats["connections"] += connection_pool.num_connections
+        if self._keep_alive:
+            pool_stats["misses"] = pool_stats["connections"]
+        else:
+            # urllib3 reconnects closed connections in place without counting them
+            pool_stats["misses"] = pool_stats["requests"]
+        pool_stats["hits"] = max(pool_stats["requests"] - pool_stats["misses"], 0)
+        return pool_stats
+
+    def close(self):
+        """Close all pooled connections and stop the chunk encoding thread.
+
+        The session remains usable, new connections will be opened as needed.
+        """
+        for connection_pool in self._connection_pools():
+            self._closed_pool_stats["requests"] += connection_pool.num_requests
+            self._closed_pool_stats["connections"] += connection_pool.num_connections
+        self._http_session.close()
+        self._http_session = self._new_http_session()
+        with self._chunk_executor_lock:
+            chunk_executor, self._chunk_executor = self._chunk_executor, None
+        if chunk_executor is not None:
+            chunk_executor.shutdown(wait=True)
+
+    def _get_chunk_executor(self):
+        with self._chunk_executor_lock:
+            if self._chunk_executor is None:
+                self._chunk_executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="BlueskyHttpserverSession"
+                )
+            return self._chunk_executor
 
     def __enter__(self):
         # TODO: store the response in case someone wants to see it
@@ -34,43 +262,191 @@ class BlueskyHttpserverSession:
 
     def __exit__(self, *exc):
         # TODO: store the response in case someone wants to see it
-        self.environment_close()
-        # not so useful to check for failure since that means there is was open environment
+        try:
+            self.environment_close()
+            # not so useful to check for failure since that means there is was open environment
+        finally:
+            self.close()
         return False
 
     def httpserver_get(self, endpoint, **kwargs):
-        log = logging.getLogger(self.__class__.__name__)
-
-        endpoint_url = f"{self._bluesky_httpserver_url}/{endpoint}"
-        log.debug("GET url: '%s', kwargs: '%s'", endpoint_url, dict(kwargs))
-        endpoint_response = requests.get(url=endpoint_url, **kwargs)
-        log.debug(
-            "GET response: '%s', elapsed time: '%s's, ",
-            endpoint_response,
-            endpoint_response.elapsed,
+        if self._single_flight is None or kwargs.get("stream", False):
+            return self._httpserver_request("GET", endpoint, **kwargs)
+        request_key = (endpoint, repr(sorted(kwargs.items())))
+        return self._single_flight.call(
+            request_key, lambda: self._httpserver_request("GET", endpoint, **kwargs)
         )
-        return endpoint_response
 
     def httpserver_post(self, endpoint, **kwargs):
-        log = logging.getLogger(self.__class__.__name__)
+        try:
+            return self._httpserver_request("POST", endpoint, **kwargs)
+        finally:
+            if self._single_flight is not None:
+                # reads started before the post may not reflect it
+                self._single_flight.invalidate()
+
+    def _httpserver_request(self, method, endpoint, **kwargs):
+        retry_policy = self._retry_policy
+        circuit_breaker = self._circuit_breaker
+        if retry_policy is None and circuit_breaker is None:
+            if self._rate_limiter is not None:
+                self._rate_limiter.acquire(method, endpoint)
+            return self._httpserver_request_once(method, endpoint, **kwargs)
+
+        request_attempts = RequestAttempts(
+            method,
+            endpoint,
+            kwargs,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            metrics=self.metrics,
+            log=self._log,
+        )
+        while True:
+            if self._rate_limiter is not None:
+                self._rate_limiter.acquire(method, endpoint)
+            request_attempts.before_attempt()
+            try:
+                endpoint_response = self._httpserver_request_once(
+                    method, endpoint, **kwargs
+                )
+            except _transient_request_exceptions as ex:
+                retry_interval = request_attempts.failed(
+                    ex, request_sent=not _request_not_sent(ex)
+                )
+                if retry_interval is None:
+                    raise
+            except BaseException:
+                request_attempts.aborted()
+                raise
+            else:
+                retry_interval = request_attempts.responded(endpoint_response)
+                if retry_interval is None:
+                    return endpoint_response
+                endpoint_response.close()
+            ttime.sleep(retry_interval)
 
+    def _httpserver_request_once(self, method, endpoint, **kwargs):
         endpoint_url = f"{self._bluesky_httpserver_url}/{endpoint}"
-        log.debug("POST url: '%s', kwargs: '%s'", endpoint_url, dict(kwargs))
-        endpoint_response = requests.post(url=endpoint_url, **kwargs)
-        log.debug(
-            "POST response: '%s', elapsed time: '%s's, ",
-            endpoint_response,
-            endpoint_response.elapsed,
+        if self._request_timeout is not None:
+            kwargs.setdefault("timeout", self._request_timeout)
+        traced = self._tracer.sampled()
+        if traced:
+            self._tracer.trace_request(method, endpoint_url, kwargs)
+        start_time = ttime.perf_counter()
+        try:
+            endpoint_response = self._http_session.request(
+                method, url=endpoint_url, **json_request_kwargs(self.codec, kwargs)
+            )
+        except Exception as ex:
+            self.metrics.record_error(
+                method, endpoint, ttime.perf_counter() - start_time, ex
+            )
+            raise
+        elapsed = ttime.perf_counter() - start_time
+
+        if kwargs.get("stream", False):
+            # do not read a streamed response body just to measure it
+            response_bytes = int(endpoint_response.headers.get("Content-Length", 0))
+        else:
+            response_bytes = len(endpoint_response.content)
+            memoize_json(endpoint_response, self.codec)
+        self.metrics.record(
+            method,
+            endpoint,
+            elapsed,
+            request_bytes=body_size(endpoint_response.request.body),
+            response_bytes=response_bytes,
+            status_code=endpoint_response.status_code,
         )
+        if traced:
+            self._tracer.trace_response(method, endpoint_response, elapsed)
+        return endpoint_response
+
+    # status uids that change whenever the response of the endpoint changes
+    _status_uid_keys = {
+        "queue/get": "plan_queue_uid",
+        "history/get": "plan_history_uid",
+        "plans/allowed": "plans_allowed_uid",
+        "devices/allowed": "devices_allowed_uid",
+    }
+
+    @staticmethod
+    def _status_uid(status, status_uid_key):
+        if isinstance(status, QueueStatus):
+            return getattr(status, status_uid_key)
+        return status[status_uid_key]
+
+    def _httpserver_get_cached(self, endpoint, status=None):
+        """GET an endpoint, reusing the previous response if its status uid has not changed.
+
+        Parameters
+        ----------
+        endpoint: str
+            one of the endpoints in _status_uid_keys
+        status: dict or QueueStatus, optional
+            a recent status response JSON, if not specified self.status() is called
+        """
+        if not self._use_cache:
+            return self.httpserver_get(endpoint)
+
+        status_uid_key = self._status_uid_keys[endpoint]
+        if status is None:
+            status = self.status().json()
+        status_uid = self._status_uid(status, status_uid_key)
+
+        endpoint_response = self._uid_cache.get(endpoint, status_uid)
+        if endpoint_response is None:
+            endpoint_response = self.httpserver_get(endpoint)
+            if endpoint_response.status_code == 200:
+                # the response carries the uid of the state it describes which may
+                # be more recent than the status
+                response_uid = endpoint_response.json().get(status_uid_key, status_uid)
+                self._uid_cache.put(endpoint, response_uid, endpoint_response)
         return endpoint_response
 
-    def wait_for_status(self, target_status, max_status_checks=3):
+    def cache_stats(self):
+        """Report hits, misses and evictions of the status uid cache."""
+        return self._uid_cache.stats()
+
+    def cache_clear(self):
+        self._uid_cache.invalidate()
+
+    def rate_limit_stats(self):
+        """Report how often requests were throttled or rejected by the rate limiter."""
+        if self._rate_limiter is None:
+            return {}
+        return self._rate_limiter.stats()
+
+    def coalescing_stats(self):
+        """Report GET calls made, calls shared by concurrent callers and reused results."""
+        if self._single_flight is None:
+            return {"calls": 0, "shared": 0, "reused": 0}
+        return self._single_flight.stats()
+
+    def wait_for_status(
+        self,
+        target_status=None,
+        max_status_checks=None,
+        timeout=None,
+        predicate=None,
+        initial_interval=0.05,
+        max_interval=1.0,
+        log_interval=5.0,
+    ):
         """Wait for self.status() to match the specified target_status.
 
+        Status checks start initial_interval seconds apart and back off exponentially,
+        with jitter, to max_interval seconds apart.
+
         Parameters
         ----------
-        target_status:
-            subset of status response JSON:
+        target_status: dict, optional
+            subset of status response JSON, nested keys may be given as dotted strings
+            like "plan_queue_mode.loop" or tuples, and values may be callables taking the
+            status value and returning a bool, for example
+            {"running_item_uid": lambda running_item_uid: running_item_uid is not None}
+            The full status response JSON looks like this:
                 (qserver) vagrant@vagrant:~$ qserver status
                 Arguments: ['status']
                 20:05:16 - MESSAGE:
@@ -89,30 +465,51 @@ class BlueskyHttpserverSession:
                  'run_list_uid': '1d70095c-853a-4a3d-84ed-8b3cbb215824',
                  'running_item_uid': None,
                  'worker_environment_exists': True}
-        max_status_checks:
-            positive integer number of status checks with 1s sleep between checks
+        max_status_checks: int, optional
+            give up after this many status checks
+        timeout: float, optional
+            give up after this many seconds, if neither timeout nor max_status_checks
+            is specified the timeout is 3 seconds
+        predicate: callable, optional
+            takes the status response JSON and returns True if the wait is over
+        initial_interval: float
+            seconds between the first and second status checks
+        max_interval: float
+            maximum seconds between status checks
+        log_interval: float or None
+            log status mismatches at INFO level at most once per log_interval seconds,
+            None disables logging
 
         Returns
         -------
-            True if the target status has been achieved, False otherwise
+            WaitResult, truthy if the target status has been achieved, with the last
+            status response JSON as the status attribute
         """
-        for _ in range(max_status_checks):
+        status_waiter = StatusWaiter(
+            target_status=target_status,
+            predicate=predicate,
+            timeout=timeout,
+            max_status_checks=max_status_checks,
+            initial_interval=initial_interval,
+            max_interval=max_interval,
+            log_interval=log_interval,
+            log=self._log,
+        )
+        while True:
             status_response = self.status()
-            status_json = status_response.json()
+            delay = status_waiter.check(status_response.json())
+            if delay is None:
+                return status_waiter.result
+            ttime.sleep(delay)
 
-            if all(
-                [
-                    status_json[target_status_key] == target_status_value
-                    for target_status_key, target_status_value in target_status.items()
-                ]
-            ):
-                return True
-            else:
-                print(f"status:\n{status_json}")
-                print(f"does not match target status:\n{target_status}")
-                ttime.sleep(1)
+    def status_watcher(self, interval=1.0):
+        """Return the StatusWatcher shared by all sessions of the process using the server.
 
-        return False
+        Subscribers of the watcher are told about status changes and wait_for() waits
+        for a status, all from a single status polling thread, see watch.StatusWatcher.
+        The interval is ignored if the watcher already exists.
+        """
+        return StatusWatcher.for_session(self, interval=interval)
 
     def environment_open(self):
         """Open a qserver environment.
@@ -137,15 +534,31 @@ class BlueskyHttpserverSession:
     def environment_destroy(self):
         return self.httpserver_post(endpoint="environment/destroy")
 
-    def status(self):
-        return self.httpserver_get("status")
+    def status(self, typed=False):
+        """Get the status, as a QueueStatus if typed is True."""
+        status_response = self.httpserver_get("status")
+        if typed:
+            return QueueStatus.from_response(status_response)
+        return status_response
 
     def queue_mode_set(self, queue_mode_key, queue_mode_value):
         queue_mode_json = {"mode": {queue_mode_key: queue_mode_value}}
         return self.httpserver_post("queue/mode/set", json=queue_mode_json)
 
-    def queue_get(self):
-        return self.httpserver_get("queue/get")
+    def queue_get(self, status=None, typed=False):
+        """Get the plan queue.
+
+        Parameters
+        ----------
+        status: dict or QueueStatus, optional
+            a recent status used to validate a cached queue
+        typed: bool
+            return a PlanQueue instead of the response
+        """
+        queue_response = self._httpserver_get_cached("queue/get", status=status)
+        if typed:
+            return PlanQueue.from_response(queue_response)
+        return queue_response
 
     def queue_clear(self):
         return self.httpserver_post("queue/clear")
@@ -160,8 +573,19 @@ class BlueskyHttpserverSession:
         return self.httpserver_post("queue/stop/cancel")
 
     def queue_item_add(
-        self, item_name, item_args=None, item_kwargs=None, item_type="plan"
+        self,
+        item_name,
+        item_args=None,
+        item_kwargs=None,
+        item_type="plan",
+        validate=False,
     ):
+        """Add an item to the back of the queue.
+
+        With validate=True the item is checked against the allowed plans and devices
+        first, see item_validator(), and ItemValidationError is raised instead of
+        sending an invalid item.
+        """
         if item_args is None:
             item_args = []
 
@@ -176,6 +600,8 @@ class BlueskyHttpserverSession:
                 "item_type": item_type,
             }
         }
+        if validate:
+            self.item_validator().check(item_json["item"])
         return self.httpserver_post("queue/item/add", json=item_json)
 
     def queue_item_execute(self, item_name, item_args, item_type):
@@ -184,50 +610,308 @@ class BlueskyHttpserverSession:
         }
         return self.httpserver_post("queue/item/execute", json=item_json)
 
-    def queue_item_add_batch(self):
-        raise NotImplementedError()
+    def queue_item_add_batch(
+        self,
+        items,
+        pos=None,
+        before_uid=None,
+        after_uid=None,
+        max_chunk_items=500,
+        max_chunk_bytes=1024 * 1024,
+        pipeline=False,
+        validate=False,
+    ):
+        """Add many items to the queue with as few requests as possible.
 
-    def queue_upload_spreadsheet(self):
-        raise NotImplementedError()
+        Items are sent in chunks of at most max_chunk_items items and max_chunk_bytes
+        bytes of JSON. Chunks are submitted one after the other so the items are queued
+        in order, and the RE Manager accepts or rejects each chunk as a whole. If a chunk
+        is rejected the following chunks are not submitted.
+
+        Parameters
+        ----------
+        items: list of dict
+            items like {"name": "count", "args": [["det1"]], "kwargs": {"num": 3}},
+            "args" and "kwargs" default to empty and "item_type" defaults to "plan"
+        pos: int or str, optional
+            queue position of the first item, for example "front", "back" or an index
+        before_uid, after_uid: str, optional
+            uid of the queue item the batch is inserted before or after
+        max_chunk_items: int
+            maximum number of items per request
+        max_chunk_bytes: int
+            maximum size of the encoded items per request
+        pipeline: bool
+            if True encode the next chunk in a background thread of the session while
+            the previous chunk is being submitted, the thread is stopped by close()
+        validate: bool
+            if True check the items against the allowed plans and devices first, see
+            item_validator(), and submit nothing if any item is invalid
+
+        Returns
+        -------
+            BatchResult with one result per item
+        """
+        items = (
+            {"args": [], "kwargs": {}, "item_type": "plan", **item} for item in items
+        )
+        if validate:
+            items = list(items)
+            item_errors = self.item_validator().validate_items(items)
+            if any(item_errors):
+                batch_result = BatchResult()
+                batch_result.add_invalid(item_errors)
+                return batch_result
+
+        encoded_chunks = iter_encoded_chunks(
+            items,
+            max_chunk_items=max_chunk_items,
+            max_chunk_bytes=max_chunk_bytes,
+            dumps=self.codec.dumps,
+        )
+        if pipeline:
+            encoded_chunks = _prefetch(encoded_chunks, self._get_chunk_executor())
+
+        position_json = {}
+        if pos is not None:
+            position_json["pos"] = pos
+        elif before_uid is not None:
+            position_json["before_uid"] = before_uid
+        elif after_uid is not None:
+            position_json["after_uid"] = after_uid
+
+        batch_result = BatchResult()
+        for chunk_item_count, encoded_chunk_items in encoded_chunks:
+            if batch_result.responses and not batch_result.success:
+                batch_result.add_skipped(
+                    chunk_item_count, "not submitted, a previous chunk was rejected"
+                )
+                continue
+
+            position_bytes = b"".join(
+                b',"%s":%s' % (position_key.encode(), self.codec.dumps(position))
+                for position_key, position in position_json.items()
+            )
+            queue_item_add_batch_response = self.httpserver_post(
+                "queue/item/add/batch",
+                json=b'{"items":[%s]%s}' % (encoded_chunk_items, position_bytes),
+            )
+            item_count = len(batch_result.items)
+            chunk_accepted = batch_result.add_response(
+                queue_item_add_batch_response, chunk_item_count
+            )
+
+            if (
+                chunk_accepted
+                and position_json
+                and len(batch_result.items) > item_count
+            ):
+                # the next chunk goes right after the last item of this chunk
+                position_json = {"after_uid": batch_result.items[-1]["item_uid"]}
+
+        return batch_result
+
+    def queue_upload_spreadsheet(
+        self,
+        spreadsheet_path,
+        data_type=None,
+        progress_callback=None,
+        chunk_size=64 * 1024,
+    ):
+        """Upload a spreadsheet of plans to be added to the queue.
+
+        The spreadsheet is streamed from disk and the response is parsed as it arrives,
+        neither is held in memory as a whole.
+
+        Parameters
+        ----------
+        spreadsheet_path: str
+            path of the spreadsheet file
+        data_type: str, optional
+            spreadsheet type understood by the server's spreadsheet handler
+        progress_callback: callable, optional
+            called as progress_callback(bytes_sent, total_bytes) while uploading
+        chunk_size: int
+            bytes read from the file and from the response at a time
+
+        Returns
+        -------
+            BatchResult with the queued items and one result per spreadsheet row
+        """
+        spreadsheet_stream = MultipartFileStream(
+            spreadsheet_path,
+            file_field_name="spreadsheet",
+            form_fields={"data_type": data_type},
+            chunk_size=chunk_size,
+            progress_callback=progress_callback,
+        )
+        batch_result = BatchResult()
+        try:
+            upload_response = self.httpserver_post(
+                "queue/upload/spreadsheet",
+                data=spreadsheet_stream,
+                headers={"Content-Type": spreadsheet_stream.content_type},
+                stream=True,
+            )
+        finally:
+            spreadsheet_stream.close()
+
+        with upload_response:
+            batch_result.responses.append(upload_response)
+            if upload_response.status_code != 200:
+                batch_result.add_response_member("success", False)
+                batch_result.add_response_member("msg", upload_response.text)
+                return batch_result
+            for key, value in iter_json_object_members(
+                upload_response.iter_content(chunk_size=chunk_size)
+            ):
+                batch_result.add_response_member(key, value)
+        return batch_result
 
     def queue_item_update(self):
         raise NotImplementedError()
 
-    def queue_item_remove(self):
-        raise NotImplementedError()
+    def queue_item_remove(self, uid=None, pos=None):
+        """Remove one item from the queue, identified by uid or by position."""
+        if uid is not None:
+            item_json = {"uid": uid}
+        else:
+            item_json = {"pos": "back" if pos is None else pos}
+        return self.httpserver_post("queue/item/remove", json=item_json)
 
-    def queue_item_remove_batch(self):
-        raise NotImplementedError()
+    def queue_item_remove_batch(self, uids, ignore_missing=True):
+        """Remove many items from the queue with one request.
 
-    def queue_item_move(self):
-        raise NotImplementedError()
+        Parameters
+        ----------
+        uids: list of str
+            uids of the items to remove
+        ignore_missing: bool
+            if False the request fails, and no item is removed, if any uid is not in the queue
 
-    def queue_item_move_batch(self):
-        raise NotImplementedError()
+        Returns
+        -------
+            BatchResult with the removed items and the resulting plan_queue_uid, None if
+            the request was rejected; when the server does not report it, it is read from
+            the status and may include changes made by other clients since then
+        """
+        return self._queue_batch_edit(
+            "queue/item/remove/batch",
+            {"uids": list(uids), "ignore_missing": ignore_missing},
+        )
+
+    def queue_item_move(
+        self, uid=None, pos=None, pos_dest=None, before_uid=None, after_uid=None
+    ):
+        """Move one item, identified by uid or by position, to a new position.
+
+        The destination is one of pos_dest (an index, "front" or "back"), before_uid
+        or after_uid.
+        """
+        item_json = {"uid": uid} if uid is not None else {"pos": pos}
+        item_json.update(
+            _destination_json(
+                pos_dest=pos_dest, before_uid=before_uid, after_uid=after_uid
+            )
+        )
+        return self.httpserver_post("queue/item/move", json=item_json)
+
+    def queue_item_move_batch(
+        self, uids, pos_dest=None, before_uid=None, after_uid=None, reorder=False
+    ):
+        """Move many items to one destination with one request.
+
+        The items end up next to each other at the destination, which is one of
+        pos_dest ("front" or "back"), before_uid or after_uid.
+
+        Parameters
+        ----------
+        uids: list of str
+            uids of the items to move, in the order they should have at the destination
+        reorder: bool
+            if True keep the current relative order of the items instead of the order of uids
+
+        Returns
+        -------
+            BatchResult with the moved items and the resulting plan_queue_uid, None if
+            the request was rejected; when the server does not report it, it is read from
+            the status and may include changes made by other clients since then
+        """
+        move_json = {"uids": list(uids), "reorder": reorder}
+        move_json.update(
+            _destination_json(
+                pos_dest=pos_dest, before_uid=before_uid, after_uid=after_uid
+            )
+        )
+        return self._queue_batch_edit("queue/item/move/batch", move_json)
+
+    def _queue_batch_edit(self, endpoint, edit_json):
+        batch_result = BatchResult()
+        accepted = batch_result.add_response(
+            self.httpserver_post(endpoint, json=edit_json), len(edit_json["uids"])
+        )
+        if accepted and batch_result.plan_queue_uid is None:
+            # the server does not report the uid of the edited queue, the current uid may
+            # include changes made by other clients since the edit
+            batch_result.plan_queue_uid = self.status().json()["plan_queue_uid"]
+        return batch_result
+
+    def queue_reconcile(self, desired_queue):
+        """Edit the queue to match desired_queue with few requests.
+
+        Items that stay in the queue keep their uids, see plan_queue_edits for the
+        accepted desired_queue entries.
+
+        Returns
+        -------
+            QueueEdits with the BatchResult of every request as the batch_results attribute
+        """
+        queue_edits = plan_queue_edits(self.queue_get().json()["items"], desired_queue)
+        queue_edits.apply(self)
+        return queue_edits
 
     def queue_item_get(self):
         raise NotImplementedError()
 
-    def history_get(self):
-        return self.httpserver_get("history/get")
+    def history_get(self, status=None, typed=False):
+        """Get the plan history.
+
+        Parameters
+        ----------
+        status: dict or QueueStatus, optional
+            a recent status used to validate a cached history
+        typed: bool
+            return a PlanHistory instead of the response
+        """
+        history_response = self._httpserver_get_cached("history/get", status=status)
+        if typed:
+            return PlanHistory.from_response(history_response)
+        return history_response
 
     def history_clear(self):
         return self.httpserver_post("history/clear")
 
-    def re_pause(self):
-        raise NotImplementedError()
+    def re_pause(self, option="deferred"):
+        """Pause the running plan.
+
+        Parameters
+        ----------
+        option: str
+            "deferred" to pause at the next checkpoint or "immediate"
+        """
+        return self.httpserver_post(endpoint="re/pause", json={"option": option})
 
     def re_resume(self):
-        raise NotImplementedError()
+        return self.httpserver_post(endpoint="re/resume")
 
     def re_stop(self):
-        raise NotImplementedError()
+        return self.httpserver_post(endpoint="re/stop")
 
     def re_abort(self):
         return self.httpserver_post(endpoint="re/abort")
 
     def re_halt(self):
-        raise NotImplementedError()
+        return self.httpserver_post(endpoint="re/halt")
 
     def re_runs_active(self):
         raise NotImplementedError()
@@ -238,11 +922,109 @@ class BlueskyHttpserverSession:
     def re_runs_closed(self):
         raise NotImplementedError()
 
-    def plans_allowec(self):
-        raise NotImplementedError()
+    def plans_allowed(self, status=None):
+        """GET plans/allowed, with use_cache reused until plans_allowed_uid changes.
 
-    def devices_allowed(self):
-        raise NotImplementedError()
+        With a disk_cache the response is read from the disk cache while
+        plans_allowed_uid is unchanged.
+
+        Parameters
+        ----------
+        status: dict or QueueStatus, optional
+            a recent status, if not specified and use_cache is True or there is a
+            disk_cache self.status() is called
+        """
+        return self._allowed_response("plans/allowed", status)
+
+    # the original, misspelled name
+    plans_allowec = plans_allowed
+
+    def devices_allowed(self, status=None):
+        """GET devices/allowed, like plans_allowed() with devices_allowed_uid."""
+        return self._allowed_response("devices/allowed", status)
+
+    def item_validator(self, status=None):
+        """Return an ItemValidator for the plans and devices the server currently allows.
+
+        The allowed plans and devices are downloaded once and indexed. After
+        validation_max_age seconds, or when a status is passed, their uids are compared
+        with the status and they are downloaded again only if a uid changed.
+
+        Parameters
+        ----------
+        status: dict or QueueStatus, optional
+            a recent status
+        """
+        cached_validator = self._item_validator
+        if (
+            status is None
+            and cached_validator is not None
+            and ttime.monotonic() - cached_validator[1] < self._validation_max_age
+        ):
+            return cached_validator[0]
+
+        if status is None:
+            status = self.status().json()
+        item_validator = None if cached_validator is None else cached_validator[0]
+        if (
+            item_validator is None
+            or item_validator.plans_allowed_uid
+            != self._status_uid(status, "plans_allowed_uid")
+            or item_validator.devices_allowed_uid
+            != self._status_uid(status, "devices_allowed_uid")
+        ):
+            plans_allowed_json = self._allowed_json("plans/allowed", status)
+            devices_allowed_json = self._allowed_json("devices/allowed", status)
+            item_validator = ItemValidator(
+                plans_allowed_json["plans_allowed"],
+                devices_allowed_json["devices_allowed"],
+                plans_allowed_uid=plans_allowed_json.get("plans_allowed_uid"),
+                devices_allowed_uid=devices_allowed_json.get("devices_allowed_uid"),
+            )
+        self._item_validator = (item_validator, ttime.monotonic())
+        return item_validator
+
+    def _allowed_json(self, endpoint, status):
+        """The JSON of plans/allowed or devices/allowed, from the disk cache if it has it."""
+        allowed_response = self._allowed_response(endpoint, status)
+        allowed_response.raise_for_status()
+        return allowed_response.json()
+
+    def _allowed_response(self, endpoint, status=None):
+        """The plans/allowed or devices/allowed response, from the disk cache if it has it."""
+        if self._disk_cache is None:
+            return self._httpserver_get_cached(endpoint, status=status)
+
+        if status is None:
+            status = self.status().json()
+        status_uid_key = self._status_uid_keys[endpoint]
+        status_uid = self._status_uid(status, status_uid_key)
+        allowed_json = self._disk_cache.get(
+            self._bluesky_httpserver_url, endpoint, status_uid
+        )
+        if allowed_json is not None:
+            return self._disk_cache_response(endpoint, allowed_json)
+
+        allowed_response = self._httpserver_get_cached(endpoint, status=status)
+        if allowed_response.status_code == 200:
+            allowed_json = allowed_response.json()
+            self._disk_cache.put(
+                self._bluesky_httpserver_url,
+                endpoint,
+                allowed_json.get(status_uid_key, status_uid),
+                allowed_json,
+            )
+        return allowed_response
+
+    def _disk_cache_response(self, endpoint, response_json):
+        """A response to GET endpoint with a JSON body read from the disk cache."""
+        disk_cache_response = requests.Response()
+        disk_cache_response.status_code = 200
+        disk_cache_response.url = f"{self._bluesky_httpserver_url}/{endpoint}"
+        disk_cache_response.headers["Content-Type"] = "application/json"
+        disk_cache_response.encoding = "utf-8"
+        disk_cache_response._content = self.codec.dumps(response_json)
+        return memoize_json(disk_cache_response, self.codec)
 
     def permissions_reload(self):
         raise NotImplementedError()
@@ -254,6 +1036,106 @@ class BlueskyHttpserverSession:
         # probably don't really need this
         raise NotImplementedError()
 
-    def stream_console_output(self):
-        # probably don't really need this
-        raise NotImplementedError()
+    def stream_console_output(
+        self,
+        chunk_size=1024,
+        timeout=None,
+        reconnect=True,
+        max_reconnects=None,
+        initial_reconnect_interval=0.1,
+        max_reconnect_interval=5.0,
+    ):
+        """Follow the RE Manager console output, yielding lines as they arrive.
+
+        The RE Manager must be started with --zmq-publish-console ON. The stream is read
+        incrementally and only the current line is held in memory. Lines are yielded
+        without their line break, the output published while reconnecting is lost and
+        a line interrupted by a reconnect is yielded as it is. Stop following the output
+        by closing the generator, or by breaking out of a for loop over it:
+
+            for console_line in session.stream_console_output():
+                print(console_line)
+
+        Parameters
+        ----------
+        chunk_size: int
+            bytes read from the stream at a time
+        timeout: float or tuple, optional
+            requests timeout for connecting and for waiting between chunks, None waits
+            indefinitely
+        reconnect: bool
+            if True reconnect when the stream ends, the connection fails or the server
+            answers with a 5xx status, otherwise return or raise; a 4xx status, eg. from
+            a server without the endpoint, is raised at once
+        max_reconnects: int, optional
+            raise, or return if the stream ended, after this many consecutive reconnects
+            without any output, None reconnects forever
+        initial_reconnect_interval, max_reconnect_interval: float
+            seconds to wait before reconnecting, growing exponentially while there is
+            no output
+        """
+        # consecutive reconnects without any output
+        failed_reconnects = 0
+        reconnect_intervals = None
+        while True:
+            partial_line = ""
+            received_output = False
+            try:
+                console_output_response = self.httpserver_get(
+                    "stream_console_output", stream=True, timeout=timeout
+                )
+                with console_output_response:
+                    console_output_response.raise_for_status()
+                    for console_message in iter_json_lines(
+                        console_output_response.iter_content(chunk_size=chunk_size),
+                        loads=self.codec.loads,
+                    ):
+                        received_output = True
+                        *console_lines, partial_line = (
+                            partial_line + console_message["msg"]
+                        ).split("\n")
+                        yield from console_lines
+            except (
+                requests.ConnectionError,
+                requests.Timeout,
+                requests.HTTPError,
+                requests.exceptions.ChunkedEncodingError,
+            ) as ex:
+                if partial_line:
+                    yield partial_line
+                if (
+                    not reconnect
+                    or isinstance(ex, requests.HTTPError)
+                    and ex.response.status_code < 500
+                    or max_reconnects is not None
+                    and not received_output
+                    and failed_reconnects >= max_reconnects
+                ):
+                    raise
+                self._log.info(
+                    "console output stream failed, reconnecting", exc_info=True
+                )
+            else:
+                if partial_line:
+                    yield partial_line
+                if not reconnect:
+                    return
+                if (
+                    max_reconnects is not None
+                    and not received_output
+                    and failed_reconnects >= max_reconnects
+                ):
+                    self._log.warning(
+                        "console output stream ended %d times without output",
+                        failed_reconnects + 1,
+                    )
+                    return
+                self._log.info("console output stream ended, reconnecting")
+
+            if received_output or reconnect_intervals is None:
+                failed_reconnects = 0
+                reconnect_intervals = poll_intervals(
+                    initial_reconnect_interval, max_reconnect_interval
+                )
+            failed_reconnects += 1
+            ttime.sleep(next(reconnect_intervals))
@@ -0,0 +1,339 @@
+import asyncio
+import logging
+import time as ttime
+
+from .codec import default_codec, json_request_kwargs
+from .metrics import SessionMetrics
+from .responses import PlanHistory, PlanQueue, QueueStatus, memoize_json
+from .retry import RequestAttempts
+from .tracing import RequestTracer
+from .wait import StatusWaiter
+from .watch import AsyncStatusWatcher
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class AsyncBlueskyHttpserverSession:
+    def __init__(
+        self,
+        bluesky_httpserver_url,
+        max_connections=10,
+        max_keepalive_connections=10,
+        keepalive_expiry=5.0,
+        trace_sample_every=1,
+        codec=None,
+        retry_policy=None,
+        circuit_breaker=None,
+        rate_limiter=None,
+    ):
+        """
+        An asyncio counterpart to BlueskyHttpserverSession, endpoint methods are coroutines
+        returning httpx.Response objects.
+
+        Parameters
+        ----------
+        bluesky_httpserver_url: str
+          URI specifying host and port, eg. "http://localhost:60610"
+        max_connections: int
+          maximum number of concurrent connections to the httpserver
+        max_keepalive_connections: int
+          maximum number of idle connections kept alive, 0 disables keep-alive
+        keepalive_expiry: float
+          seconds an idle connection is kept alive
+        trace_sample_every: int
+          with DEBUG logging enabled log one request in trace_sample_every requests
+        codec: object, optional
+          JSON codec with dumps() and loads(), see BlueskyHttpserverSession
+        retry_policy: RetryPolicy, optional
+        circuit_breaker: CircuitBreaker, optional
+        rate_limiter: RateLimiter, optional
+          see BlueskyHttpserverSession
+        """
+        if httpx is None:
+            raise ImportError(
+                "AsyncBlueskyHttpserverSession requires httpx, install it with 'pip install httpx'"
+            )
+
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._tracer = RequestTracer(self._log, sample_every=trace_sample_every)
+
+        self._bluesky_httpserver_url = bluesky_httpserver_url
+        self._log.debug(
+            "self.bluesky_httpserver_url: '%s'", self._bluesky_httpserver_url
+        )
+
+        self.metrics = SessionMetrics()
+        self._retry_policy = retry_policy
+        self._circuit_breaker = circuit_breaker
+        self._rate_limiter = rate_limiter
+        self.codec = default_codec() if codec is None else codec
+
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            # match requests, plans may take a while to be accepted by the RE Manager
+            timeout=None,
+        )
+
+    async def __aenter__(self):
+        environment_open_response = await self.environment_open()
+        if environment_open_response.json()["success"] is False:
+            raise Exception(
+                f"failed to open an environment\n{environment_open_response.json()}"
+            )
+        return self
+
+    async def __aexit__(self, *exc):
+        try:
+            await self.environment_close()
+        finally:
+            await self.aclose()
+        return False
+
+    async def aclose(self):
+        """Close all pooled connections, the session can not be used afterwards."""
+        await self._http_client.aclose()
+
+    @property
+    def closed(self):
+        return self._http_client.is_closed
+
+    async def httpserver_get(self, endpoint, **kwargs):
+        return await self._httpserver_request("GET", endpoint, **kwargs)
+
+    async def httpserver_post(self, endpoint, **kwargs):
+        return await self._httpserver_request("POST", endpoint, **kwargs)
+
+    async def _httpserver_request(self, method, endpoint, **kwargs):
+        retry_policy = self._retry_policy
+        circuit_breaker = self._circuit_breaker
+        if retry_policy is None and circuit_breaker is None:
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire_async(method, endpoint)
+            return await self._httpserver_request_once(method, endpoint, **kwargs)
+
+        request_attempts = RequestAttempts(
+            method,
+            endpoint,
+            kwargs,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            metrics=self.metrics,
+            log=self._log,
+        )
+        while True:
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire_async(method, endpoint)
+            request_attempts.before_attempt()
+            try:
+                endpoint_response = await self._httpserver_request_once(
+                    method, endpoint, **kwargs
+                )
+            except httpx.TransportError as ex:
+                retry_interval = request_attempts.failed(
+                    ex,
+                    request_sent=not isinstance(
+                        ex, (httpx.ConnectError, httpx.ConnectTimeout)
+                    ),
+                )
+                if retry_interval is None:
+                    raise
+            except BaseException:
+                request_attempts.aborted()
+                raise
+            else:
+                retry_interval = request_attempts.responded(endpoint_response)
+                if retry_interval is None:
+                    return endpoint_response
+            await asyncio.sleep(retry_interval)
+
+    async def _httpserver_request_once(self, method, endpoint, **kwargs):
+        endpoint_url = f"{self._bluesky_httpserver_url}/{endpoint}"
+        traced = self._tracer.sampled()
+        if traced:
+            self._tracer.trace_request(method, endpoint_url, kwargs)
+        start_time = ttime.perf_counter()
+        try:
+            endpoint_response = await self._http_client.request(
+                method,
+                url=endpoint_url,
+                **json_request_kwargs(self.codec, kwargs, body_keyword="content"),
+            )
+        except Exception as ex:
+            self.metrics.record_error(
+                method, endpoint, ttime.perf_counter() - start_time, ex
+            )
+            raise
+        elapsed = ttime.perf_counter() - start_time
+
+        memoize_json(endpoint_response, self.codec)
+        self.metrics.record(
+            method,
+            endpoint,
+            elapsed,
+            request_bytes=len(endpoint_response.request.content),
+            response_bytes=len(endpoint_response.content),
+            status_code=endpoint_response.status_code,
+        )
+        if traced:
+            self._tracer.trace_response(method, endpoint_response, elapsed)
+        return endpoint_response
+
+    async def wait_for_status(
+        self,
+        target_status=None,
+        max_status_checks=None,
+        timeout=None,
+        predicate=None,
+        initial_interval=0.05,
+        max_interval=1.0,
+        log_interval=5.0,
+    ):
+        """Wait for self.status() to match the specified target_status.
+
+        See BlueskyHttpserverSession.wait_for_status, the event loop is not blocked between checks.
+        """
+        status_waiter = StatusWaiter(
+            target_status=target_status,
+            predicate=predicate,
+            timeout=timeout,
+            max_status_checks=max_status_checks,
+            initial_interval=initial_interval,
+            max_interval=max_interval,
+            log_interval=log_interval,
+            log=self._log,
+        )
+        while True:
+            status_response = await self.status()
+            delay = status_waiter.check(status_response.json())
+            if delay is None:
+                return status_waiter.result
+            await asyncio.sleep(delay)
+
+    def watch(self, keys=None, interval=1.0, include_initial=False):
+        """Return an async iterator over the changes of the status keys, with timestamps.
+
+            async for status_change in session.watch(keys=["re_state"]):
+                if status_change.status["re_state"] == "idle":
+                    break
+
+        All watches of the server in the event loop share one status polling task, a
+        consumer slower than the polls gets the changes merged, see
+        watch.StatusChangeStream. The interval is ignored if the watcher of the server
+        already exists. Call it from a coroutine.
+
+        Parameters
+        ----------
+        keys: iterable, optional
+            status keys, possibly nested like "plan_queue_mode.loop", by default all
+        interval: float
+            seconds between status requests
+        include_initial: bool
+            if True the first change reports the current values of the keys
+        """
+        return AsyncStatusWatcher.for_session(self, interval=interval).watch(
+            keys=keys, include_initial=include_initial
+        )
+
+    async def environment_open(self):
+        """Open a qserver environment.
+
+        Client code should prefer the async context manager protocol, for example:
+
+            async with AsyncBlueskyHttpserverSession(bluesky_httpserver_url="http://localhost:60610") as session:
+                ...
+
+        """
+        return await self.httpserver_post(endpoint="environment/open")
+
+    async def environment_close(self):
+        return await self.httpserver_post(endpoint="environment/close")
+
+    async def environment_destroy(self):
+        return await self.httpserver_post(endpoint="environment/destroy")
+
+    async def status(self, typed=False):
+        """See BlueskyHttpserverSession.status."""
+        endpoint_response = await self.httpserver_get("status")
+        if typed:
+            return QueueStatus.from_response(endpoint_response)
+        return endpoint_response
+
+    async def queue_mode_set(self, queue_mode_key, queue_mode_value):
+        queue_mode_json = {"mode": {queue_mode_key: queue_mode_value}}
+        return await self.httpserver_post("queue/mode/set", json=queue_mode_json)
+
+    async def queue_get(self, typed=False):
+        """See BlueskyHttpserverSession.queue_get."""
+        endpoint_response = await self.httpserver_get("queue/get")
+        if typed:
+            return PlanQueue.from_response(endpoint_response)
+        return endpoint_response
+
+    async def queue_clear(self):
+        return await self.httpserver_post("queue/clear")
+
+    async def queue_start(self):
+        return await self.httpserver_post("queue/start")
+
+    async def queue_stop(self):
+        return await self.httpserver_post("queue/stop")
+
+    async def queue_stop_cancel(self):
+        return await self.httpserver_post("queue/stop/cancel")
+
+    async def queue_item_add(
+        self, item_name, item_args=None, item_kwargs=None, item_type="plan"
+    ):
+        if item_args is None:
+            item_args = []
+
+        if item_kwargs is None:
+            item_kwargs = {}
+
+        item_json = {
+            "item": {
+                "name": item_name,
+                "args": item_args,
+                "kwargs": item_kwargs,
+                "item_type": item_type,
+            }
+        }
+        return await self.httpserver_post("queue/item/add", json=item_json)
+
+    async def queue_item_execute(self, item_name, item_args, item_type):
+        item_json = {
+            "item": {"name": item_name, "args": item_args, "item_type": item_type}
+        }
+        return await self.httpserver_post("queue/item/execute", json=item_json)
+
+    async def history_get(self, typed=False):
+        """See BlueskyHttpserverSession.history_get."""
+        endpoint_response = await self.httpserver_get("history/get")
+        if typed:
+            return PlanHistory.from_response(endpoint_response)
+        return endpoint_response
+
+    async def history_clear(self):
+        return await self.httpserver_post("history/clear")
+
+    async def re_pause(self, option="deferred"):
+        return await self.httpserver_post("re/pause", json={"option": option})
+
+    async def re_resume(self):
+        return await self.httpserver_post("re/resume")
+
+    async def re_stop(self):
+        return await self.httpserver_post("re/stop")
+
+    async def re_abort(self):
+        return await self.httpserver_post("re/abort")
+
+    async def re_halt(self):
+        return await self.httpserver_post("re/halt")
@@ -0,0 +1,139 @@
+import json
+
+
+class BatchResult:
+    """Combined outcome of a batch operation that may span several requests.
+
+    Attributes
+    ----------
+    results: list of dict
+        one {"success": bool, "msg": str} per submitted item, in submission order
+    items: list of dict
+        the items as returned by the server, for example with their item_uid
+    responses: list
+        the response of every request made
+    qsize: int or None
+        queue size reported by the last response
+    plan_queue_uid: str or None
+        plan_queue_uid after the batch operation, if reported by the server
+    """
+
+    def __init__(self):
+        self.results = []
+        self.items = []
+        self.responses = []
+        self.qsize = None
+        self.plan_queue_uid = None
+        # msg of a rejected request
+        self.msg = ""
+        self._rejected = False
+
+    @property
+    def success(self):
+        return not self._rejected and all(result["success"] for result in self.results)
+
+    def __bool__(self):
+        return self.success
+
+    def __repr__(self):
+        failed_count = sum(not result["success"] for result in self.results)
+        return (
+            f"{self.__class__.__name__}(success={self.success}, "
+            f"items={len(self.results)}, failed={failed_count}, "
+            f"requests={len(self.responses)})"
+        )
+
+    def add_response_member(self, key, value):
+        """Record one member of a response, array members are recorded element by element."""
+        if key == "items":
+            self.items.append(value)
+        elif key == "results":
+            self.results.append(value)
+        elif key == "success":
+            if value is False:
+                self._rejected = True
+        elif key == "msg":
+            if value:
+                self.msg = value
+        elif key in ("qsize", "plan_queue_uid"):
+            setattr(self, key, value)
+
+    def add_response(self, response, item_count):
+        """Record the response to a request for item_count items.
+
+        Returns
+        -------
+            True if the request was accepted
+        """
+        self.responses.append(response)
+        response_json = response.json()
+        result_count = len(self.results)
+        for key, value in response_json.items():
+            if key in ("items", "results"):
+                for element in value:
+                    self.add_response_member(key, element)
+            else:
+                self.add_response_member(key, value)
+
+        if len(self.results) - result_count != item_count:
+            # the response does not have a result per item, apply its outcome to all
+            del self.results[result_count:]
+            self.results.extend(
+                {"success": response_json["success"], "msg": response_json["msg"]}
+                for _ in range(item_count)
+            )
+        return response_json["success"]
+
+    def add_skipped(self, item_count, msg):
+        """Record item_count items that were not submitted."""
+        self.results.extend({"success": False, "msg": msg} for _ in range(item_count))
+
+    def add_invalid(self, item_errors):
+        """Record a batch that was not submitted because local validation rejected items.
+
+        Parameters
+        ----------
+        item_errors: list of list of str
+            the validation errors of every item, empty for valid items
+        """
+        invalid_count = sum(bool(errors) for errors in item_errors)
+        self._rejected = True
+        self.msg = (
+            f"{invalid_count} of {len(item_errors)} items are invalid, "
+            "the batch was not submitted"
+        )
+        self.results.extend(
+            {
+                "success": False,
+                "msg": "; ".join(errors) or "not submitted, other items are invalid",
+            }
+            for errors in item_errors
+        )
+
+
+def iter_encoded_chunks(items, max_chunk_items, max_chunk_bytes, dumps=json.dumps):
+    """Encode items as JSON and group them into size-bounded chunks.
+
+    An item larger than max_chunk_bytes is put in a chunk by itself.
+
+    Yields
+    ------
+        (item_count, bytes) tuples, the bytes are the comma-separated encoded items
+    """
+    chunk = []
+    chunk_bytes = 0
+    for item in items:
+        encoded_item = dumps(item)
+        if isinstance(encoded_item, str):
+            encoded_item = encoded_item.encode()
+        if chunk and (
+            len(chunk) >= max_chunk_items
+            or chunk_bytes + len(encoded_item) + 1 > max_chunk_bytes
+        ):
+            yield len(chunk), b",".join(chunk)
+            chunk = []
+            chunk_bytes = 0
+        chunk.append(encoded_item)
+        chunk_bytes += len(encoded_item) + 1
+    if chunk:
+        yield len(chunk), b",".join(chunk)
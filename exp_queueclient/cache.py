@@ -0,0 +1,66 @@
+import threading
+import time as ttime
+
+
+class UidCache:
+    """Endpoint responses cached by the status uid that versions them.
+
+    The RE Manager status includes a uid for each large piece of state, for example
+    plan_queue_uid changes whenever the queue changes. A cached value is returned as long
+    as the uid it was stored with matches the current uid and it is younger than ttl.
+
+    Parameters
+    ----------
+    ttl: float or None
+        seconds a cached value may be used, None means no expiration
+    """
+
+    def __init__(self, ttl=60.0):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key, uid):
+        """Return the value cached under key if it was stored with uid, otherwise None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            entry_uid, entry_value, entry_time = entry
+            if entry_uid != uid or (
+                self.ttl is not None and ttime.monotonic() - entry_time > self.ttl
+            ):
+                del self._entries[key]
+                self._evictions += 1
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            return entry_value
+
+    def put(self, key, uid, value):
+        with self._lock:
+            self._entries[key] = (uid, value, ttime.monotonic())
+
+    def invalidate(self, key=None):
+        """Drop the value cached under key, or all values if key is None."""
+        with self._lock:
+            if key is None:
+                self._evictions += len(self._entries)
+                self._entries.clear()
+            elif self._entries.pop(key, None) is not None:
+                self._evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+            }
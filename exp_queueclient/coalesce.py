@@ -0,0 +1,89 @@
+import threading
+import time as ttime
+
+
+class _Call:
+    __slots__ = ("generation", "done", "result", "exception", "finish_time")
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+        self.finish_time = None
+
+
+class SingleFlight:
+    """Shares one call between concurrent callers asking for the same key.
+
+    The first caller of call(key, function) runs function, callers arriving with the
+    same key while it runs wait for it and get the same result or exception. With a
+    reuse_window the result is also returned to callers arriving up to reuse_window
+    seconds after the call finished, exceptions are never reused. After invalidate()
+    callers neither join calls started before nor reuse their results.
+
+    Parameters
+    ----------
+    reuse_window: float
+        seconds a finished call's result is reused, 0 only shares calls in flight
+    """
+
+    def __init__(self, reuse_window=0.0):
+        self.reuse_window = reuse_window
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._generation = 0
+        self._stats = {"calls": 0, "shared": 0, "reused": 0}
+
+    def call(self, key, function):
+        with self._lock:
+            shared_call = self._calls.get(key)
+            if shared_call is not None and shared_call.generation != self._generation:
+                shared_call = None
+            if shared_call is not None and shared_call.done.is_set():
+                if (
+                    shared_call.exception is None
+                    and ttime.monotonic() - shared_call.finish_time < self.reuse_window
+                ):
+                    self._stats["reused"] += 1
+                    return shared_call.result
+                shared_call = None
+            if shared_call is None:
+                own_call = self._calls[key] = _Call(self._generation)
+                self._stats["calls"] += 1
+            else:
+                self._stats["shared"] += 1
+
+        if shared_call is not None:
+            shared_call.done.wait()
+            if shared_call.exception is not None:
+                raise shared_call.exception
+            return shared_call.result
+
+        try:
+            own_call.result = function()
+        except BaseException as ex:
+            own_call.exception = ex
+            raise
+        finally:
+            with self._lock:
+                own_call.finish_time = ttime.monotonic()
+                if (
+                    own_call.exception is not None or self.reuse_window <= 0
+                ) and self._calls.get(key) is own_call:
+                    del self._calls[key]
+            own_call.done.set()
+        return own_call.result
+
+    def invalidate(self):
+        """Make later callers start new calls, eg. after a request changed the server state."""
+        with self._lock:
+            self._generation += 1
+            self._calls = {
+                key: call for key, call in self._calls.items() if not call.done.is_set()
+            }
+
+    def stats(self):
+        """Report calls made, callers that shared a call in flight and reused results."""
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,70 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class StdlibJsonCodec:
+    """JSON codec based on the json module of the standard library."""
+
+    name = "json"
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(separators=(",", ":"), allow_nan=False)
+        self._decoder = json.JSONDecoder()
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj).encode()
+
+    def loads(self, data):
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data).decode()
+        return self._decoder.decode(data)
+
+
+class OrjsonCodec:
+    """JSON codec based on orjson."""
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("OrjsonCodec requires orjson")
+
+    def dumps(self, obj):
+        return orjson.dumps(obj)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+def default_codec():
+    """Return the fastest available codec, OrjsonCodec if orjson is installed."""
+    if orjson is not None:
+        return OrjsonCodec()
+    return StdlibJsonCodec()
+
+
+def encode_json_body(codec, body):
+    """Encode a request body with codec, bytes are taken as already encoded JSON."""
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return body
+    return codec.dumps(body)
+
+
+def json_request_kwargs(codec, request_kwargs, body_keyword="data"):
+    """Replace the json keyword argument of a request by a body encoded with codec.
+
+    The body is passed as data for requests, httpx expects raw bytes as content.
+    """
+    if request_kwargs.get("json") is None:
+        return request_kwargs
+    request_kwargs = dict(request_kwargs)
+    request_kwargs[body_keyword] = encode_json_body(codec, request_kwargs.pop("json"))
+    request_kwargs["headers"] = {
+        "Content-Type": "application/json",
+        **(request_kwargs.get("headers") or {}),
+    }
+    return request_kwargs
@@ -0,0 +1,239 @@
+import collections
+import itertools
+import logging
+import threading
+
+import requests
+import urllib3
+
+from .wait import poll_intervals
+
+
+def _is_read_timeout(ex):
+    # requests raises ConnectionError for read timeouts while iterating over content
+    return isinstance(ex, requests.ReadTimeout) or (
+        bool(ex.args) and isinstance(ex.args[0], urllib3.exceptions.ReadTimeoutError)
+    )
+
+
+class ConsoleBuffer:
+    """The most recent lines of RE Manager console output, in bounded memory.
+
+    Lines are added with append(), or by follow() which streams the console output of
+    a session in a background thread. Any number of consumers can read the buffer
+    concurrently without opening streams of their own. Every line has a cursor, its
+    position counted from the creation of the buffer, and read(cursor) returns the
+    lines from that position on with the cursor to continue from:
+
+        console_buffer = ConsoleBuffer(max_lines=10000, max_bytes=10 * 1024 * 1024)
+        console_buffer.follow(session)
+        cursor = console_buffer.cursor
+        while True:
+            console_lines, cursor = console_buffer.read(cursor, timeout=1.0)
+            ...
+
+    When a limit is reached the oldest lines are dropped, a line longer than max_bytes
+    is truncated.
+
+    Parameters
+    ----------
+    max_lines: int, optional
+        keep at most this many lines
+    max_bytes: int, optional
+        keep at most this many bytes of UTF-8 encoded text
+    """
+
+    def __init__(self, max_lines=10000, max_bytes=None):
+        if max_lines is None and max_bytes is None:
+            raise ValueError("max_lines or max_bytes must be specified")
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        # (line, encoded size) tuples
+        self._lines = collections.deque()
+        self._bytes = 0
+        # cursor following the most recent line
+        self._cursor = 0
+        self._lines_changed = threading.Condition(threading.Lock())
+
+        self._follow_thread = None
+        self._stop_following = threading.Event()
+
+    @property
+    def cursor(self):
+        """The cursor of the next line to be added to the buffer."""
+        return self._cursor
+
+    @property
+    def first_cursor(self):
+        """The cursor of the oldest line in the buffer, lines before it were dropped."""
+        with self._lines_changed:
+            return self._cursor - len(self._lines)
+
+    @property
+    def byte_count(self):
+        """Bytes of UTF-8 encoded text in the buffer."""
+        return self._bytes
+
+    def __len__(self):
+        return len(self._lines)
+
+    def append(self, line):
+        line_bytes = len(line.encode())
+        if self.max_bytes is not None and line_bytes > self.max_bytes:
+            line = line.encode()[: self.max_bytes].decode(errors="ignore")
+            line_bytes = len(line.encode())
+        with self._lines_changed:
+            self._lines.append((line, line_bytes))
+            self._bytes += line_bytes
+            while (
+                self.max_lines is not None and len(self._lines) > self.max_lines
+            ) or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                self._bytes -= self._lines.popleft()[1]
+            self._cursor += 1
+            self._lines_changed.notify_all()
+
+    def extend(self, lines):
+        for line in lines:
+            self.append(line)
+
+    def clear(self):
+        """Drop all lines, cursors keep counting up."""
+        with self._lines_changed:
+            self._lines.clear()
+            self._bytes = 0
+
+    def _lines_since(self, cursor):
+        new_line_count = min(max(self._cursor - cursor, 0), len(self._lines))
+        start = len(self._lines) - new_line_count
+        return [line for line, _ in itertools.islice(self._lines, start, None)]
+
+    def tail(self, n=10):
+        """Return the last n lines."""
+        with self._lines_changed:
+            return self._lines_since(self._cursor - n)
+
+    def since(self, cursor=0):
+        """Return the lines with cursor greater than or equal to the given cursor.
+
+        Lines that have been dropped because of the limits are skipped.
+        """
+        with self._lines_changed:
+            return self._lines_since(cursor)
+
+    def read(self, cursor=0, timeout=None):
+        """Return the lines since cursor and the cursor following them.
+
+        Parameters
+        ----------
+        cursor: int
+        timeout: float, optional
+            if there are no lines since cursor wait up to timeout seconds for one
+        """
+        with self._lines_changed:
+            if timeout is not None:
+                self._lines_changed.wait_for(lambda: self._cursor > cursor, timeout)
+            return self._lines_since(cursor), max(self._cursor, cursor)
+
+    def search(self, substring, max_results=None):
+        """Return (cursor, line) for the lines containing substring, the most recent last.
+
+        Parameters
+        ----------
+        substring: str
+        max_results: int, optional
+            return only the most recent max_results matches
+        """
+        with self._lines_changed:
+            lines = list(self._lines)
+            first_cursor = self._cursor - len(lines)
+        matches = [
+            (first_cursor + line_index, line)
+            for line_index, (line, _) in enumerate(lines)
+            if substring in line
+        ]
+        if max_results is not None:
+            first_match = max(len(matches) - max_results, 0)
+            matches = matches[first_match:]
+        return matches
+
+    def follow(
+        self,
+        session,
+        chunk_size=1024,
+        timeout=5.0,
+        initial_reconnect_interval=0.1,
+        max_reconnect_interval=5.0,
+    ):
+        """Append the console output of session in a background thread until stop().
+
+        Parameters
+        ----------
+        session: BlueskyHttpserverSession
+        chunk_size: int
+            bytes read from the stream at a time
+        timeout: float
+            seconds to wait for output before reconnecting, this also bounds how long
+            stop() takes
+        initial_reconnect_interval, max_reconnect_interval: float
+            seconds to wait before reconnecting after a failure, growing exponentially
+        """
+        if self._follow_thread is not None and self._follow_thread.is_alive():
+            raise RuntimeError("the console buffer is already following a session")
+        self._stop_following.clear()
+        self._follow_thread = threading.Thread(
+            target=self._follow,
+            args=(
+                session,
+                chunk_size,
+                timeout,
+                initial_reconnect_interval,
+                max_reconnect_interval,
+            ),
+            name=self.__class__.__name__,
+            daemon=True,
+        )
+        self._follow_thread.start()
+        return self
+
+    def _follow(
+        self,
+        session,
+        chunk_size,
+        timeout,
+        initial_reconnect_interval,
+        max_reconnect_interval,
+    ):
+        log = logging.getLogger(self.__class__.__name__)
+        reconnect_intervals = None
+        while not self._stop_following.is_set():
+            try:
+                for console_line in session.stream_console_output(
+                    chunk_size=chunk_size, timeout=timeout, reconnect=False
+                ):
+                    self.append(console_line)
+                    reconnect_intervals = None
+                    if self._stop_following.is_set():
+                        return
+            except requests.RequestException as ex:
+                if _is_read_timeout(ex):
+                    # no output for timeout seconds, reconnect right away
+                    continue
+                log.info("console output stream failed, reconnecting", exc_info=True)
+            if reconnect_intervals is None:
+                reconnect_intervals = poll_intervals(
+                    initial_reconnect_interval, max_reconnect_interval
+                )
+            self._stop_following.wait(next(reconnect_intervals))
+
+    def stop(self, timeout=None):
+        """Stop following the console output, waiting up to timeout seconds."""
+        self._stop_following.set()
+        if self._follow_thread is not None:
+            self._follow_thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
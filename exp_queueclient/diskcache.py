@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time as ttime
+import zlib
+
+from .codec import default_codec
+
+_MAGIC = b"EQC1"
+_MAGIC_SIZE = len(_MAGIC)
+# the magic is followed by the size of the key
+_KEY_START = _MAGIC_SIZE + 4
+_SUFFIX = ".cache"
+_TEMPORARY_SUFFIX = ".tmp"
+# temporary files older than this were left by a process that died while writing
+_STALE_TEMPORARY_SECONDS = 600.0
+
+
+def default_cache_directory():
+    """$XDG_CACHE_HOME/exp_queueclient, by default ~/.cache/exp_queueclient."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "exp_queueclient")
+
+
+class DiskCache:
+    """JSON documents cached on disk by server URL, endpoint and uid, shared by processes.
+
+    Every document is a file holding a header with its key and the zlib-compressed JSON.
+    Files are written to a temporary file and renamed, so processes reading the cache
+    concurrently never see a partial file. When the files take more than max_bytes the
+    least recently used are deleted, and so are temporary files left by processes that
+    died while writing. Unreadable files count as misses and are deleted.
+
+    Parameters
+    ----------
+    directory: str, optional
+        by default default_cache_directory()
+    max_bytes: int
+        total size of the cache files
+    codec: object, optional
+        JSON codec, see BlueskyHttpserverSession
+    compression_level: int
+        zlib compression level
+    """
+
+    def __init__(
+        self,
+        directory=None,
+        max_bytes=64 * 1024 * 1024,
+        codec=None,
+        compression_level=6,
+    ):
+        self.directory = default_cache_directory() if directory is None else directory
+        self.max_bytes = max_bytes
+        self.codec = default_codec() if codec is None else codec
+        self.compression_level = compression_level
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    @staticmethod
+    def _key(bluesky_httpserver_url, endpoint, uid):
+        return f"{bluesky_httpserver_url.rstrip('/')}\n{endpoint}\n{uid}".encode()
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key).hexdigest() + _SUFFIX)
+
+    def _count(self, stat_name, count=1):
+        with self._lock:
+            self._stats[stat_name] += count
+
+    def get(self, bluesky_httpserver_url, endpoint, uid):
+        """Return the document cached for the uid of an endpoint of a server, or None."""
+        key = self._key(bluesky_httpserver_url, endpoint, uid)
+        path = self._path(key)
+        try:
+            with open(path, "rb") as cache_file:
+                cache_bytes = cache_file.read()
+        except OSError:
+            self._count("misses")
+            return None
+
+        try:
+            if not cache_bytes.startswith(_MAGIC):
+                raise ValueError("not a cache file")
+            key_size = int.from_bytes(cache_bytes[_MAGIC_SIZE:_KEY_START], "big")
+            data_start = _KEY_START + key_size
+            if cache_bytes[_KEY_START:data_start] != key:
+                raise ValueError("the cache file has a different key")
+            value = self.codec.loads(zlib.decompress(cache_bytes[data_start:]))
+        except (ValueError, zlib.error):
+            self._log.info("discarding unreadable cache file %s", path, exc_info=True)
+            self._remove(path)
+            self._count("misses")
+            return None
+
+        try:
+            # the modification time orders the files for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        self._count("hits")
+        return value
+
+    def put(self, bluesky_httpserver_url, endpoint, uid, value):
+        """Cache a document, then evict the least recently used files above max_bytes."""
+        key = self._key(bluesky_httpserver_url, endpoint, uid)
+        cache_bytes = b"".join(
+            (
+                _MAGIC,
+                len(key).to_bytes(4, "big"),
+                key,
+                zlib.compress(self.codec.dumps(value), self.compression_level),
+            )
+        )
+        temporary_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            file_descriptor, temporary_path = tempfile.mkstemp(
+                dir=self.directory, suffix=_TEMPORARY_SUFFIX
+            )
+            with os.fdopen(file_descriptor, "wb") as cache_file:
+                cache_file.write(cache_bytes)
+            os.replace(temporary_path, self._path(key))
+            temporary_path = None
+        except OSError:
+            # the cache only saves time, a read-only or full disk is not an error
+            self._log.warning("failed to write the cache file", exc_info=True)
+            return
+        finally:
+            if temporary_path is not None:
+                self._remove(temporary_path)
+        self._count("writes")
+        self.evict()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _entries(self, suffix=_SUFFIX):
+        """(modification time, size, path) of the files with suffix, the oldest first."""
+        cache_entries = []
+        try:
+            with os.scandir(self.directory) as directory_entries:
+                for directory_entry in directory_entries:
+                    if not directory_entry.name.endswith(suffix):
+                        continue
+                    try:
+                        entry_stat = directory_entry.stat()
+                    except OSError:
+                        # removed by another process
+                        continue
+                    cache_entries.append(
+                        (entry_stat.st_mtime, entry_stat.st_size, directory_entry.path)
+                    )
+        except OSError:
+            return []
+        cache_entries.sort()
+        return cache_entries
+
+    def _remove_stale_temporary_files(self):
+        stale_time = ttime.time() - _STALE_TEMPORARY_SECONDS
+        for entry_mtime, _, entry_path in self._entries(suffix=_TEMPORARY_SUFFIX):
+            if entry_mtime >= stale_time:
+                break
+            self._remove(entry_path)
+
+    def evict(self, max_bytes=None):
+        """Delete the least recently used files until they take at most max_bytes."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        self._remove_stale_temporary_files()
+        cache_entries = self._entries()
+        total_bytes = sum(entry_size for _, entry_size, _ in cache_entries)
+        eviction_count = 0
+        for _, entry_size, entry_path in cache_entries:
+            if total_bytes <= max_bytes:
+                break
+            total_bytes -= entry_size
+            eviction_count += self._remove(entry_path)
+        self._count("evictions", eviction_count)
+
+    def clear(self):
+        """Delete all cache files."""
+        self.evict(max_bytes=0)
+
+    def size(self):
+        """Bytes taken by the cache files."""
+        return sum(entry_size for _, entry_size, _ in self._entries())
+
+    def stats(self):
+        """Report hits, misses, writes and evictions of this process."""
+        with self._lock:
+            return dict(self._stats)
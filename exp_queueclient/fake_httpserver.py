@@ -0,0 +1,894 @@
+import copy
+import csv
+import http.server
+import io
+import json
+import logging
+import threading
+import time as ttime
+import urllib.parse
+import uuid
+
+
+def _new_uid():
+    return str(uuid.uuid4())
+
+
+def default_plan_duration(item):
+    """Seconds a plan runs, num * delay for plans like count, otherwise 1 second."""
+    item_kwargs = item.get("kwargs", {})
+    num = item_kwargs.get("num", 1)
+    delay = item_kwargs.get("delay", 0)
+    if isinstance(num, (int, float)) and isinstance(delay, (int, float)):
+        return max(num * delay, 0.1)
+    return 1.0
+
+
+def _parameter(name, kind="POSITIONAL_OR_KEYWORD", default=None, annotation=None):
+    """A plan parameter description in the format of plans/allowed."""
+    kind_values = {
+        "POSITIONAL_ONLY": 0,
+        "POSITIONAL_OR_KEYWORD": 1,
+        "VAR_POSITIONAL": 2,
+        "KEYWORD_ONLY": 3,
+        "VAR_KEYWORD": 4,
+    }
+    parameter = {"name": name, "kind": {"name": kind, "value": kind_values[kind]}}
+    if default is not None:
+        parameter["default"] = default
+    if annotation is not None:
+        parameter["annotation"] = {"type": annotation}
+    return parameter
+
+
+_detectors = _parameter(
+    "detectors", annotation="typing.Sequence[bluesky.protocols.Readable]"
+)
+_md = _parameter("md", "KEYWORD_ONLY", default="None")
+
+# parameters of the simulated plans, like the bluesky plans of the same names
+default_plan_parameters = {
+    "count": [
+        _detectors,
+        _parameter("num", default="1"),
+        _parameter("delay", default="None"),
+        _parameter("per_shot", "KEYWORD_ONLY", default="None"),
+        _md,
+    ],
+    "scan": [
+        _detectors,
+        _parameter("args", "VAR_POSITIONAL"),
+        _parameter("num", "KEYWORD_ONLY", default="None"),
+        _parameter("per_step", "KEYWORD_ONLY", default="None"),
+        _md,
+    ],
+    "rel_scan": [
+        _detectors,
+        _parameter("args", "VAR_POSITIONAL"),
+        _parameter("num", "KEYWORD_ONLY", default="None"),
+        _parameter("per_step", "KEYWORD_ONLY", default="None"),
+        _md,
+    ],
+    "list_scan": [
+        _detectors,
+        _parameter("args", "VAR_POSITIONAL"),
+        _parameter("per_step", "KEYWORD_ONLY", default="None"),
+        _md,
+    ],
+    "mv": [
+        _parameter("args", "VAR_POSITIONAL"),
+        _parameter("group", "KEYWORD_ONLY", default="None"),
+        _parameter("timeout", "KEYWORD_ONLY", default="None"),
+    ],
+    "sleep": [_parameter("time")],
+}
+
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, do not wait for the client to ACK
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method):
+        fake_httpserver = self.server.fake_httpserver
+        endpoint = urllib.parse.urlsplit(self.path).path.strip("/")
+        content_length = int(self.headers.get("Content-Length") or 0)
+        request_body = self.rfile.read(content_length) if content_length else b""
+
+        streaming_endpoint_handler = fake_httpserver.streaming_endpoints.get(
+            (method, endpoint)
+        )
+        if streaming_endpoint_handler is not None:
+            with fake_httpserver.lock:
+                fake_httpserver.request_counts[endpoint] = (
+                    fake_httpserver.request_counts.get(endpoint, 0) + 1
+                )
+                response_chunks = streaming_endpoint_handler({})
+            self._send_chunked(response_chunks)
+            return
+
+        with fake_httpserver.lock:
+            failure_status_code = fake_httpserver._take_failure(endpoint)
+            if failure_status_code is not None:
+                fake_httpserver.request_counts[endpoint] = (
+                    fake_httpserver.request_counts.get(endpoint, 0) + 1
+                )
+        if failure_status_code is not None:
+            self._send_json(failure_status_code, {"detail": "Injected failure"})
+            return
+
+        endpoint_handler = fake_httpserver.endpoints.get((method, endpoint))
+        if endpoint_handler is None:
+            self._send_json(404, {"detail": "Not Found"})
+            return
+
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            request = _parse_multipart(content_type, request_body)
+        elif request_body:
+            request = json.loads(request_body)
+        else:
+            request = {}
+
+        with fake_httpserver.lock:
+            fake_httpserver.request_counts[endpoint] = (
+                fake_httpserver.request_counts.get(endpoint, 0) + 1
+            )
+            response_json = endpoint_handler(request)
+        self._send_json(200, response_json)
+
+    def _send_json(self, status_code, response_json):
+        response_body = json.dumps(response_json).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response_body)))
+        self.end_headers()
+        self.wfile.write(response_body)
+
+    def _send_chunked(self, response_chunks):
+        """Send the chunks as they are generated, with chunked transfer encoding.
+
+        If the generator raises ConnectionError the connection is closed without
+        completing the response.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for response_chunk in response_chunks:
+                self.wfile.write(
+                    b"%x\r\n%s\r\n" % (len(response_chunk), response_chunk)
+                )
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except ConnectionError:
+            self.close_connection = True
+        finally:
+            response_chunks.close()
+
+    def log_message(self, format, *args):
+        logging.getLogger(FakeBlueskyHttpserver.__name__).debug(format, *args)
+
+
+def _parse_multipart(content_type, request_body):
+    """Return the form fields of a multipart/form-data body, file fields as bytes."""
+    boundary = content_type.split("boundary=", 1)[1].strip('"').encode()
+    form_fields = {}
+    for part in request_body.split(b"--" + boundary)[1:]:
+        if part.startswith(b"--"):
+            break
+        part_headers, _, part_body = part.partition(b"\r\n\r\n")
+        field_name = part_headers.split(b'name="', 1)[1].split(b'"', 1)[0].decode()
+        # strip the line break in front of the next boundary
+        form_fields[field_name] = part_body[:-2]
+    return form_fields
+
+
+class FakeBlueskyHttpserver:
+    """An in-process stand-in for bluesky-httpserver and the RE Manager behind it.
+
+    It serves the endpoints used by BlueskyHttpserverSession on a local port and
+    simulates the RE Manager state: opening and closing the worker environment takes
+    time, the queue is executed one plan at a time, and finished plans move to the
+    history. Console output is published with console_write() and streamed from
+    stream_console_output. All durations are multiplied by time_scale, so tests can
+    run plans much faster than real time:
+
+        with FakeBlueskyHttpserver(time_scale=0.01) as fake_httpserver:
+            session = BlueskyHttpserverSession(fake_httpserver.url)
+            ...
+
+    Parameters
+    ----------
+    host: str
+    port: int
+        0 picks a free port
+    time_scale: float
+        factor applied to all simulated durations
+    environment_open_duration, environment_close_duration: float
+        seconds to open and close the worker environment before scaling
+    plan_duration: callable
+        takes a queue item and returns the seconds the plan runs before scaling
+    allowed_plans: iterable of str
+        plan names accepted by the queue, plans/allowed describes the parameters of
+        plans in default_plan_parameters and (*args, **kwargs) for other plans
+    allowed_devices: iterable of str
+        device names listed by devices/allowed
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        time_scale=1.0,
+        environment_open_duration=1.0,
+        environment_close_duration=0.5,
+        plan_duration=default_plan_duration,
+        allowed_plans=("count", "scan", "rel_scan", "list_scan", "mv", "sleep"),
+        allowed_devices=("det", "det1", "det2", "motor", "motor1", "motor2"),
+    ):
+        self.time_scale = time_scale
+        self.environment_open_duration = environment_open_duration
+        self.environment_close_duration = environment_close_duration
+        self.plan_duration = plan_duration
+        self.allowed_plans = set(allowed_plans)
+        self.allowed_devices = set(allowed_devices)
+
+        self.lock = threading.RLock()
+        # notified whenever the RE state changes, wakes up the worker
+        self._re_state_changed = threading.Condition(self.lock)
+        # notified whenever console output is written or streams should end
+        self._console_changed = threading.Condition(self.lock)
+        self.request_counts = {}
+
+        self.worker_environment_exists = False
+        self.manager_state = "idle"
+        self.re_state = None
+        self.plan_queue_mode = {"loop": False}
+        self.queue = []
+        self.history = []
+        self.running_item = None
+        self.queue_stop_pending = False
+        self.pause_pending = False
+        self._re_command = None
+        self.console = []
+        # [endpoint or None, remaining count, status code] of injected failures
+        self._failures = []
+        self._console_generation = 0
+        self._stopping = False
+        self.plan_queue_uid = _new_uid()
+        self.plan_history_uid = _new_uid()
+        self.plans_allowed_uid = _new_uid()
+        self.devices_allowed_uid = _new_uid()
+        self.run_list_uid = _new_uid()
+
+        self.endpoints = {
+            ("GET", "status"): self._status,
+            ("POST", "environment/open"): self._environment_open,
+            ("POST", "environment/close"): self._environment_close,
+            ("POST", "environment/destroy"): self._environment_destroy,
+            ("POST", "queue/mode/set"): self._queue_mode_set,
+            ("GET", "queue/get"): self._queue_get,
+            ("POST", "queue/clear"): self._queue_clear,
+            ("POST", "queue/start"): self._queue_start,
+            ("POST", "queue/stop"): self._queue_stop,
+            ("POST", "queue/stop/cancel"): self._queue_stop_cancel,
+            ("POST", "queue/item/add"): self._queue_item_add,
+            ("POST", "queue/item/add/batch"): self._queue_item_add_batch,
+            ("POST", "queue/item/execute"): self._queue_item_execute,
+            ("POST", "queue/upload/spreadsheet"): self._queue_upload_spreadsheet,
+            ("POST", "queue/item/remove"): self._queue_item_remove,
+            ("POST", "queue/item/remove/batch"): self._queue_item_remove_batch,
+            ("POST", "queue/item/move"): self._queue_item_move,
+            ("POST", "queue/item/move/batch"): self._queue_item_move_batch,
+            ("GET", "history/get"): self._history_get,
+            ("GET", "plans/allowed"): self._plans_allowed,
+            ("GET", "devices/allowed"): self._devices_allowed,
+            ("POST", "history/clear"): self._history_clear,
+            ("POST", "re/pause"): self._re_pause,
+            ("POST", "re/resume"): self._re_resume,
+            ("POST", "re/stop"): self._re_command_handler("stop"),
+            ("POST", "re/abort"): self._re_command_handler("abort"),
+            ("POST", "re/halt"): self._re_command_handler("halt"),
+        }
+        # handlers returning generators of response body chunks
+        self.streaming_endpoints = {
+            ("GET", "stream_console_output"): self._stream_console_output,
+        }
+
+        self._http_server = http.server.ThreadingHTTPServer(
+            (host, port), _RequestHandler
+        )
+        self._http_server.daemon_threads = True
+        self._http_server.fake_httpserver = self
+        self._server_thread = None
+        self._timers = []
+
+    @property
+    def url(self):
+        host, port = self._http_server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._server_thread = threading.Thread(
+            target=self._http_server.serve_forever,
+            kwargs={"poll_interval": 0.05},
+            name=self.__class__.__name__,
+            daemon=True,
+        )
+        self._server_thread.start()
+        return self
+
+    def stop(self):
+        with self.lock:
+            for timer in self._timers:
+                timer.cancel()
+            self.worker_environment_exists = False
+            self._re_command = "abort"
+            self._re_state_changed.notify_all()
+            self._stopping = True
+            self._console_changed.notify_all()
+        self._http_server.shutdown()
+        self._http_server.server_close()
+        self._server_thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _after(self, seconds, function):
+        timer = threading.Timer(seconds * self.time_scale, function)
+        timer.daemon = True
+        self._timers.append(timer)
+        timer.start()
+
+    @staticmethod
+    def _result(success, msg="", **kwargs):
+        return {"success": success, "msg": msg, **kwargs}
+
+    def _queue_changed(self):
+        self.plan_queue_uid = _new_uid()
+
+    def _history_changed(self):
+        self.plan_history_uid = _new_uid()
+
+    # failure injection
+
+    def fail_next_requests(self, count=1, status_code=503, endpoint=None):
+        """Answer the next count requests, to endpoint or to any endpoint, with status_code."""
+        with self.lock:
+            self._failures.append([endpoint, count, status_code])
+
+    def _take_failure(self, endpoint):
+        for failure in self._failures:
+            if failure[0] is None or failure[0] == endpoint:
+                failure[1] -= 1
+                if failure[1] == 0:
+                    self._failures.remove(failure)
+                return failure[2]
+        return None
+
+    # console output
+
+    def console_write(self, text):
+        """Publish text as RE Manager console output."""
+        with self.lock:
+            self.console.append({"time": ttime.time(), "msg": text})
+            self._console_changed.notify_all()
+
+    def console_drop_connections(self):
+        """Close the console output streams without completing their responses."""
+        with self.lock:
+            self._console_generation += 1
+            self._console_changed.notify_all()
+
+    def _stream_console_output(self, request):
+        # like the RE Manager, stream the console output published after connecting
+        return self._iter_console_output(len(self.console), self._console_generation)
+
+    def _iter_console_output(self, cursor, console_generation):
+        while True:
+            with self.lock:
+                while (
+                    cursor == len(self.console)
+                    and console_generation == self._console_generation
+                    and not self._stopping
+                ):
+                    self._console_changed.wait()
+                console_messages = self.console[cursor:]
+                cursor = len(self.console)
+                dropped = console_generation != self._console_generation
+                stopping = self._stopping
+            # output written before a drop is still sent
+            for console_message in console_messages:
+                yield json.dumps(console_message).encode() + b"\n"
+            if dropped:
+                raise ConnectionAbortedError("console output stream dropped")
+            if stopping:
+                return
+
+    # status and environment
+
+    def _status(self, request):
+        return {
+            "msg": "RE Manager",
+            "items_in_queue": len(self.queue),
+            "items_in_history": len(self.history),
+            "running_item_uid": (
+                self.running_item["item_uid"] if self.running_item else None
+            ),
+            "manager_state": self.manager_state,
+            "queue_stop_pending": self.queue_stop_pending,
+            "worker_environment_exists": self.worker_environment_exists,
+            "re_state": self.re_state,
+            "pause_pending": self.pause_pending,
+            "run_list_uid": self.run_list_uid,
+            "plan_queue_uid": self.plan_queue_uid,
+            "plan_history_uid": self.plan_history_uid,
+            "devices_allowed_uid": self.devices_allowed_uid,
+            "plans_allowed_uid": self.plans_allowed_uid,
+            "plan_queue_mode": dict(self.plan_queue_mode),
+        }
+
+    def _environment_open(self, request):
+        if self.worker_environment_exists:
+            return self._result(False, "RE Worker environment already exists.")
+        if self.manager_state != "idle":
+            return self._result(False, f"RE Manager is busy: '{self.manager_state}'")
+
+        def environment_opened():
+            with self.lock:
+                if self.manager_state == "creating_environment":
+                    self.worker_environment_exists = True
+                    self.manager_state = "idle"
+                    self.re_state = "idle"
+                    self.console_write("RE Worker environment is created.\n")
+
+        self.manager_state = "creating_environment"
+        self._after(self.environment_open_duration, environment_opened)
+        return self._result(True)
+
+    def _environment_close(self, request):
+        if not self.worker_environment_exists:
+            return self._result(False, "RE Worker environment does not exist.")
+        if self.manager_state != "idle":
+            return self._result(False, f"RE Manager is busy: '{self.manager_state}'")
+
+        def environment_closed():
+            with self.lock:
+                if self.manager_state == "closing_environment":
+                    self.worker_environment_exists = False
+                    self.manager_state = "idle"
+                    self.re_state = None
+                    self.console_write("RE Worker environment is closed.\n")
+
+        self.manager_state = "closing_environment"
+        self._after(self.environment_close_duration, environment_closed)
+        return self._result(True)
+
+    def _environment_destroy(self, request):
+        if not self.worker_environment_exists and self.manager_state == "idle":
+            return self._result(False, "RE Worker environment does not exist.")
+        if self.running_item is not None:
+            self._re_command = "abort"
+            self._re_state_changed.notify_all()
+        self.worker_environment_exists = False
+        self.manager_state = "idle"
+        self.re_state = None
+        return self._result(True)
+
+    # queue
+
+    def _queue_mode_set(self, request):
+        self.plan_queue_mode.update(request["mode"])
+        return self._result(True)
+
+    def _queue_get(self, request):
+        return self._result(
+            True,
+            items=copy.deepcopy(self.queue),
+            running_item=copy.deepcopy(self.running_item) or {},
+            plan_queue_uid=self.plan_queue_uid,
+        )
+
+    def _queue_clear(self, request):
+        self.queue.clear()
+        self._queue_changed()
+        return self._result(True)
+
+    def _queue_start(self, request):
+        if not self.worker_environment_exists:
+            return self._result(False, "RE Worker environment does not exist.")
+        if self.manager_state != "idle":
+            return self._result(False, f"RE Manager is busy: '{self.manager_state}'")
+        self._start_worker()
+        return self._result(True)
+
+    def _queue_stop(self, request):
+        if self.manager_state != "executing_queue":
+            return self._result(False, "Queue is not running.")
+        self.queue_stop_pending = True
+        return self._result(True)
+
+    def _queue_stop_cancel(self, request):
+        self.queue_stop_pending = False
+        return self._result(True)
+
+    def set_allowed(self, plans=None, devices=None):
+        """Replace the allowed plans and/or devices, changing their uids."""
+        with self.lock:
+            if plans is not None:
+                self.allowed_plans = set(plans)
+                self.plans_allowed_uid = _new_uid()
+            if devices is not None:
+                self.allowed_devices = set(devices)
+                self.devices_allowed_uid = _new_uid()
+
+    def _plans_allowed(self, request):
+        plans_allowed = {}
+        for plan_name in sorted(self.allowed_plans):
+            plan_parameters = default_plan_parameters.get(
+                plan_name,
+                [
+                    _parameter("args", "VAR_POSITIONAL"),
+                    _parameter("kwargs", "VAR_KEYWORD"),
+                ],
+            )
+            plans_allowed[plan_name] = {
+                "name": plan_name,
+                "module": "bluesky.plans",
+                "parameters": copy.deepcopy(plan_parameters),
+            }
+        return self._result(
+            True, plans_allowed=plans_allowed, plans_allowed_uid=self.plans_allowed_uid
+        )
+
+    def _devices_allowed(self, request):
+        devices_allowed = {
+            device_name: {
+                "classname": (
+                    "SynAxis" if device_name.startswith("motor") else "SynGauss"
+                ),
+                "module": "ophyd.sim",
+            }
+            for device_name in sorted(self.allowed_devices)
+        }
+        return self._result(
+            True,
+            devices_allowed=devices_allowed,
+            devices_allowed_uid=self.devices_allowed_uid,
+        )
+
+    def _validate_item(self, item):
+        if not isinstance(item, dict) or "name" not in item:
+            return "Incorrect item: the item name is missing"
+        item_type = item.get("item_type", "plan")
+        if item_type != "plan":
+            return f"Incorrect item type: '{item_type}'"
+        if item["name"] not in self.allowed_plans:
+            return f"Plan '{item['name']}' is not in the list of allowed plans."
+        if not isinstance(item.get("args", []), list):
+            return "Incorrect item: args must be a list"
+        if not isinstance(item.get("kwargs", {}), dict):
+            return "Incorrect item: kwargs must be a dictionary"
+        return ""
+
+    def _new_queue_item(self, item):
+        queue_item = copy.deepcopy(item)
+        queue_item.setdefault("args", [])
+        queue_item.setdefault("kwargs", {})
+        queue_item["item_uid"] = _new_uid()
+        queue_item.setdefault("user", "fake user")
+        queue_item.setdefault("user_group", "admin")
+        return queue_item
+
+    def _index(self, uid):
+        for index, queue_item in enumerate(self.queue):
+            if queue_item["item_uid"] == uid:
+                return index
+        raise IndexError(f"Item with uid '{uid}' is not in the queue")
+
+    def _insert_index(self, request, pos_key="pos"):
+        if "before_uid" in request:
+            return self._index(request["before_uid"])
+        if "after_uid" in request:
+            return self._index(request["after_uid"]) + 1
+        pos = request.get(pos_key, "back")
+        if pos == "front":
+            return 0
+        if pos == "back":
+            return len(self.queue)
+        return pos if pos >= 0 else len(self.queue) + pos + 1
+
+    def _queue_item_add(self, request):
+        item = request.get("item")
+        msg = self._validate_item(item)
+        if msg:
+            return self._result(False, msg, qsize=len(self.queue), item=item)
+        try:
+            index = self._insert_index(request)
+        except IndexError as ex:
+            return self._result(False, str(ex), qsize=len(self.queue), item=item)
+        queue_item = self._new_queue_item(item)
+        self.queue.insert(index, queue_item)
+        self._queue_changed()
+        return self._result(True, qsize=len(self.queue), item=queue_item)
+
+    def _queue_item_add_batch(self, request):
+        items = request.get("items", [])
+        results = [
+            {"success": not msg, "msg": msg}
+            for msg in (self._validate_item(item) for item in items)
+        ]
+        try:
+            index = self._insert_index(request)
+        except IndexError as ex:
+            return self._result(
+                False, str(ex), items=items, results=results, qsize=len(self.queue)
+            )
+        if not all(result["success"] for result in results):
+            return self._result(
+                False,
+                "Failed to add all items: validation of some items failed",
+                items=items,
+                results=results,
+                qsize=len(self.queue),
+            )
+        queue_items = [self._new_queue_item(item) for item in items]
+        self.queue[index:index] = queue_items
+        self._queue_changed()
+        return self._result(
+            True, items=queue_items, results=results, qsize=len(self.queue)
+        )
+
+    def _queue_item_execute(self, request):
+        item = request.get("item")
+        msg = self._validate_item(item)
+        if msg:
+            return self._result(False, msg, item=item)
+        if not self.worker_environment_exists or self.manager_state != "idle":
+            return self._result(False, "RE Manager is not ready to execute an item.")
+        queue_item = self._new_queue_item(item)
+        self._start_worker(immediate_item=queue_item)
+        return self._result(True, item=queue_item, qsize=len(self.queue))
+
+    def _queue_upload_spreadsheet(self, request):
+        spreadsheet_rows = csv.DictReader(
+            io.StringIO(request["spreadsheet"].decode("utf-8"))
+        )
+        items = []
+        for spreadsheet_row in spreadsheet_rows:
+            item_kwargs = {}
+            for column_name, cell in spreadsheet_row.items():
+                if column_name == "plan_name" or cell in (None, ""):
+                    continue
+                try:
+                    item_kwargs[column_name] = json.loads(cell)
+                except ValueError:
+                    item_kwargs[column_name] = cell
+            items.append(
+                {
+                    "name": spreadsheet_row["plan_name"],
+                    "kwargs": item_kwargs,
+                    "item_type": "plan",
+                }
+            )
+        return self._queue_item_add_batch({"items": items})
+
+    def _queue_item_remove(self, request):
+        try:
+            if "uid" in request:
+                index = self._index(request["uid"])
+            else:
+                pos = request.get("pos", "back")
+                index = {"front": 0, "back": -1}.get(pos, pos)
+            queue_item = self.queue.pop(index)
+        except IndexError as ex:
+            return self._result(False, str(ex), qsize=len(self.queue))
+        self._queue_changed()
+        return self._result(True, item=queue_item, qsize=len(self.queue))
+
+    def _queue_item_remove_batch(self, request):
+        uids = request["uids"]
+        queue_uids = {queue_item["item_uid"] for queue_item in self.queue}
+        missing_uids = [uid for uid in uids if uid not in queue_uids]
+        if missing_uids and not request.get("ignore_missing", True):
+            return self._result(
+                False,
+                f"The queue does not contain items with uids {missing_uids}",
+                items=[],
+                qsize=len(self.queue),
+            )
+        uid_set = set(uids)
+        removed_items = [
+            queue_item for queue_item in self.queue if queue_item["item_uid"] in uid_set
+        ]
+        self.queue = [
+            queue_item
+            for queue_item in self.queue
+            if queue_item["item_uid"] not in uid_set
+        ]
+        self._queue_changed()
+        return self._result(True, items=removed_items, qsize=len(self.queue))
+
+    def _move(self, uids, request):
+        moved_items = [self.queue[self._index(uid)] for uid in uids]
+        if request.get("reorder", False):
+            moved_items.sort(key=self.queue.index)
+        moved_uids = set(uids)
+        if moved_uids & {request.get("before_uid"), request.get("after_uid")}:
+            raise IndexError("Destination item can not be one of the moved items")
+        self.queue = [
+            queue_item
+            for queue_item in self.queue
+            if queue_item["item_uid"] not in moved_uids
+        ]
+        index = self._insert_index(request, pos_key="pos_dest")
+        self.queue[index:index] = moved_items
+        self._queue_changed()
+        return moved_items
+
+    def _queue_item_move(self, request):
+        try:
+            if "uid" in request:
+                uid = request["uid"]
+            else:
+                pos = request.get("pos", "back")
+                uid = self.queue[{"front": 0, "back": -1}.get(pos, pos)]["item_uid"]
+            (moved_item,) = self._move([uid], request)
+        except IndexError as ex:
+            return self._result(False, str(ex), qsize=len(self.queue))
+        return self._result(True, item=moved_item, qsize=len(self.queue))
+
+    def _queue_item_move_batch(self, request):
+        queue_before_move = list(self.queue)
+        try:
+            moved_items = self._move(request["uids"], request)
+        except IndexError as ex:
+            self.queue = queue_before_move
+            return self._result(False, str(ex), items=[], qsize=len(self.queue))
+        return self._result(True, items=moved_items, qsize=len(self.queue))
+
+    # history
+
+    def _history_get(self, request):
+        return self._result(
+            True,
+            items=copy.deepcopy(self.history),
+            plan_history_uid=self.plan_history_uid,
+        )
+
+    def _history_clear(self, request):
+        self.history.clear()
+        self._history_changed()
+        return self._result(True)
+
+    # plan execution
+
+    def _re_pause(self, request):
+        if self.re_state != "running":
+            return self._result(False, "No plan is running.")
+        self.pause_pending = True
+        self._re_command = "pause"
+        self._re_state_changed.notify_all()
+        return self._result(True)
+
+    def _re_resume(self, request):
+        if self.re_state != "paused":
+            return self._result(False, "RE is not paused.")
+        self._re_command = "resume"
+        self._re_state_changed.notify_all()
+        return self._result(True)
+
+    def _re_command_handler(self, re_command):
+        def re_command_handler(request):
+            if self.re_state != "paused":
+                return self._result(False, "RE is not paused.")
+            self._re_command = re_command
+            self._re_state_changed.notify_all()
+            return self._result(True)
+
+        return re_command_handler
+
+    def _start_worker(self, immediate_item=None):
+        self.manager_state = "executing_queue"
+        self.queue_stop_pending = False
+        self._re_command = None
+        worker_thread = threading.Thread(
+            target=self._execute_queue,
+            args=(immediate_item,),
+            name=f"{self.__class__.__name__}-worker",
+            daemon=True,
+        )
+        worker_thread.start()
+
+    def _execute_queue(self, immediate_item):
+        with self.lock:
+            while self.worker_environment_exists:
+                if immediate_item is not None:
+                    self.running_item = immediate_item
+                elif self.queue and not self.queue_stop_pending:
+                    self.running_item = self.queue.pop(0)
+                    self._queue_changed()
+                else:
+                    break
+
+                self.console_write(f"Starting plan '{self.running_item['name']}'.\n")
+                exit_status = self._run_plan(self.running_item)
+                self.console_write(
+                    f"Plan '{self.running_item['name']}' exited: {exit_status}.\n"
+                )
+                finished_item = self.running_item
+                self.running_item = None
+                self.run_list_uid = _new_uid()
+
+                if exit_status in ("aborted", "halted") and immediate_item is None:
+                    self.queue.insert(0, self._new_queue_item(finished_item))
+                    self._queue_changed()
+                elif self.plan_queue_mode.get("loop") and immediate_item is None:
+                    self.queue.append(self._new_queue_item(finished_item))
+                    self._queue_changed()
+
+                history_item = copy.deepcopy(finished_item)
+                history_item["result"] = {
+                    "exit_status": exit_status,
+                    "run_uids": [_new_uid()],
+                    "msg": "",
+                }
+                self.history.append(history_item)
+                self._history_changed()
+
+                if exit_status != "completed" or immediate_item is not None:
+                    break
+
+            self.queue_stop_pending = False
+            self.pause_pending = False
+            if self.manager_state == "executing_queue":
+                self.manager_state = "idle"
+            if self.worker_environment_exists:
+                self.re_state = "idle"
+
+    def _run_plan(self, queue_item):
+        """Simulate a running plan, called and returning with self.lock held."""
+        self.re_state = "running"
+        self.run_list_uid = _new_uid()
+        remaining_time = self.plan_duration(queue_item) * self.time_scale
+        while True:
+            if self._re_command is None and self.worker_environment_exists:
+                start_time = ttime.monotonic()
+                self._re_state_changed.wait(timeout=max(remaining_time, 0))
+                remaining_time -= ttime.monotonic() - start_time
+
+            if not self.worker_environment_exists:
+                return "aborted"
+            re_command, self._re_command = self._re_command, None
+            if re_command == "pause":
+                self.re_state = "paused"
+                self.manager_state = "paused"
+                self.pause_pending = False
+                # wait for resume, stop, abort or halt
+                while self._re_command is None and self.worker_environment_exists:
+                    self._re_state_changed.wait()
+                continue
+            if re_command == "resume":
+                self.re_state = "running"
+                self.manager_state = "executing_queue"
+                continue
+            if re_command in ("stop", "abort", "halt"):
+                self.re_state = "idle"
+                self.manager_state = "executing_queue"
+                return {"stop": "stopped", "abort": "aborted", "halt": "halted"}[
+                    re_command
+                ]
+            if remaining_time <= 0:
+                return "completed"
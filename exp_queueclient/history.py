@@ -0,0 +1,121 @@
+import collections
+import itertools
+import logging
+import threading
+
+
+class HistoryMirror:
+    """A local copy of the plan history that is extended with new items only.
+
+    update() makes one status() call and downloads the history only if
+    plan_history_uid has changed. Items already mirrored are not stored again,
+    only the new tail of the history is appended. Every mirrored item has a cursor,
+    its position counted from the creation of the mirror, and since(cursor)
+    iterates over the items added from that position on:
+
+        history_mirror = HistoryMirror(session)
+        cursor = history_mirror.cursor
+        while True:
+            history_mirror.update()
+            for history_item in history_mirror.since(cursor):
+                ...
+            cursor = history_mirror.cursor
+
+    If the history is cleared on the server the mirror starts over, cursors keep
+    counting up so consumers see the items of the new history as new items.
+
+    Parameters
+    ----------
+    session: BlueskyHttpserverSession
+    max_items: int, optional
+        keep at most this many of the most recent items
+    """
+
+    def __init__(self, session, max_items=None):
+        self._session = session
+        self._items = collections.deque(maxlen=max_items)
+        self._lock = threading.Lock()
+
+        # cursor following the most recent item
+        self._cursor = 0
+        self._plan_history_uid = None
+        # length of the server history and uid of its last item at the last update
+        self._history_length = 0
+        self._last_item_uid = None
+        self.history_resets = 0
+
+    @property
+    def cursor(self):
+        """The cursor of the next item to be added to the mirror."""
+        return self._cursor
+
+    @property
+    def plan_history_uid(self):
+        return self._plan_history_uid
+
+    def __len__(self):
+        return len(self._items)
+
+    def update(self, status=None):
+        """Bring the mirror up to date with the server history.
+
+        Parameters
+        ----------
+        status: dict, optional
+            a recent status response JSON, if not specified self.status() is called
+
+        Returns
+        -------
+            the number of items added to the mirror
+        """
+        if status is None:
+            status = self._session.status().json()
+        if status["plan_history_uid"] == self._plan_history_uid:
+            return 0
+
+        history_json = self._session.httpserver_get("history/get").json()
+        history_items = history_json["items"]
+
+        with self._lock:
+            if self._is_continuation(history_items):
+                history_length = self._history_length
+                new_items = history_items[history_length:]
+            else:
+                logging.getLogger(self.__class__.__name__).debug(
+                    "plan history was cleared or rewritten, restarting the mirror"
+                )
+                self._items.clear()
+                self.history_resets += 1
+                new_items = history_items
+
+            self._items.extend(new_items)
+            self._cursor += len(new_items)
+            self._history_length = len(history_items)
+            self._last_item_uid = (
+                history_items[-1].get("item_uid") if history_items else None
+            )
+            self._plan_history_uid = history_json.get(
+                "plan_history_uid", status["plan_history_uid"]
+            )
+
+        return len(new_items)
+
+    def _is_continuation(self, history_items):
+        if self._history_length == 0:
+            return True
+        if len(history_items) < self._history_length:
+            return False
+        return (
+            history_items[self._history_length - 1].get("item_uid")
+            == self._last_item_uid
+        )
+
+    def since(self, cursor=0):
+        """Iterate over the mirrored items with cursor greater than or equal to the given cursor.
+
+        Items that have been dropped because of max_items are skipped.
+        """
+        with self._lock:
+            new_item_count = max(self._cursor - cursor, 0)
+            new_items = list(itertools.islice(reversed(self._items), new_item_count))
+        return reversed(new_items)
@@ -0,0 +1,173 @@
+import collections
+import math
+import threading
+
+
+class LatencyHistogram:
+    """A histogram of latencies with logarithmically spaced buckets.
+
+    Bucket boundaries grow by a factor of 2 ** (1 / buckets_per_octave), so percentiles
+    are accurate to that relative error over the whole range while recording stays
+    constant time and memory.
+
+    Parameters
+    ----------
+    min_value: float
+        upper bound of the first bucket, smaller values are counted in it
+    max_value: float
+        larger values are counted in the last bucket
+    buckets_per_octave: int
+        number of buckets for every doubling of latency
+    """
+
+    def __init__(self, min_value=1e-5, max_value=1e3, buckets_per_octave=8):
+        self.min_value = min_value
+        self.buckets_per_octave = buckets_per_octave
+        self._bucket_count = (
+            int(math.ceil(math.log2(max_value / min_value) * buckets_per_octave)) + 1
+        )
+        self.reset()
+
+    def reset(self):
+        self._buckets = [0] * self._bucket_count
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _bucket_index(self, value):
+        if value <= self.min_value:
+            return 0
+        bucket_index = int(
+            math.ceil(math.log2(value / self.min_value) * self.buckets_per_octave)
+        )
+        return min(bucket_index, self._bucket_count - 1)
+
+    def _bucket_upper_bound(self, bucket_index):
+        return self.min_value * 2 ** (bucket_index / self.buckets_per_octave)
+
+    def record(self, value):
+        self._buckets[self._bucket_index(value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def percentile(self, p):
+        """Return an upper bound of the p-th percentile, or None if nothing was recorded."""
+        if self.count == 0:
+            return None
+        rank = max(int(math.ceil(p / 100 * self.count)), 1)
+        cumulative_count = 0
+        for bucket_index, bucket_count in enumerate(self._buckets):
+            cumulative_count += bucket_count
+            if cumulative_count >= rank:
+                return min(self._bucket_upper_bound(bucket_index), self.max)
+        return self.max
+
+    def snapshot(self):
+        if self.count == 0:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            # non-empty buckets by upper bound
+            "buckets": {
+                self._bucket_upper_bound(bucket_index): bucket_count
+                for bucket_index, bucket_count in enumerate(self._buckets)
+                if bucket_count
+            },
+        }
+
+
+class _EndpointMetrics:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.status_codes = collections.Counter()
+        self.errors = collections.Counter()
+        self.retries = 0
+
+    def snapshot(self):
+        return {
+            "requests": self.latency.count,
+            "retries": self.retries,
+            "latency_s": self.latency.snapshot(),
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "status_codes": dict(self.status_codes),
+            "errors": dict(self.errors),
+        }
+
+
+class SessionMetrics:
+    """Per-endpoint request metrics of a session.
+
+    For every endpoint, keyed like "GET status", the session records a latency histogram,
+    request and response body bytes, response status code counts, counts of requests
+    that raised an exception, by exception type, and the number of retries.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoint_metrics = {}
+
+    def _endpoint(self, method, endpoint):
+        endpoint_key = f"{method} {endpoint}"
+        endpoint_metrics = self._endpoint_metrics.get(endpoint_key)
+        if endpoint_metrics is None:
+            endpoint_metrics = self._endpoint_metrics[endpoint_key] = _EndpointMetrics()
+        return endpoint_metrics
+
+    def record(
+        self, method, endpoint, elapsed, request_bytes, response_bytes, status_code
+    ):
+        with self._lock:
+            endpoint_metrics = self._endpoint(method, endpoint)
+            endpoint_metrics.latency.record(elapsed)
+            endpoint_metrics.request_bytes += request_bytes
+            endpoint_metrics.response_bytes += response_bytes
+            endpoint_metrics.status_codes[status_code] += 1
+
+    def record_error(self, method, endpoint, elapsed, exception):
+        with self._lock:
+            endpoint_metrics = self._endpoint(method, endpoint)
+            endpoint_metrics.latency.record(elapsed)
+            endpoint_metrics.errors[type(exception).__name__] += 1
+
+    def record_retry(self, method, endpoint):
+        with self._lock:
+            self._endpoint(method, endpoint).retries += 1
+
+    def snapshot(self, reset=False):
+        """Return the metrics as a dictionary keyed by endpoint, optionally resetting them."""
+        with self._lock:
+            metrics_snapshot = {
+                endpoint_key: endpoint_metrics.snapshot()
+                for endpoint_key, endpoint_metrics in self._endpoint_metrics.items()
+            }
+            if reset:
+                self._endpoint_metrics.clear()
+        return metrics_snapshot
+
+    def reset(self):
+        with self._lock:
+            self._endpoint_metrics.clear()
+
+
+def body_size(body):
+    """Size in bytes of a request body, 0 if it is unknown."""
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode())
+    try:
+        return len(body)
+    except TypeError:
+        return 0
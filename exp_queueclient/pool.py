@@ -0,0 +1,222 @@
+import concurrent.futures
+import threading
+import time as ttime
+
+from . import BlueskyHttpserverSession
+
+
+class ServerResult:
+    """Outcome of a call on one server of a SessionPool.
+
+    Attributes
+    ----------
+    url: str
+    value: object
+        return value of the call, None if it raised or timed out
+    exception: Exception or None
+        exception raised by the call, concurrent.futures.TimeoutError if it timed out
+    elapsed: float
+        seconds until the call returned, raised or timed out
+    """
+
+    __slots__ = ("url", "value", "exception", "elapsed")
+
+    def __init__(self, url, value=None, exception=None, elapsed=None):
+        self.url = url
+        self.value = value
+        self.exception = exception
+        self.elapsed = elapsed
+
+    @property
+    def success(self):
+        return self.exception is None
+
+    @property
+    def timed_out(self):
+        return isinstance(self.exception, concurrent.futures.TimeoutError)
+
+    def __bool__(self):
+        return self.success
+
+    def __repr__(self):
+        outcome = (
+            f"value={self.value!r}" if self.success else f"exception={self.exception!r}"
+        )
+        return f"ServerResult(url={self.url!r}, {outcome}, elapsed={self.elapsed!r})"
+
+
+class SessionPool:
+    """Sessions for many bluesky-httpservers, with calls fanned out concurrently.
+
+        session_pool = SessionPool(["http://beamline-1:60610", "http://beamline-2:60610"])
+        for url, server_result in session_pool.status(timeout=2.0).items():
+            if server_result:
+                print(url, server_result.value.json()["manager_state"])
+            else:
+                print(url, server_result.exception)
+
+    Calls run in a bounded thread pool and return a dictionary of ServerResult by url
+    in the order of the urls. A server that does not answer within its timeout gets a
+    timed out result while the results of the other servers are returned on time. Its
+    call keeps a worker thread busy until the request fails, so the request_timeout of
+    the sessions is at most the timeout of the pool, and the server gets a timed out
+    result without a new call while its previous call is still running.
+
+    Parameters
+    ----------
+    bluesky_httpserver_urls: iterable of str
+    max_workers: int, optional
+        maximum number of concurrent calls, by default one per server up to 32
+    timeout: float or None
+        default seconds to wait for each server, None waits indefinitely
+    request_timeout: float or None
+        request_timeout of the sessions, at most timeout
+    session_kwargs:
+        further BlueskyHttpserverSession arguments
+    """
+
+    def __init__(
+        self,
+        bluesky_httpserver_urls,
+        max_workers=None,
+        timeout=10.0,
+        request_timeout=30.0,
+        **session_kwargs,
+    ):
+        if timeout is not None:
+            request_timeout = (
+                timeout if request_timeout is None else min(request_timeout, timeout)
+            )
+        self.sessions = {
+            url: BlueskyHttpserverSession(
+                url, request_timeout=request_timeout, **session_kwargs
+            )
+            for url in bluesky_httpserver_urls
+        }
+        self.timeout = timeout
+        if max_workers is None:
+            max_workers = min(max(len(self.sessions), 1), 32)
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="SessionPool"
+        )
+        # the latest future of each server, cancelled by close
+        self._futures = {}
+        self._futures_lock = threading.Lock()
+
+    @property
+    def urls(self):
+        return list(self.sessions)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        """Close the sessions, calls still running are not waited for."""
+        with self._futures_lock:
+            futures = list(self._futures.values())
+        # shutdown(cancel_futures=True) needs python 3.9
+        for future in futures:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+        for session in self.sessions.values():
+            session.close()
+
+    def call(self, method, *args, urls=None, timeout=None, **kwargs):
+        """Call a session method on every server, or on the servers in urls.
+
+        Parameters
+        ----------
+        method: str or callable
+            name of a BlueskyHttpserverSession method, or a callable called as
+            method(session, *args, **kwargs)
+        urls: iterable of str, optional
+            servers to call, by default all servers
+        timeout: float or dict, optional
+            seconds to wait for each server, or a dictionary of seconds by url, by default
+            the timeout of the pool
+
+        Returns
+        -------
+            dictionary of ServerResult by url
+        """
+        if urls is None:
+            urls = self.urls
+        if timeout is None:
+            timeout = self.timeout
+
+        start_time = ttime.monotonic()
+        # elapsed seconds of the calls that returned or raised
+        elapsed_by_url = {}
+
+        def call_session(url):
+            try:
+                if callable(method):
+                    return method(self.sessions[url], *args, **kwargs)
+                return getattr(self.sessions[url], method)(*args, **kwargs)
+            finally:
+                elapsed_by_url[url] = ttime.monotonic() - start_time
+
+        futures = {url: self._submit(call_session, url) for url in urls}
+
+        server_results = {}
+        for url, future in futures.items():
+            if future is None:
+                server_results[url] = ServerResult(
+                    url,
+                    exception=concurrent.futures.TimeoutError(
+                        "the previous call to the server is still running"
+                    ),
+                    elapsed=0.0,
+                )
+                continue
+            if isinstance(timeout, dict):
+                server_timeout = timeout.get(url, self.timeout)
+            else:
+                server_timeout = timeout
+            if server_timeout is not None:
+                # timeouts count from the submission of all calls
+                server_timeout = max(start_time + server_timeout - ttime.monotonic(), 0)
+            try:
+                value = future.result(timeout=server_timeout)
+            except concurrent.futures.TimeoutError as ex:
+                future.cancel()
+                server_results[url] = ServerResult(
+                    url, exception=ex, elapsed=ttime.monotonic() - start_time
+                )
+            except Exception as ex:
+                server_results[url] = ServerResult(
+                    url, exception=ex, elapsed=elapsed_by_url.get(url)
+                )
+            else:
+                server_results[url] = ServerResult(
+                    url, value=value, elapsed=elapsed_by_url.get(url)
+                )
+        return server_results
+
+    def _submit(self, function, url):
+        """Submit a call on a server, None while its previous call is still running."""
+        with self._futures_lock:
+            previous_future = self._futures.get(url)
+            if previous_future is not None and not previous_future.done():
+                return None
+            future = self._futures[url] = self._executor.submit(function, url)
+        return future
+
+    def status(self, urls=None, timeout=None, typed=False):
+        return self.call("status", urls=urls, timeout=timeout, typed=typed)
+
+    def queue_get(self, urls=None, timeout=None, typed=False):
+        return self.call("queue_get", urls=urls, timeout=timeout, typed=typed)
+
+    def queue_start(self, urls=None, timeout=None):
+        return self.call("queue_start", urls=urls, timeout=timeout)
+
+    def queue_stop(self, urls=None, timeout=None):
+        return self.call("queue_stop", urls=urls, timeout=timeout)
+
+    def re_pause(self, option="deferred", urls=None, timeout=None):
+        return self.call("re_pause", option, urls=urls, timeout=timeout)
@@ -0,0 +1,184 @@
+import asyncio
+import threading
+import time as ttime
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request would have to wait longer than the rate limiter allows."""
+
+
+class TokenBucket:
+    """A token bucket refilled at rate tokens per second, holding at most capacity tokens.
+
+    Callers that have to wait reserve their tokens before sleeping, so waiting callers
+    are served in order and the rate holds however many callers there are.
+
+    Parameters
+    ----------
+    rate: float
+        tokens per second
+    capacity: float, optional
+        maximum burst of tokens, by default one second worth of tokens but at least 1
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, not {rate}")
+        self.rate = rate
+        self.capacity = max(rate, 1.0) if capacity is None else capacity
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._refill_time = ttime.monotonic()
+        self._stats = {"acquired": 0, "throttled": 0, "rejected": 0, "wait_time": 0.0}
+
+    def _refill(self):
+        now = ttime.monotonic()
+        self._tokens = min(
+            self._tokens + (now - self._refill_time) * self.rate, self.capacity
+        )
+        self._refill_time = now
+
+    def reserve(self, tokens=1, max_wait=None):
+        """Take tokens and return the seconds to wait before using them.
+
+        Returns None, and takes nothing, if the wait would be longer than max_wait.
+        """
+        with self._lock:
+            self._refill()
+            wait_time = max((tokens - self._tokens) / self.rate, 0.0)
+            if max_wait is not None and wait_time > max_wait:
+                self._stats["rejected"] += 1
+                return None
+            self._tokens -= tokens
+            self._stats["acquired"] += 1
+            if wait_time > 0:
+                self._stats["throttled"] += 1
+                self._stats["wait_time"] += wait_time
+            return wait_time
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if they are available now, return True if they were taken."""
+        return self.reserve(tokens, max_wait=0.0) is not None
+
+    def acquire(self, tokens=1, timeout=None):
+        """Wait for and take tokens, return False if that would take longer than timeout."""
+        wait_time = self.reserve(tokens, max_wait=timeout)
+        if wait_time is None:
+            return False
+        if wait_time > 0:
+            ttime.sleep(wait_time)
+        return True
+
+    async def acquire_async(self, tokens=1, timeout=None):
+        """Like acquire, without blocking the event loop."""
+        wait_time = self.reserve(tokens, max_wait=timeout)
+        if wait_time is None:
+            return False
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+        return True
+
+    def stats(self):
+        """Report acquisitions, how many of them waited and for how long, and rejections."""
+        with self._lock:
+            return dict(self._stats)
+
+
+class RateLimiter:
+    """Limits the request rate of sessions, with separate buckets for reads and writes.
+
+    GET requests take a token from the read bucket, other requests from the write
+    bucket. By default callers wait for a token, with blocking=False a request that
+    cannot be sent right away raises RateLimitExceeded, and with a timeout a request
+    that would have to wait longer raises it.
+
+    Pass the same limiter to several sessions to limit them together, for_url()
+    returns a limiter shared by all sessions of a process that use the same server.
+
+    Parameters
+    ----------
+    read_rate, write_rate: float or None
+        requests per second, None does not limit
+    read_burst, write_burst: float, optional
+        requests that may be sent at once, see TokenBucket
+    blocking: bool
+    timeout: float, optional
+        with blocking, raise instead of waiting longer than timeout seconds
+    """
+
+    _shared_limiters = {}
+    _shared_limiters_lock = threading.Lock()
+
+    def __init__(
+        self,
+        read_rate=20.0,
+        write_rate=5.0,
+        read_burst=None,
+        write_burst=None,
+        blocking=True,
+        timeout=None,
+    ):
+        self.read_bucket = (
+            None if read_rate is None else TokenBucket(read_rate, read_burst)
+        )
+        self.write_bucket = (
+            None if write_rate is None else TokenBucket(write_rate, write_burst)
+        )
+        self.blocking = blocking
+        self.timeout = timeout
+
+    @classmethod
+    def for_url(cls, bluesky_httpserver_url, **kwargs):
+        """Return the process-wide limiter of a server, creating it with kwargs if needed.
+
+        The kwargs are ignored if the limiter already exists.
+        """
+        with cls._shared_limiters_lock:
+            rate_limiter = cls._shared_limiters.get(bluesky_httpserver_url)
+            if rate_limiter is None:
+                rate_limiter = cls._shared_limiters[bluesky_httpserver_url] = cls(
+                    **kwargs
+                )
+            return rate_limiter
+
+    @classmethod
+    def remove_url(cls, bluesky_httpserver_url):
+        """Forget the process-wide limiter of a server."""
+        with cls._shared_limiters_lock:
+            cls._shared_limiters.pop(bluesky_httpserver_url, None)
+
+    def _bucket(self, method):
+        return self.read_bucket if method == "GET" else self.write_bucket
+
+    def _max_wait(self):
+        return self.timeout if self.blocking else 0.0
+
+    def _rejected(self, method, endpoint):
+        return RateLimitExceeded(f"rate limit exceeded for {method} {endpoint}")
+
+    def acquire(self, method, endpoint=""):
+        """Wait until a request may be sent, or raise RateLimitExceeded."""
+        token_bucket = self._bucket(method)
+        if token_bucket is not None and not token_bucket.acquire(
+            timeout=self._max_wait()
+        ):
+            raise self._rejected(method, endpoint)
+
+    async def acquire_async(self, method, endpoint=""):
+        """Like acquire, without blocking the event loop."""
+        token_bucket = self._bucket(method)
+        if token_bucket is not None and not await token_bucket.acquire_async(
+            timeout=self._max_wait()
+        ):
+            raise self._rejected(method, endpoint)
+
+    def stats(self):
+        """Report the TokenBucket stats of the read and write buckets."""
+        return {
+            bucket_name: token_bucket.stats()
+            for bucket_name, token_bucket in (
+                ("read", self.read_bucket),
+                ("write", self.write_bucket),
+            )
+            if token_bucket is not None
+        }
@@ -0,0 +1,200 @@
+import bisect
+
+
+def longest_increasing_subsequence(sequence):
+    """Return the indices of a longest strictly increasing subsequence of sequence."""
+    # tail_indices[k] is the index of the smallest tail of an increasing subsequence of length k + 1
+    tail_indices = []
+    tail_values = []
+    predecessors = [None] * len(sequence)
+    for index, value in enumerate(sequence):
+        length = bisect.bisect_left(tail_values, value)
+        if length > 0:
+            predecessors[index] = tail_indices[length - 1]
+        if length == len(tail_values):
+            tail_indices.append(index)
+            tail_values.append(value)
+        else:
+            tail_indices[length] = index
+            tail_values[length] = value
+
+    subsequence = []
+    index = tail_indices[-1] if tail_indices else None
+    while index is not None:
+        subsequence.append(index)
+        index = predecessors[index]
+    subsequence.reverse()
+    return subsequence
+
+
+class QueueEdits:
+    """Remove, move and add operations that turn the current queue into a desired queue.
+
+    Attributes
+    ----------
+    remove_uids: list of str
+        uids of queue items that are not in the desired queue
+    steps: list of tuples
+        ("move" or "add", desired indices, anchor) where desired indices are consecutive
+        positions in the desired queue to be placed right after the desired queue entry
+        at position anchor, or at the front of the queue if anchor is None
+    """
+
+    def __init__(self, desired_entries, remove_uids, steps):
+        # uid of an existing item, or the item dict of a new item, per desired queue entry
+        self._desired_entries = desired_entries
+        self.remove_uids = remove_uids
+        self.steps = steps
+        self.batch_results = []
+
+    def __len__(self):
+        return bool(self.remove_uids) + len(self.steps)
+
+    def __repr__(self):
+        moved_count = sum(
+            len(desired_indices)
+            for step_type, desired_indices, _ in self.steps
+            if step_type == "move"
+        )
+        added_count = sum(
+            len(desired_indices)
+            for step_type, desired_indices, _ in self.steps
+            if step_type == "add"
+        )
+        return (
+            f"{self.__class__.__name__}(removed={len(self.remove_uids)}, "
+            f"moved={moved_count}, added={added_count}, requests={len(self)})"
+        )
+
+    def apply(self, session):
+        """Apply the edits with the batch endpoints of session.
+
+        Edits stop at the first rejected request.
+
+        Returns
+        -------
+            list of BatchResult, one per request, also kept as the batch_results attribute
+        """
+        batch_results = self.batch_results = []
+        desired_uids = [
+            desired_entry if isinstance(desired_entry, str) else None
+            for desired_entry in self._desired_entries
+        ]
+
+        if self.remove_uids:
+            batch_results.append(session.queue_item_remove_batch(self.remove_uids))
+            if not batch_results[-1].success:
+                return batch_results
+
+        for step_type, desired_indices, anchor in self.steps:
+            destination = (
+                {"after_uid": desired_uids[anchor]} if anchor is not None else None
+            )
+            if step_type == "move":
+                if destination is None:
+                    destination = {"pos_dest": "front"}
+                batch_result = session.queue_item_move_batch(
+                    [desired_uids[desired_index] for desired_index in desired_indices],
+                    **destination,
+                )
+            else:
+                if destination is None:
+                    destination = {"pos": "front"}
+                batch_result = session.queue_item_add_batch(
+                    [
+                        self._desired_entries[desired_index]
+                        for desired_index in desired_indices
+                    ],
+                    **destination,
+                )
+                if batch_result.success:
+                    for desired_index, added_item in zip(
+                        desired_indices, batch_result.items
+                    ):
+                        desired_uids[desired_index] = added_item["item_uid"]
+            batch_results.append(batch_result)
+            if not batch_result.success:
+                break
+
+        return batch_results
+
+
+def plan_queue_edits(current_queue, desired_queue):
+    """Compute a small set of edits that turns current_queue into desired_queue.
+
+    Items of the current queue that keep their relative order, a longest increasing
+    subsequence of their current positions, are not touched. The other existing items
+    are moved and new items are added in runs of consecutive desired entries, so each
+    run costs one batch request.
+
+    Parameters
+    ----------
+    current_queue: list of dict
+        the "items" of a queue_get() response
+    desired_queue: list of str or dict
+        uids of current queue items, current queue items (dicts with their "item_uid"),
+        or new items (dicts without an "item_uid" found in the current queue)
+
+    Returns
+    -------
+        QueueEdits
+    """
+    current_positions = {
+        queue_item["item_uid"]: position
+        for position, queue_item in enumerate(current_queue)
+    }
+
+    desired_entries = []
+    for desired_item in desired_queue:
+        if isinstance(desired_item, str):
+            if desired_item not in current_positions:
+                raise ValueError(f"item uid '{desired_item}' is not in the queue")
+            desired_entries.append(desired_item)
+        elif desired_item.get("item_uid") in current_positions:
+            desired_entries.append(desired_item["item_uid"])
+        else:
+            desired_entries.append(
+                {key: value for key, value in desired_item.items() if key != "item_uid"}
+            )
+
+    existing_desired_indices = [
+        desired_index
+        for desired_index, desired_entry in enumerate(desired_entries)
+        if isinstance(desired_entry, str)
+    ]
+    existing_desired_uids = [
+        desired_entries[desired_index] for desired_index in existing_desired_indices
+    ]
+    if len(set(existing_desired_uids)) != len(existing_desired_uids):
+        raise ValueError("the desired queue contains an item uid more than once")
+
+    stationary_desired_indices = {
+        existing_desired_indices[subsequence_index]
+        for subsequence_index in longest_increasing_subsequence(
+            [current_positions[uid] for uid in existing_desired_uids]
+        )
+    }
+
+    desired_uid_set = set(existing_desired_uids)
+    remove_uids = [
+        queue_item["item_uid"]
+        for queue_item in current_queue
+        if queue_item["item_uid"] not in desired_uid_set
+    ]
+
+    steps = []
+    for desired_index, desired_entry in enumerate(desired_entries):
+        if desired_index in stationary_desired_indices:
+            continue
+        step_type = "move" if isinstance(desired_entry, str) else "add"
+        if (
+            steps
+            and steps[-1][0] == step_type
+            and steps[-1][1][-1] == desired_index - 1
+        ):
+            steps[-1][1].append(desired_index)
+        else:
+            anchor = desired_index - 1 if desired_index > 0 else None
+            steps.append((step_type, [desired_index], anchor))
+
+    return QueueEdits(desired_entries, remove_uids, steps)
@@ -0,0 +1,142 @@
+_NOT_DECODED = object()
+
+
+class _JsonMemo:
+    """json() of one response, decoding the body on the first call without arguments."""
+
+    __slots__ = ("_response", "_codec", "_decoded_json")
+
+    def __init__(self, response, codec=None):
+        self._response = response
+        self._codec = codec
+        self._decoded_json = _NOT_DECODED
+
+    def __call__(self, **kwargs):
+        response = self._response
+        # the json() of the response class, not this instance attribute
+        class_json = type(response).json
+        if kwargs:
+            return class_json(response, **kwargs)
+        if self._decoded_json is _NOT_DECODED:
+            try:
+                self._decoded_json = self._codec.loads(response.content)
+            except (AttributeError, ValueError):
+                # no codec, or let the response class decode and raise its own errors
+                self._decoded_json = class_json(response)
+        return self._decoded_json
+
+    def __reduce__(self):
+        # pickled with the response by responses that pickle their __dict__
+        return (self.__class__, (self._response, self._codec))
+
+
+def memoize_json(response, codec=None):
+    """Make response.json() decode the body on the first call only, with codec if specified.
+
+    The memo is a json attribute of the response, the response class is unchanged. Every
+    call without arguments returns the same object, callers must not modify it: with
+    use_cache or coalesce_reads the response is handed to several callers.
+    """
+    if not isinstance(response.__dict__.get("json"), _JsonMemo):
+        response.json = _JsonMemo(response, codec)
+    return response
+
+
+class _ResponseModel:
+    """Base for typed endpoint results, fields are filled from the response JSON.
+
+    Fields missing from the response are None, fields not known to the model are kept
+    in the extra dictionary. The response attribute refers to the raw response, set it to
+    None to release the response body when keeping many results.
+    """
+
+    __slots__ = ("response", "extra")
+    _fields = ()
+
+    def __init__(self, response_json, response=None):
+        self.response = response
+        for field in self._fields:
+            setattr(self, field, response_json.get(field))
+        self.extra = {
+            key: value
+            for key, value in response_json.items()
+            if key not in self._fields
+        }
+
+    @classmethod
+    def from_response(cls, response):
+        return cls(response.json(), response=response)
+
+    def as_dict(self):
+        model_dict = {field: getattr(self, field) for field in self._fields}
+        model_dict.update(self.extra)
+        return model_dict
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        fields = ", ".join(
+            f"{field}={getattr(self, field)!r}" for field in self._repr_fields
+        )
+        return f"{self.__class__.__name__}({fields})"
+
+
+class QueueStatus(_ResponseModel):
+    """Typed status() result."""
+
+    _fields = (
+        "msg",
+        "items_in_queue",
+        "items_in_history",
+        "running_item_uid",
+        "manager_state",
+        "queue_stop_pending",
+        "worker_environment_exists",
+        "re_state",
+        "pause_pending",
+        "run_list_uid",
+        "plan_queue_uid",
+        "plan_history_uid",
+        "devices_allowed_uid",
+        "plans_allowed_uid",
+        "plan_queue_mode",
+    )
+    __slots__ = _fields
+    _repr_fields = (
+        "manager_state",
+        "re_state",
+        "items_in_queue",
+        "running_item_uid",
+        "worker_environment_exists",
+    )
+
+
+class PlanQueue(_ResponseModel):
+    """Typed queue_get() result."""
+
+    _fields = ("success", "msg", "items", "running_item", "plan_queue_uid")
+    __slots__ = _fields
+    _repr_fields = ("plan_queue_uid", "running_item")
+
+    def __len__(self):
+        return len(self.items or ())
+
+    def __repr__(self):
+        return f"{super().__repr__()[:-1]}, items=<{len(self)} items>)"
+
+
+class PlanHistory(_ResponseModel):
+    """Typed history_get() result."""
+
+    _fields = ("success", "msg", "items", "plan_history_uid")
+    __slots__ = _fields
+    _repr_fields = ("plan_history_uid",)
+
+    def __len__(self):
+        return len(self.items or ())
+
+    def __repr__(self):
+        return f"{super().__repr__()[:-1]}, items=<{len(self)} items>)"
@@ -0,0 +1,395 @@
+import logging
+import threading
+import time as ttime
+
+import requests
+
+from .wait import poll_intervals
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+def retry_after_seconds(response_headers):
+    """Seconds from a Retry-After response header, None if it is missing or a date."""
+    try:
+        return max(float(response_headers.get("Retry-After")), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def replayable_body(request_kwargs):
+    """Return True if the body of a request can be sent again, eg. not a file stream."""
+    data = request_kwargs.get("data")
+    return data is None or isinstance(data, (bytes, bytearray, str, dict, list, tuple))
+
+
+class RetryBudget:
+    """Limits retries to a fraction of requests, so retries cannot multiply the load.
+
+    Every request deposits ratio retries and the budget refills by
+    min_retries_per_second, every retry withdraws one. The balance is capped at
+    max_balance.
+
+    Parameters
+    ----------
+    ratio: float
+        retries allowed per request
+    min_retries_per_second: float
+        retries allowed regardless of the number of requests
+    max_balance: float
+        maximum number of retries saved up
+    """
+
+    def __init__(self, ratio=0.2, min_retries_per_second=1.0, max_balance=10.0):
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.max_balance = max_balance
+        self._lock = threading.Lock()
+        self._balance = max_balance
+        self._refill_time = ttime.monotonic()
+
+    def _refill(self, deposit=0.0):
+        now = ttime.monotonic()
+        self._balance = min(
+            self._balance
+            + deposit
+            + (now - self._refill_time) * self.min_retries_per_second,
+            self.max_balance,
+        )
+        self._refill_time = now
+
+    def record_request(self):
+        with self._lock:
+            self._refill(self.ratio)
+
+    def try_withdraw(self):
+        """Return True and withdraw a retry if the budget allows one."""
+        with self._lock:
+            self._refill()
+            if self._balance < 1.0:
+                return False
+            self._balance -= 1.0
+            return True
+
+
+class RetryPolicy:
+    """When and how often a session retries a failed request.
+
+    A request is retried after a connection failure, a timeout or a response with a
+    status code in retry_status_codes, if
+
+    - it has been retried fewer than max_retries times,
+    - it never reached the server, or it is a GET or a POST to one of
+      idempotent_endpoints, which have the same effect when repeated,
+    - its body can be sent again, and
+    - the retry budget allows it.
+
+    Retries wait for exponentially growing, jittered intervals like wait_for_status,
+    or for the seconds of a Retry-After response header if that is longer.
+
+    Parameters
+    ----------
+    max_retries: int
+    initial_interval, max_interval: float
+        seconds to wait before the first retry and at most before any retry
+    backoff_factor: float
+    jitter: float
+        intervals are stretched or shrunk randomly by up to this fraction
+    retry_status_codes: iterable of int
+    idempotent_endpoints: iterable of str, optional
+        POST endpoints safe to repeat, by default IDEMPOTENT_ENDPOINTS
+    budget: RetryBudget, optional
+        None allows every retry
+    """
+
+    # endpoints like environment/open or queue/start are not included, repeating
+    # them after the first request took effect returns an error
+    IDEMPOTENT_ENDPOINTS = frozenset(
+        {
+            "queue/mode/set",
+            "queue/clear",
+            "queue/stop",
+            "queue/stop/cancel",
+            "history/clear",
+        }
+    )
+
+    def __init__(
+        self,
+        max_retries=3,
+        initial_interval=0.1,
+        max_interval=5.0,
+        backoff_factor=2.0,
+        jitter=0.1,
+        retry_status_codes=(502, 503, 504),
+        idempotent_endpoints=None,
+        budget=None,
+    ):
+        self.max_retries = max_retries
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.retry_status_codes = frozenset(retry_status_codes)
+        self.idempotent_endpoints = (
+            self.IDEMPOTENT_ENDPOINTS
+            if idempotent_endpoints is None
+            else frozenset(idempotent_endpoints)
+        )
+        self.budget = budget
+
+    def is_idempotent(self, method, endpoint):
+        return method == "GET" or endpoint in self.idempotent_endpoints
+
+    def intervals(self):
+        """Generate the seconds to wait before each retry of a request."""
+        return poll_intervals(
+            self.initial_interval, self.max_interval, self.backoff_factor, self.jitter
+        )
+
+    def record_request(self):
+        if self.budget is not None:
+            self.budget.record_request()
+
+    def should_retry(
+        self, method, endpoint, retries, request_sent=True, status_code=None
+    ):
+        """Return True if a request that failed after retries retries is retried.
+
+        Parameters
+        ----------
+        method, endpoint: str
+        retries: int
+            number of retries of the request so far
+        request_sent: bool
+            False if the request failed before it was sent, eg. connection refused
+        status_code: int, optional
+            status code of the response, None if the request raised
+        """
+        if retries >= self.max_retries:
+            return False
+        if status_code is not None and status_code not in self.retry_status_codes:
+            return False
+        if request_sent and not self.is_idempotent(method, endpoint):
+            return False
+        return self.budget is None or self.budget.try_withdraw()
+
+
+class CircuitBreaker:
+    """Fails requests fast while a server is down.
+
+    Connection failures, timeouts and 5xx responses count as failures. After
+    failure_threshold consecutive failures the circuit opens and requests raise
+    CircuitOpenError without being sent. After recovery_timeout seconds one trial
+    request is let through: if it succeeds the circuit closes, otherwise it opens
+    again. Share a breaker between the sessions of one server so they all back off.
+
+    Parameters
+    ----------
+    failure_threshold: int
+    recovery_timeout: float
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, recovery_timeout=10.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_time = None
+        self._trial_in_progress = False
+        self.rejected_requests = 0
+        self.times_opened = 0
+
+    def _update_state(self):
+        if (
+            self._state == self.OPEN
+            and ttime.monotonic() - self._opened_time >= self.recovery_timeout
+        ):
+            self._state = self.HALF_OPEN
+
+    @property
+    def state(self):
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def before_request(self):
+        """Raise CircuitOpenError unless a request may be sent now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return
+            self._update_state()
+            if self._state == self.HALF_OPEN and not self._trial_in_progress:
+                self._trial_in_progress = True
+                return
+            self.rejected_requests += 1
+            raise CircuitOpenError(
+                f"circuit breaker is open after {self._consecutive_failures} "
+                "consecutive failures"
+            )
+
+    @staticmethod
+    def is_failure(status_code):
+        """Return True if a response with status_code counts as a failure."""
+        return status_code >= 500
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_progress = False
+
+    def release_trial(self):
+        """Let another trial request through after one that ended without an outcome."""
+        with self._lock:
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._trial_in_progress = False
+            if (
+                self._state == self.HALF_OPEN
+                or self._consecutive_failures >= self.failure_threshold
+            ):
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_time = ttime.monotonic()
+
+    def stats(self):
+        with self._lock:
+            self._update_state()
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "times_opened": self.times_opened,
+                "rejected_requests": self.rejected_requests,
+            }
+
+
+class RequestAttempts:
+    """Retry and circuit breaker bookkeeping for the attempts of one request.
+
+    The sessions only send the request and sleep, the decisions are made here:
+
+        request_attempts = RequestAttempts(method, endpoint, request_kwargs, ...)
+        while True:
+            request_attempts.before_attempt()
+            try:
+                response = send_request()
+            except TransientError as ex:
+                retry_interval = request_attempts.failed(ex, request_sent=...)
+                if retry_interval is None:
+                    raise
+            except BaseException:
+                request_attempts.aborted()
+                raise
+            else:
+                retry_interval = request_attempts.responded(response)
+                if retry_interval is None:
+                    return response
+            sleep(retry_interval)
+
+    Parameters
+    ----------
+    method, endpoint: str
+    request_kwargs: dict
+        keyword arguments of the request, to check the body can be sent again
+    retry_policy: RetryPolicy, optional
+    circuit_breaker: CircuitBreaker, optional
+    metrics: SessionMetrics, optional
+        retries are recorded with record_retry()
+    log: logging.Logger, optional
+    """
+
+    def __init__(
+        self,
+        method,
+        endpoint,
+        request_kwargs,
+        retry_policy=None,
+        circuit_breaker=None,
+        metrics=None,
+        log=None,
+    ):
+        self.method = method
+        self.endpoint = endpoint
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.metrics = metrics
+        self.log = log if log is not None else logging.getLogger(__name__)
+        self.retries = 0
+        self._retryable = retry_policy is not None and replayable_body(request_kwargs)
+        if retry_policy is not None:
+            retry_policy.record_request()
+            self._retry_intervals = retry_policy.intervals()
+
+    def before_attempt(self):
+        """Raise CircuitOpenError unless the circuit breaker lets the attempt through."""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request()
+
+    def _should_retry(self, **kwargs):
+        return self._retryable and self.retry_policy.should_retry(
+            self.method, self.endpoint, self.retries, **kwargs
+        )
+
+    def _retry(self, retry_interval):
+        if self.metrics is not None:
+            self.metrics.record_retry(self.method, self.endpoint)
+        self.retries += 1
+        return retry_interval
+
+    def failed(self, exception, request_sent=True):
+        """Record a transient failure, return the seconds to wait before retrying or None."""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure()
+        if not self._should_retry(request_sent=request_sent):
+            return None
+        retry_interval = next(self._retry_intervals)
+        self.log.info(
+            "%s %s failed with %r, retrying in %.3fs",
+            self.method,
+            self.endpoint,
+            exception,
+            retry_interval,
+        )
+        return self._retry(retry_interval)
+
+    def aborted(self):
+        """Record an attempt interrupted by an exception that is not a transport error.
+
+        eg. KeyboardInterrupt or a cancelled task, which says nothing about the server.
+        """
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.release_trial()
+
+    def responded(self, response):
+        """Record a response, return the seconds to wait before retrying or None."""
+        status_code = response.status_code
+        if self.circuit_breaker is not None:
+            if self.circuit_breaker.is_failure(status_code):
+                self.circuit_breaker.record_failure()
+            else:
+                self.circuit_breaker.record_success()
+        if not self._should_retry(status_code=status_code):
+            return None
+        retry_interval = max(
+            next(self._retry_intervals), retry_after_seconds(response.headers) or 0.0
+        )
+        self.log.info(
+            "%s %s returned status code %d, retrying in %.3fs",
+            self.method,
+            self.endpoint,
+            status_code,
+            retry_interval,
+        )
+        return self._retry(retry_interval)
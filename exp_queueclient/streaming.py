@@ -0,0 +1,226 @@
+import codecs
+import json
+import os
+import uuid
+
+
+class MultipartFileStream:
+    """A multipart/form-data request body that reads the file as it is sent.
+
+    requests sends objects with read() and __len__ piece by piece with a
+    Content-Length header, so the file is never held in memory.
+
+    Parameters
+    ----------
+    file_path: str
+        file to upload
+    file_field_name: str
+        form field name of the file
+    form_fields: dict, optional
+        additional form fields, None values are left out
+    chunk_size: int
+        maximum number of bytes returned by each read()
+    progress_callback: callable, optional
+        called as progress_callback(bytes_sent, total_bytes) after each read()
+    """
+
+    def __init__(
+        self,
+        file_path,
+        file_field_name,
+        form_fields=None,
+        chunk_size=64 * 1024,
+        progress_callback=None,
+    ):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self._chunk_size = chunk_size
+        self._progress_callback = progress_callback
+
+        preamble = b""
+        for form_field_name, form_field_value in (form_fields or {}).items():
+            if form_field_value is None:
+                continue
+            preamble += (
+                f"--{self.boundary}\r\n"
+                f'Content-Disposition: form-data; name="{form_field_name}"\r\n\r\n'
+                f"{form_field_value}\r\n"
+            ).encode()
+        file_name = os.path.basename(file_path)
+        preamble += (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{file_field_name}"; filename="{file_name}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+
+        self._parts = [
+            preamble,
+            file_path,
+            f"\r\n--{self.boundary}--\r\n".encode(),
+        ]
+        self._length = len(preamble) + os.path.getsize(file_path) + len(self._parts[2])
+        self._bytes_sent = 0
+        self._part_index = 0
+        self._part_position = 0
+        self._file = None
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self._chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self._chunk_size:
+            size = self._chunk_size
+
+        chunk = b""
+        while not chunk and self._part_index < len(self._parts):
+            part = self._parts[self._part_index]
+            if isinstance(part, bytes):
+                chunk_start = self._part_position
+                chunk_end = chunk_start + size
+                chunk = part[chunk_start:chunk_end]
+                self._part_position += len(chunk)
+                part_done = self._part_position >= len(part)
+            else:
+                if self._file is None:
+                    self._file = open(part, "rb")
+                chunk = self._file.read(size)
+                part_done = not chunk
+                if part_done:
+                    self._file.close()
+            if part_done:
+                self._part_index += 1
+                self._part_position = 0
+
+        self._bytes_sent += len(chunk)
+        if chunk and self._progress_callback is not None:
+            self._progress_callback(self._bytes_sent, self._length)
+        return chunk
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+_whitespace = " \t\r\n"
+_number_characters = "0123456789.eE+-"
+
+
+def iter_json_object_members(byte_chunks):
+    """Parse a JSON object from an iterable of byte chunks as the chunks arrive.
+
+    Only the member being parsed is held in memory, array members are parsed and
+    yielded one element at a time.
+
+    Yields
+    ------
+        (key, value) for each member of the object, or (key, element) for each
+        element of an array member
+    """
+    json_decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    byte_chunks = iter(byte_chunks)
+    buffer = ""
+    position = 0
+    end_of_input = False
+
+    def more():
+        nonlocal buffer, position, end_of_input
+        for byte_chunk in byte_chunks:
+            text = text_decoder.decode(byte_chunk)
+            if text:
+                buffer = buffer[position:] + text
+                position = 0
+                return
+        end_of_input = True
+        buffer = buffer[position:] + text_decoder.decode(b"", final=True)
+        position = 0
+
+    def next_token():
+        """Skip whitespace and return the next character without consuming it."""
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in _whitespace:
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if end_of_input:
+                raise ValueError("unexpected end of JSON input")
+            more()
+
+    def expect(characters):
+        nonlocal position
+        token = next_token()
+        if token not in characters:
+            raise ValueError(f"expected one of {characters!r} but found {token!r}")
+        position += 1
+        return token
+
+    def decode_value():
+        nonlocal position
+        next_token()
+        while True:
+            try:
+                value, value_end = json_decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if end_of_input:
+                    raise
+            else:
+                # a value at the end of the buffer may continue in the next chunk, and
+                # so may a number followed only by characters of a number, eg. "1."
+                value_may_continue = value_end == len(buffer) or (
+                    isinstance(value, (int, float))
+                    and not buffer[value_end:].strip(_number_characters)
+                )
+                if end_of_input or not value_may_continue:
+                    position = value_end
+                    return value
+            more()
+
+    expect("{")
+    if next_token() == "}":
+        return
+    while True:
+        key = decode_value()
+        expect(":")
+        if next_token() == "[":
+            position += 1
+            if next_token() == "]":
+                position += 1
+            else:
+                while True:
+                    yield key, decode_value()
+                    if expect(",]") == "]":
+                        break
+        else:
+            yield key, decode_value()
+        if expect(",}") == "}":
+            return
+
+
+def iter_json_lines(byte_chunks, loads=json.loads):
+    """Parse newline-delimited JSON from an iterable of byte chunks as the chunks arrive.
+
+    Only an incomplete line is kept between chunks, empty lines are skipped.
+
+    Yields
+    ------
+        the decoded JSON value of each line
+    """
+    buffer = b""
+    for byte_chunk in byte_chunks:
+        buffer += byte_chunk
+        if b"\n" not in byte_chunk:
+            continue
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield loads(line)
+    if buffer.strip():
+        yield loads(buffer)
@@ -1,3 +1,4 @@
+import os
 import time as ttime
 
 from contextlib import contextmanager
@@ -5,15 +6,38 @@ from contextlib import contextmanager
 import pytest
 
 from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.fake_httpserver import FakeBlueskyHttpserver
 
 
 @pytest.fixture
 def bluesky_httpserver_url():
-    return "http://localhost:60610"
+    """
+    URL of the bluesky-httpserver under test.
+
+    Set the BLUESKY_HTTPSERVER_URL environment variable, eg. to "http://localhost:60610",
+    to run the tests against a live server started with the scripts in files/.
+    Otherwise every test gets a fresh in-process FakeBlueskyHttpserver.
+    """
+    live_bluesky_httpserver_url = os.environ.get("BLUESKY_HTTPSERVER_URL")
+    if live_bluesky_httpserver_url:
+        yield live_bluesky_httpserver_url
+    else:
+        with FakeBlueskyHttpserver(time_scale=0.1) as fake_httpserver:
+            yield fake_httpserver.url
+
+
+@pytest.fixture
+def bluesky_httpserver_settle_time():
+    """
+    Seconds to wait for a live server to settle after resetting it.
+    """
+    return 3 if os.environ.get("BLUESKY_HTTPSERVER_URL") else 0
 
 
 @pytest.fixture
-def clean_bluesky_httpserver_session(bluesky_httpserver_url):
+def clean_bluesky_httpserver_session(
+    bluesky_httpserver_url, bluesky_httpserver_settle_time
+):
     """
     A factory-as-a-fixture-and-context-manager.
     """
@@ -30,7 +54,7 @@ def clean_bluesky_httpserver_session(bluesky_httpserver_url):
             session.environment_destroy()
             session.history_clear()
             session.queue_clear()
-            ttime.sleep(3)
+            ttime.sleep(bluesky_httpserver_settle_time)
 
             yield None
 
@@ -38,6 +62,6 @@ def clean_bluesky_httpserver_session(bluesky_httpserver_url):
             session.history_clear()
             session.queue_clear()
             session.environment_destroy()
-            ttime.sleep(3)
+            ttime.sleep(bluesky_httpserver_settle_time)
 
     return _clean_bluesky_httpserver_session
@@ -0,0 +1,55 @@
+import asyncio
+
+from exp_queueclient import AsyncBlueskyHttpserverSession
+from exp_queueclient.fake_httpserver import FakeBlueskyHttpserver
+from exp_queueclient.retry import RetryPolicy
+
+
+def test_status(bluesky_httpserver_url):
+    async def _test_status():
+        session = AsyncBlueskyHttpserverSession(
+            bluesky_httpserver_url=bluesky_httpserver_url
+        )
+        try:
+            status_response = await session.status()
+        finally:
+            await session.aclose()
+        assert status_response.json()["worker_environment_exists"] is False
+
+    asyncio.run(_test_status())
+
+
+def test_concurrent_status(bluesky_httpserver_url):
+    async def _test_concurrent_status():
+        session = AsyncBlueskyHttpserverSession(
+            bluesky_httpserver_url=bluesky_httpserver_url
+        )
+        try:
+            status_responses = await asyncio.gather(
+                *[session.status() for _ in range(10)]
+            )
+        finally:
+            await session.aclose()
+        assert all(
+            status_response.status_code == 200 for status_response in status_responses
+        )
+
+    asyncio.run(_test_concurrent_status())
+
+
+def test_retry():
+    async def _test_retry(fake_httpserver):
+        session = AsyncBlueskyHttpserverSession(
+            bluesky_httpserver_url=fake_httpserver.url,
+            retry_policy=RetryPolicy(initial_interval=0.01),
+        )
+        fake_httpserver.fail_next_requests(2, status_code=503)
+        try:
+            status_response = await session.status()
+        finally:
+            await session.aclose()
+        assert status_response.status_code == 200
+        assert session.metrics.snapshot()["GET status"]["retries"] == 2
+
+    with FakeBlueskyHttpserver() as fake_httpserver:
+        asyncio.run(_test_retry(fake_httpserver))
@@ -0,0 +1,144 @@
+import json
+
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.batch import iter_encoded_chunks
+
+
+def test_iter_encoded_chunks_max_items():
+    items = [{"name": "count", "args": [[f"det{i}"]]} for i in range(5)]
+    chunks = list(iter_encoded_chunks(items, max_chunk_items=2, max_chunk_bytes=10**6))
+    assert [item_count for item_count, _ in chunks] == [2, 2, 1]
+    decoded_items = [
+        decoded_item
+        for _, encoded_items in chunks
+        for decoded_item in json.loads(b"[%s]" % encoded_items)
+    ]
+    assert decoded_items == items
+
+
+def test_iter_encoded_chunks_max_bytes():
+    items = [{"name": "count", "args": ["x" * 100]} for _ in range(10)]
+    chunks = list(iter_encoded_chunks(items, max_chunk_items=100, max_chunk_bytes=300))
+    assert sum(item_count for item_count, _ in chunks) == 10
+    assert all(len(encoded_items) <= 300 for _, encoded_items in chunks)
+
+    # an oversized item gets a chunk of its own
+    chunks = list(iter_encoded_chunks(items, max_chunk_items=100, max_chunk_bytes=10))
+    assert [item_count for item_count, _ in chunks] == [1] * 10
+
+
+def test_queue_item_add_batch(clean_bluesky_httpserver_session, bluesky_httpserver_url):
+    with clean_bluesky_httpserver_session():
+        session = BlueskyHttpserverSession(
+            bluesky_httpserver_url=bluesky_httpserver_url
+        )
+        items = [
+            {"name": "count", "args": [["det1", "det2"]], "kwargs": {"num": i}}
+            for i in range(1, 8)
+        ]
+        batch_result = session.queue_item_add_batch(
+            items, max_chunk_items=3, pipeline=True
+        )
+        assert batch_result.success
+        assert len(batch_result.responses) == 3
+        assert len(batch_result.results) == 7
+
+        queue_items = session.queue_get().json()["items"]
+        assert [queue_item["kwargs"]["num"] for queue_item in queue_items] == list(
+            range(1, 8)
+        )
+
+        # the session keeps one encoding thread for its batches until close()
+        chunk_executor = session._chunk_executor
+        assert session.queue_item_add_batch(items[:2], max_chunk_items=1, pipeline=True)
+        assert session._chunk_executor is chunk_executor
+        session.close()
+        assert session._chunk_executor is None
+
+
+def test_queue_item_add_batch_rejected(
+    clean_bluesky_httpserver_session, bluesky_httpserver_url
+):
+    with clean_bluesky_httpserver_session():
+        session = BlueskyHttpserverSession(
+            bluesky_httpserver_url=bluesky_httpserver_url
+        )
+        items = [
+            {"name": "count", "args": [["det1"]]},
+            {"name": "no_such_plan"},
+            {"name": "count", "args": [["det2"]]},
+        ]
+        batch_result = session.queue_item_add_batch(items, max_chunk_items=2)
+        assert not batch_result.success
+        assert len(batch_result.results) == 3
+        assert batch_result.results[1]["success"] is False
+        # the second chunk is not submitted after the first one was rejected
+        assert len(batch_result.responses) == 1
+        assert session.status().json()["items_in_queue"] == 0
+
+        # with a position the following chunks are anchored to the accepted items
+        queue_item_uid = session.queue_item_add_batch(items[:1]).items[0]["item_uid"]
+        for position_kwargs in ({"pos": "front"}, {"after_uid": queue_item_uid}):
+            batch_result = session.queue_item_add_batch(
+                items, max_chunk_items=1, **position_kwargs
+            )
+            assert not batch_result.success
+            assert [result["success"] for result in batch_result.results] == [
+                True,
+                False,
+                False,
+            ]
+            assert len(batch_result.responses) == 2
+        assert session.status().json()["items_in_queue"] == 3
+
+
+def _queue_nums(session):
+    return [
+        queue_item["kwargs"]["num"]
+        for queue_item in session.queue_get().json()["items"]
+    ]
+
+
+def test_queue_item_remove_and_move_batch(
+    clean_bluesky_httpserver_session, bluesky_httpserver_url
+):
+    with clean_bluesky_httpserver_session():
+        session = BlueskyHttpserverSession(
+            bluesky_httpserver_url=bluesky_httpserver_url
+        )
+        batch_result = session.queue_item_add_batch(
+            [
+                {"name": "count", "args": [["det1"]], "kwargs": {"num": i}}
+                for i in range(6)
+            ]
+        )
+        item_uids = [item["item_uid"] for item in batch_result.items]
+
+        remove_result = session.queue_item_remove_batch([item_uids[1], item_uids[3]])
+        assert remove_result.success
+        assert len(remove_result.items) == 2
+        assert remove_result.plan_queue_uid == session.status().json()["plan_queue_uid"]
+        assert _queue_nums(session) == [0, 2, 4, 5]
+
+        move_result = session.queue_item_move_batch(
+            [item_uids[5], item_uids[4]], pos_dest="front"
+        )
+        assert move_result.success
+        assert move_result.plan_queue_uid == session.status().json()["plan_queue_uid"]
+        assert _queue_nums(session) == [5, 4, 0, 2]
+
+        # a rejected edit does not read the status
+        status_count = session.metrics.snapshot()["GET status"]["requests"]
+        remove_result = session.queue_item_remove_batch(
+            [item_uids[1]], ignore_missing=False
+        )
+        assert not remove_result.success
+        assert remove_result.plan_queue_uid is None
+        assert session.metrics.snapshot()["GET status"]["requests"] == status_count
+
+        session.queue_item_move_batch([item_uids[0]], before_uid=item_uids[5])
+        assert _queue_nums(session) == [0, 5, 4, 2]
+
+        session.queue_item_move(uid=item_uids[2], after_uid=item_uids[0])
+        session.queue_item_remove(uid=item_uids[4])
+        assert _queue_nums(session) == [0, 2, 5]
@@ -1,5 +1,3 @@
-import time as ttime
-
 from exp_queueclient import BlueskyHttpserverSession
 
 
@@ -11,7 +9,7 @@ def test_environment_context_manager(bluesky_httpserver_url):
     status_response = session.status()
     if status_response.json()["worker_environment_exists"]:
         session.environment_close()
-        ttime.sleep(5)
+        session.wait_for_status({"worker_environment_exists": False}, timeout=10)
     status_response = session.status()
     assert status_response.json()["worker_environment_exists"] is False
 
@@ -19,20 +17,17 @@ def test_environment_context_manager(bluesky_httpserver_url):
         bluesky_httpserver_url=bluesky_httpserver_url
     ) as bluesky_httpserver_session:
 
-        # it seems to be important to wait a bit before closing the environment
-        status_response = bluesky_httpserver_session.status()
-        while status_response.json()["worker_environment_exists"] is False:
-            ttime.sleep(1)
-            status_response = bluesky_httpserver_session.status()
-        assert status_response.json()["worker_environment_exists"] is True
-
-    # this pause following 'environment close' seems to be important as well
-    status_response = bluesky_httpserver_session.status()
-    while status_response.json()["worker_environment_exists"] is True:
-        ttime.sleep(1)
-        status_response = bluesky_httpserver_session.status()
+        # the environment must be open before it can be closed
+        wait_result = bluesky_httpserver_session.wait_for_status(
+            {"worker_environment_exists": True, "manager_state": "idle"}, timeout=30
+        )
+        assert wait_result.status["worker_environment_exists"] is True
 
-    assert status_response.json()["worker_environment_exists"] is False
+    # closing the environment takes a while as well
+    wait_result = bluesky_httpserver_session.wait_for_status(
+        {"worker_environment_exists": False, "manager_state": "idle"}, timeout=30
+    )
+    assert wait_result.status["worker_environment_exists"] is False
 
 
 def test_status(bluesky_httpserver_url):
@@ -56,9 +51,10 @@ def test_plan(clean_bluesky_httpserver_session, bluesky_httpserver_url):
             bluesky_httpserver_url
         ) as bluesky_httpserver_session_:
             # important to wait for environment to open
-            #   is there a better way?
-            #   session.wait_for_status("worker_environment_exists", True) ?
-            ttime.sleep(3)
+            assert bluesky_httpserver_session_.wait_for_status(
+                {"worker_environment_exists": True, "manager_state": "idle"},
+                timeout=30,
+            )
 
             status_response = bluesky_httpserver_session_.status()
             assert status_response.json()["items_in_queue"] == 0
@@ -82,15 +78,52 @@ def test_plan(clean_bluesky_httpserver_session, bluesky_httpserver_url):
 
             # wait for the queue to start
             bluesky_httpserver_session_.wait_for_status(
-                target_status={"running_item_uid": 0}
+                target_status={
+                    "running_item_uid": lambda running_item_uid: running_item_uid
+                    is not None
+                },
+                timeout=10,
             )
 
             status_response = bluesky_httpserver_session_.status()
             running_item_uid = status_response.json()["running_item_uid"]
             assert running_item_uid is not None
 
-            bluesky_httpserver_session_.wait_for_status(
-                target_status={"running_item_uid": None}
+            assert bluesky_httpserver_session_.wait_for_status(
+                target_status={"running_item_uid": None}, timeout=30
             )
 
             # check the history for our plan
+            history_items = bluesky_httpserver_session_.history_get().json()["items"]
+            assert history_items[-1]["item_uid"] == running_item_uid
+            assert history_items[-1]["result"]["exit_status"] == "completed"
+
+
+def test_connection_pool_reuse(bluesky_httpserver_url):
+    session = BlueskyHttpserverSession(bluesky_httpserver_url=bluesky_httpserver_url)
+    for _ in range(5):
+        session.status()
+
+    pool_stats = session.pool_stats()
+    assert pool_stats["requests"] == 5
+    assert pool_stats["misses"] == 1
+    assert pool_stats["hits"] == 4
+
+    # counters survive closing the pooled connections
+    session.close()
+    session.status()
+    pool_stats = session.pool_stats()
+    assert pool_stats["requests"] == 6
+    assert pool_stats["misses"] == 2
+
+
+def test_connection_pool_no_keep_alive(bluesky_httpserver_url):
+    session = BlueskyHttpserverSession(
+        bluesky_httpserver_url=bluesky_httpserver_url, keep_alive=False
+    )
+    for _ in range(3):
+        session.status()
+
+    pool_stats = session.pool_stats()
+    assert pool_stats["misses"] == 3
+    assert pool_stats["hits"] == 0
@@ -0,0 +1,54 @@
+import time as ttime
+
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.cache import UidCache
+
+
+def test_uid_cache():
+    uid_cache = UidCache()
+    assert uid_cache.get("queue/get", "uid-1") is None
+
+    uid_cache.put("queue/get", "uid-1", "queue 1")
+    assert uid_cache.get("queue/get", "uid-1") == "queue 1"
+
+    # a new uid evicts the old value
+    assert uid_cache.get("queue/get", "uid-2") is None
+    assert uid_cache.get("queue/get", "uid-1") is None
+
+    assert uid_cache.stats() == {"hits": 1, "misses": 3, "evictions": 1, "entries": 0}
+
+
+def test_uid_cache_ttl():
+    uid_cache = UidCache(ttl=0.01)
+    uid_cache.put("queue/get", "uid-1", "queue 1")
+    ttime.sleep(0.02)
+    assert uid_cache.get("queue/get", "uid-1") is None
+
+
+def test_uid_cache_invalidate():
+    uid_cache = UidCache()
+    uid_cache.put("queue/get", "uid-1", "queue 1")
+    uid_cache.put("history/get", "uid-2", "history 2")
+    uid_cache.invalidate("queue/get")
+    assert uid_cache.get("queue/get", "uid-1") is None
+    assert uid_cache.get("history/get", "uid-2") == "history 2"
+    uid_cache.invalidate()
+    assert uid_cache.get("history/get", "uid-2") is None
+
+
+def test_queue_get_cached(bluesky_httpserver_url):
+    session = BlueskyHttpserverSession(
+        bluesky_httpserver_url=bluesky_httpserver_url, use_cache=True
+    )
+    queue_get_response = session.queue_get()
+    assert session.queue_get() is queue_get_response
+
+    # a status the caller already has saves the status() call
+    status_json = session.status().json()
+    assert session.queue_get(status=status_json) is queue_get_response
+
+    session.queue_item_add(item_name="count", item_args=[["det1", "det2"]])
+    assert session.queue_get() is not queue_get_response
+
+    session.queue_clear()
+    assert session.cache_stats()["hits"] == 2
@@ -0,0 +1,100 @@
+import concurrent.futures
+import threading
+import time as ttime
+
+import pytest
+
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.coalesce import SingleFlight
+from exp_queueclient.fake_httpserver import FakeBlueskyHttpserver
+
+
+def _call_concurrently(function, count):
+    barrier = threading.Barrier(count)
+
+    def call(_):
+        barrier.wait()
+        return function()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=count) as executor:
+        return list(executor.map(call, range(count)))
+
+
+def test_single_flight():
+    single_flight = SingleFlight()
+    call_count = 0
+
+    def slow_call():
+        nonlocal call_count
+        call_count += 1
+        ttime.sleep(0.2)
+        return object()
+
+    results = _call_concurrently(lambda: single_flight.call("status", slow_call), 8)
+    assert call_count == 1
+    assert all(result is results[0] for result in results)
+    assert single_flight.stats() == {"calls": 1, "shared": 7, "reused": 0}
+
+    # finished calls are not reused without a reuse window
+    assert single_flight.call("status", slow_call) is not results[0]
+    assert call_count == 2
+
+
+def test_single_flight_exception():
+    single_flight = SingleFlight(reuse_window=60)
+
+    def failing_call():
+        ttime.sleep(0.1)
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError):
+        single_flight.call("status", failing_call)
+    # exceptions are not reused
+    assert single_flight.call("status", lambda: 1) == 1
+
+
+def test_single_flight_reuse_window():
+    single_flight = SingleFlight(reuse_window=0.1)
+    assert single_flight.call("status", lambda: 1) == 1
+    assert single_flight.call("status", lambda: 2) == 1
+    assert single_flight.call("queue/get", lambda: 3) == 3
+    single_flight.invalidate()
+    assert single_flight.call("status", lambda: 4) == 4
+    ttime.sleep(0.15)
+    assert single_flight.call("status", lambda: 5) == 5
+    assert single_flight.stats() == {"calls": 4, "shared": 0, "reused": 1}
+
+
+def test_session_coalesce_reads():
+    with FakeBlueskyHttpserver() as fake_httpserver:
+        status_handler = fake_httpserver.endpoints[("GET", "status")]
+
+        def slow_status_handler(request):
+            ttime.sleep(0.2)
+            return status_handler(request)
+
+        fake_httpserver.endpoints[("GET", "status")] = slow_status_handler
+
+        session = BlueskyHttpserverSession(fake_httpserver.url, coalesce_reads=True)
+        status_responses = _call_concurrently(session.status, 8)
+        assert fake_httpserver.request_counts["status"] == 1
+        assert all(
+            status_response.json() is status_responses[0].json()
+            for status_response in status_responses
+        )
+        assert session.coalescing_stats()["shared"] == 7
+
+
+def test_session_read_reuse_window():
+    with FakeBlueskyHttpserver() as fake_httpserver:
+        session = BlueskyHttpserverSession(
+            fake_httpserver.url, coalesce_reads=True, read_reuse_window=60
+        )
+        assert session.status().json()["items_in_queue"] == 0
+        session.status()
+        assert fake_httpserver.request_counts["status"] == 1
+
+        # a post ends the reuse
+        session.queue_item_add(item_name="count", item_args=[["det1"]])
+        assert session.status().json()["items_in_queue"] == 1
+        assert fake_httpserver.request_counts["status"] == 2
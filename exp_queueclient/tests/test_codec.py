@@ -0,0 +1,81 @@
+import pytest
+
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.codec import (
+    OrjsonCodec,
+    StdlibJsonCodec,
+    default_codec,
+    json_request_kwargs,
+)
+
+
+@pytest.fixture(params=["json", "orjson"])
+def codec(request):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+        return OrjsonCodec()
+    return StdlibJsonCodec()
+
+
+def test_codec_round_trip(codec):
+    obj = {"items": [{"name": "count", "args": [["det1"]], "kwargs": {"num": 3}}]}
+    encoded = codec.dumps(obj)
+    assert isinstance(encoded, bytes)
+    assert codec.loads(encoded) == obj
+    assert codec.loads(encoded.decode()) == obj
+
+
+def test_default_codec():
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        assert isinstance(default_codec(), StdlibJsonCodec)
+    else:
+        assert isinstance(default_codec(), OrjsonCodec)
+
+
+def test_json_request_kwargs():
+    codec = StdlibJsonCodec()
+    assert json_request_kwargs(codec, {"stream": True}) == {"stream": True}
+
+    request_kwargs = json_request_kwargs(
+        codec, {"json": {"uid": "a"}, "headers": {"X-Test": "1"}}
+    )
+    assert request_kwargs == {
+        "data": b'{"uid":"a"}',
+        "headers": {"Content-Type": "application/json", "X-Test": "1"},
+    }
+
+    # httpx takes raw bytes as content
+    assert json_request_kwargs(codec, {"json": [1]}, body_keyword="content") == {
+        "content": b"[1]",
+        "headers": {"Content-Type": "application/json"},
+    }
+
+    # bytes are sent as they are
+    assert (
+        json_request_kwargs(codec, {"json": b'{"uid":"a"}'})["data"] == b'{"uid":"a"}'
+    )
+
+
+def test_session_codec(bluesky_httpserver_url, codec):
+    session = BlueskyHttpserverSession(
+        bluesky_httpserver_url=bluesky_httpserver_url, codec=codec
+    )
+    session.queue_clear()
+    queue_item_add_response = session.queue_item_add(
+        item_name="count", item_args=[["det1", "det2"]]
+    )
+    assert queue_item_add_response.json()["success"] is True
+
+    # pre-encoded request body
+    session.httpserver_post(
+        "queue/item/add",
+        json=b'{"item":{"name":"count","args":[["det1"]],"kwargs":{},"item_type":"plan"}}',
+    )
+    queue_json = session.queue_get().json()
+    assert [item["args"] for item in queue_json["items"]] == [
+        [["det1", "det2"]],
+        [["det1"]],
+    ]
+    session.queue_clear()
@@ -0,0 +1,200 @@
+import socket
+import threading
+import time as ttime
+
+import pytest
+import requests
+
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.console import ConsoleBuffer
+from exp_queueclient.fake_httpserver import FakeBlueskyHttpserver
+from exp_queueclient.streaming import iter_json_lines
+
+
+def _wait_for_streams(fake_httpserver, stream_count, timeout=5.0):
+    deadline = ttime.monotonic() + timeout
+    while fake_httpserver.request_counts.get("stream_console_output", 0) < stream_count:
+        assert ttime.monotonic() < deadline
+        ttime.sleep(0.01)
+
+
+def _in_thread(function):
+    thread = threading.Thread(target=function, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_iter_json_lines():
+    byte_chunks = [b'{"msg": "a"}\n{"ms', b'g": "b"}', b"\n\n", b'{"msg": "c"}']
+    assert [line["msg"] for line in iter_json_lines(byte_chunks)] == ["a", "b", "c"]
+
+
+def test_stream_console_output():
+    with FakeBlueskyHttpserver() as fake_httpserver:
+        session = BlueskyHttpserverSession(fake_httpserver.url)
+        console_lines = session.stream_console_output(chunk_size=7)
+
+        def write_console_output():
+            _wait_for_streams(fake_httpserver, 1)
+            fake_httpserver.console_write("first line\nsecond")
+            fake_httpserver.console_write(" line\n")
+            fake_httpserver.console_write("third line\n")
+
+        _in_thread(write_console_output)
+        assert [next(console_lines) for _ in range(3)] == [
+            "first line",
+            "second line",
+            "third line",
+        ]
+        console_lines.close()
+
+
+def test_stream_console_output_reconnect():
+    with FakeBlueskyHttpserver() as fake_httpserver:
+        session = BlueskyHttpserverSession(fake_httpserver.url)
+        console_lines = session.stream_console_output(initial_reconnect_interval=0.01)
+
+        def write_console_output():
+            _wait_for_streams(fake_httpserver, 1)
+            fake_httpserver.console_write("before\npartial")
+            fake_httpserver.console_drop_connections()
+            _wait_for_streams(fake_httpserver, 2)
+            fake_httpserver.console_write("after\n")
+
+        _in_thread(write_console_output)
+        assert [next(console_lines) for _ in range(3)] == ["before", "partial", "after"]
+        console_lines.close()
+
+
+def test_stream_console_output_no_reconnect():
+    with FakeBlueskyHttpserver() as fake_httpserver:
+        session = BlueskyHttpserverSession(fake_httpserver.url)
+        console_lines = session.stream_console_output(reconnect=False)
+
+        def write_console_output():
+            _wait_for_streams(fake_httpserver, 1)
+            fake_httpserver.console_write("line\n")
+            fake_httpserver.console_drop_connections()
+
+        _in_thread(write_console_output)
+        assert next(console_lines) == "line"
+        with pytest.raises(requests.RequestException):
+            next(console_lines)
+
+
+def test_stream_console_output_max_reconnects():
+    # nothing listens on this port
+    closed_socket = socket.socket()
+    closed_socket.bind(("127.0.0.1", 0))
+    closed_url = "http://127.0.0.1:%d" % closed_socket.getsockname()[1]
+    closed_socket.close()
+
+    session = BlueskyHttpserverSession(closed_url)
+    with pytest.raises(requests.ConnectionError):
+        next(
+            session.stream_console_output(
+                max_reconnects=2, initial_reconnect_interval=0.01
+            )
+        )
+    assert session.metrics.snapshot()["GET stream_console_output"]["errors"] == {
+        "ConnectionError": 3
+    }
+
+
+def test_stream_console_output_client_error():
+    with FakeBlueskyHttpserver() as fake_httpserver:
+        # a server without the endpoint
+        del fake_httpserver.streaming_endpoints[("GET", "stream_console_output")]
+        session = BlueskyHttpserverSession(fake_httpserver.url)
+        with pytest.raises(requests.HTTPError):
+            next(session.stream_console_output(initial_reconnect_interval=0.01))
+        metrics_snapshot = session.metrics.snapshot()
+        assert metrics_snapshot["GET stream_console_output"]["requests"] == 1
+
+
+def test_stream_console_output_ended():
+    with FakeBlueskyHttpserver() as fake_httpserver:
+        # a stream that ends without output every time
+        fake_httpserver.streaming_endpoints[("GET", "stream_console_output")] = (
+            lambda request: iter(())
+        )
+        session = BlueskyHttpserverSession(fake_httpserver.url)
+        start_time = ttime.monotonic()
+        assert (
+            list(
+                session.stream_console_output(
+                    max_reconnects=2, initial_reconnect_interval=0.05
+                )
+            )
+            == []
+        )
+        assert fake_httpserver.request_counts["stream_console_output"] == 3
+        # the reconnects back off
+        assert ttime.monotonic() - start_time >= 0.1
+
+
+def test_console_buffer_limits():
+    console_buffer = ConsoleBuffer(max_lines=3)
+    console_buffer.extend(f"line {i}" for i in range(5))
+    assert len(console_buffer) == 3
+    assert console_buffer.cursor == 5
+    assert console_buffer.first_cursor == 2
+    assert console_buffer.tail(2) == ["line 3", "line 4"]
+    assert console_buffer.tail(10) == ["line 2", "line 3", "line 4"]
+
+    console_buffer = ConsoleBuffer(max_lines=None, max_bytes=10)
+    console_buffer.extend(["abcd", "efgh", "ijkl"])
+    assert console_buffer.tail() == ["efgh", "ijkl"]
+    assert console_buffer.byte_count == 8
+    # a line longer than max_bytes is truncated
+    console_buffer.append("é" * 10)
+    assert console_buffer.tail() == ["é" * 5]
+    assert console_buffer.byte_count == 10
+
+    with pytest.raises(ValueError):
+        ConsoleBuffer(max_lines=None, max_bytes=None)
+
+
+def test_console_buffer_cursors():
+    console_buffer = ConsoleBuffer(max_lines=4)
+    console_buffer.extend(["a", "b", "c"])
+    assert console_buffer.since(1) == ["b", "c"]
+    assert console_buffer.read(1) == (["b", "c"], 3)
+    assert console_buffer.read(3, timeout=0.01) == ([], 3)
+
+    console_buffer.extend(["d", "e", "f"])
+    # lines dropped before the cursor was read are skipped
+    assert console_buffer.read(1) == (["c", "d", "e", "f"], 6)
+    assert console_buffer.search("e") == [(4, "e")]
+    console_buffer.extend(["e1", "e2"])
+    assert console_buffer.search("e", max_results=2) == [(6, "e1"), (7, "e2")]
+
+    threading.Timer(0.05, console_buffer.append, args=("g",)).start()
+    assert console_buffer.read(8, timeout=5) == (["g"], 9)
+
+    console_buffer.clear()
+    assert len(console_buffer) == 0
+    assert console_buffer.tail() == []
+    assert console_buffer.cursor == 9
+
+
+def test_console_buffer_follow():
+    with FakeBlueskyHttpserver() as fake_httpserver:
+        session = BlueskyHttpserverSession(fake_httpserver.url)
+        with ConsoleBuffer(max_lines=100).follow(
+            session, timeout=0.2, initial_reconnect_interval=0.01
+        ) as console_buffer:
+            _wait_for_streams(fake_httpserver, 1)
+            fake_httpserver.console_write("first\nsecond\n")
+            console_lines, cursor = console_buffer.read(0, timeout=5)
+            while len(console_lines) < 2:
+                more_console_lines, cursor = console_buffer.read(cursor, timeout=5)
+                console_lines += more_console_lines
+            assert console_lines == ["first", "second"]
+
+            # idle streams time out and reconnect
+            _wait_for_streams(fake_httpserver, 2)
+            fake_httpserver.console_drop_connections()
+            _wait_for_streams(fake_httpserver, 3)
+            fake_httpserver.console_write("third\n")
+            assert console_buffer.read(cursor, timeout=5) == (["third"], 3)
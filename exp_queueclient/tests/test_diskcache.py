@@ -0,0 +1,116 @@
+import os
+
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.codec import StdlibJsonCodec
+from exp_queueclient.diskcache import DiskCache
+from exp_queueclient.fake_httpserver import FakeBlueskyHttpserver
+
+
+def test_disk_cache(tmp_path):
+    disk_cache = DiskCache(directory=str(tmp_path))
+    document = {"plans_allowed": {"count": {"name": "count"}}, "plans_allowed_uid": "a"}
+    assert disk_cache.get("http://localhost:60610", "plans/allowed", "a") is None
+
+    disk_cache.put("http://localhost:60610", "plans/allowed", "a", document)
+    assert disk_cache.get("http://localhost:60610/", "plans/allowed", "a") == document
+    # another process, with another codec, reads the same file
+    assert (
+        DiskCache(directory=str(tmp_path), codec=StdlibJsonCodec()).get(
+            "http://localhost:60610", "plans/allowed", "a"
+        )
+        == document
+    )
+    assert disk_cache.get("http://localhost:60610", "plans/allowed", "b") is None
+    assert disk_cache.get("http://localhost:60611", "plans/allowed", "a") is None
+    assert disk_cache.stats() == {"hits": 1, "misses": 3, "writes": 1, "evictions": 0}
+    # no temporary files are left behind
+    assert [path.suffix for path in tmp_path.iterdir()] == [".cache"]
+
+    disk_cache.clear()
+    assert disk_cache.size() == 0
+
+
+def test_disk_cache_corrupt_file(tmp_path):
+    disk_cache = DiskCache(directory=str(tmp_path))
+    disk_cache.put("http://localhost:60610", "devices/allowed", "a", {"x": 1})
+    (cache_path,) = tmp_path.iterdir()
+    cache_path.write_bytes(cache_path.read_bytes()[:-4])
+    assert disk_cache.get("http://localhost:60610", "devices/allowed", "a") is None
+    assert not cache_path.exists()
+
+
+def test_disk_cache_temporary_files(tmp_path, monkeypatch):
+    disk_cache = DiskCache(directory=str(tmp_path))
+    # left by a process that died while writing, and being written by another one
+    stale_path = tmp_path / "stale.tmp"
+    stale_path.write_bytes(b"EQC1")
+    os.utime(stale_path, (100, 100))
+    fresh_path = tmp_path / "fresh.tmp"
+    fresh_path.write_bytes(b"EQC1")
+
+    disk_cache.put("http://localhost:60610", "plans/allowed", "a", {"x": 1})
+    assert not stale_path.exists()
+    assert fresh_path.exists()
+    fresh_path.unlink()
+
+    def failing_replace(source_path, destination_path):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    disk_cache.put("http://localhost:60610", "plans/allowed", "b", {"x": 2})
+    assert [path.suffix for path in tmp_path.iterdir()] == [".cache"]
+
+
+def test_disk_cache_eviction(tmp_path):
+    disk_cache = DiskCache(directory=str(tmp_path), compression_level=0)
+    document = {"data": "x" * 1000}
+    for uid in range(3):
+        disk_cache.put("http://localhost:60610", "plans/allowed", uid, document)
+    file_size = disk_cache.size() // 3
+    # make uid 0 the most recently used and uid 1 the least recently used
+    for uid, mtime in ((0, 300), (1, 100), (2, 200)):
+        cache_path = disk_cache._path(
+            disk_cache._key("http://localhost:60610", "plans/allowed", uid)
+        )
+        os.utime(cache_path, (mtime, mtime))
+
+    disk_cache.evict(max_bytes=2 * file_size)
+    assert disk_cache.get("http://localhost:60610", "plans/allowed", 1) is None
+    assert disk_cache.get("http://localhost:60610", "plans/allowed", 0) == document
+    assert disk_cache.get("http://localhost:60610", "plans/allowed", 2) == document
+
+    # put evicts as well
+    disk_cache.max_bytes = file_size
+    disk_cache.put("http://localhost:60610", "plans/allowed", 3, document)
+    assert disk_cache.size() == file_size
+    assert disk_cache.stats()["evictions"] == 3
+
+
+def test_session_disk_cache(tmp_path):
+    with FakeBlueskyHttpserver() as fake_httpserver:
+
+        def new_session():
+            return BlueskyHttpserverSession(
+                fake_httpserver.url, disk_cache=DiskCache(directory=str(tmp_path))
+            )
+
+        plan_names = new_session().item_validator().plan_names
+        assert fake_httpserver.request_counts["plans/allowed"] == 1
+
+        # a new session with the same uids reads the disk cache
+        assert new_session().item_validator().plan_names == plan_names
+        assert fake_httpserver.request_counts["plans/allowed"] == 1
+        assert fake_httpserver.request_counts["devices/allowed"] == 1
+
+        fake_httpserver.set_allowed(plans=["count"])
+        assert new_session().item_validator().plan_names == {"count"}
+        assert fake_httpserver.request_counts["plans/allowed"] == 2
+        assert fake_httpserver.request_counts["devices/allowed"] == 1
+
+        # plans_allowed() and devices_allowed() read the disk cache as well
+        plans_allowed_response = new_session().plans_allowed()
+        assert plans_allowed_response.status_code == 200
+        assert list(plans_allowed_response.json()["plans_allowed"]) == ["count"]
+        assert "devices_allowed" in new_session().devices_allowed().json()
+        assert fake_httpserver.request_counts["plans/allowed"] == 2
+        assert fake_httpserver.request_counts["devices/allowed"] == 1
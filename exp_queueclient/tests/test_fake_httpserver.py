@@ -0,0 +1,61 @@
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.fake_httpserver import FakeBlueskyHttpserver
+
+
+def _open_environment(session):
+    assert session.environment_open().json()["success"]
+    assert session.wait_for_status({"worker_environment_exists": True}, timeout=5)
+
+
+def test_queue_execution():
+    with FakeBlueskyHttpserver(time_scale=0.01) as fake_httpserver:
+        session = BlueskyHttpserverSession(fake_httpserver.url)
+        _open_environment(session)
+        session.queue_item_add_batch(
+            [
+                {"name": "count", "args": [["det1"]], "kwargs": {"num": i}}
+                for i in range(3)
+            ]
+        )
+        assert session.queue_start().json()["success"]
+        wait_result = session.wait_for_status(
+            {"manager_state": "idle", "items_in_queue": 0, "items_in_history": 3},
+            timeout=5,
+        )
+        assert wait_result
+        assert wait_result.status["running_item_uid"] is None
+
+        history_items = session.history_get().json()["items"]
+        assert [history_item["kwargs"]["num"] for history_item in history_items] == [
+            0,
+            1,
+            2,
+        ]
+
+
+def test_pause_resume_abort():
+    with FakeBlueskyHttpserver(
+        time_scale=0.01, plan_duration=lambda item: 1000
+    ) as fake_httpserver:
+        session = BlueskyHttpserverSession(fake_httpserver.url)
+        _open_environment(session)
+        session.queue_item_add(item_name="count", item_args=[["det1"]])
+        session.queue_start()
+        assert session.wait_for_status({"re_state": "running"}, timeout=5)
+
+        assert session.re_pause(option="immediate").json()["success"]
+        assert session.wait_for_status({"re_state": "paused"}, timeout=5)
+        assert session.re_resume().json()["success"]
+        assert session.wait_for_status({"re_state": "running"}, timeout=5)
+
+        session.re_pause()
+        assert session.wait_for_status({"re_state": "paused"}, timeout=5)
+        assert session.re_abort().json()["success"]
+        wait_result = session.wait_for_status(
+            {"manager_state": "idle", "re_state": "idle"}, timeout=5
+        )
+        assert wait_result
+        # an aborted plan goes back to the front of the queue
+        assert wait_result.status["items_in_queue"] == 1
+        history_items = session.history_get().json()["items"]
+        assert history_items[-1]["result"]["exit_status"] == "aborted"
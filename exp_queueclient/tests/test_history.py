@@ -0,0 +1,81 @@
+from exp_queueclient import HistoryMirror
+
+
+class _Response:
+    def __init__(self, response_json):
+        self._response_json = response_json
+
+    def json(self):
+        return self._response_json
+
+
+class _HistorySession:
+    """Serves a plan history from a list, counting history/get requests."""
+
+    def __init__(self):
+        self.history_items = []
+        self.plan_history_uid = "uid-0"
+        self.history_get_count = 0
+
+    def add_items(self, *item_uids):
+        self.history_items.extend({"item_uid": item_uid} for item_uid in item_uids)
+        self.plan_history_uid = f"uid-{len(self.history_items)}-{item_uids}"
+
+    def status(self):
+        return _Response({"plan_history_uid": self.plan_history_uid})
+
+    def httpserver_get(self, endpoint):
+        assert endpoint == "history/get"
+        self.history_get_count += 1
+        return _Response(
+            {
+                "items": list(self.history_items),
+                "plan_history_uid": self.plan_history_uid,
+            }
+        )
+
+
+def _item_uids(history_items):
+    return [history_item["item_uid"] for history_item in history_items]
+
+
+def test_history_mirror_appends_new_items():
+    session = _HistorySession()
+    history_mirror = HistoryMirror(session)
+
+    session.add_items("a", "b")
+    assert history_mirror.update() == 2
+    cursor = history_mirror.cursor
+    assert cursor == 2
+
+    # no new request when the plan_history_uid has not changed
+    assert history_mirror.update() == 0
+    assert session.history_get_count == 1
+
+    session.add_items("c")
+    assert history_mirror.update() == 1
+    assert _item_uids(history_mirror.since(cursor)) == ["c"]
+    assert _item_uids(history_mirror.since(0)) == ["a", "b", "c"]
+
+
+def test_history_mirror_history_cleared():
+    session = _HistorySession()
+    history_mirror = HistoryMirror(session)
+    session.add_items("a", "b")
+    history_mirror.update()
+    cursor = history_mirror.cursor
+
+    session.history_items.clear()
+    session.add_items("x", "y", "z")
+    assert history_mirror.update() == 3
+    assert history_mirror.history_resets == 1
+    assert _item_uids(history_mirror.since(cursor)) == ["x", "y", "z"]
+    assert len(history_mirror) == 3
+
+
+def test_history_mirror_max_items():
+    session = _HistorySession()
+    history_mirror = HistoryMirror(session, max_items=2)
+    session.add_items("a", "b", "c")
+    history_mirror.update()
+    assert _item_uids(history_mirror.since(0)) == ["b", "c"]
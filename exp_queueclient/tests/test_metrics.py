@@ -0,0 +1,51 @@
+import pytest
+import requests
+
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.metrics import LatencyHistogram
+
+
+def test_latency_histogram():
+    latency_histogram = LatencyHistogram(buckets_per_octave=8)
+    assert latency_histogram.percentile(50) is None
+    for i in range(1, 1001):
+        latency_histogram.record(i / 1000)
+
+    assert latency_histogram.count == 1000
+    assert latency_histogram.min == 0.001
+    assert latency_histogram.max == 1.0
+    # bucket upper bounds are within 2 ** (1 / 8), about 9%, of the exact value
+    assert 0.5 <= latency_histogram.percentile(50) <= 0.5 * 2 ** (1 / 8)
+    assert 0.99 <= latency_histogram.percentile(99) <= 1.0
+    assert sum(latency_histogram.snapshot()["buckets"].values()) == 1000
+
+    latency_histogram.reset()
+    assert latency_histogram.snapshot() == {"count": 0}
+
+
+def test_session_metrics(bluesky_httpserver_url):
+    session = BlueskyHttpserverSession(bluesky_httpserver_url=bluesky_httpserver_url)
+    for _ in range(3):
+        session.status()
+    session.queue_item_add(item_name="count", item_args=[["det1"]])
+
+    metrics_snapshot = session.metrics.snapshot(reset=True)
+    assert metrics_snapshot["GET status"]["requests"] == 3
+    assert metrics_snapshot["GET status"]["status_codes"] == {200: 3}
+    assert metrics_snapshot["GET status"]["response_bytes"] > 0
+    assert metrics_snapshot["GET status"]["latency_s"]["p50"] > 0
+    assert metrics_snapshot["POST queue/item/add"]["request_bytes"] > 0
+
+    session.httpserver_get("no/such/endpoint")
+    assert session.metrics.snapshot()["GET no/such/endpoint"]["status_codes"] == {
+        404: 1
+    }
+    assert "GET status" not in session.metrics.snapshot()
+
+
+def test_session_metrics_errors():
+    # nothing listens on port 9
+    session = BlueskyHttpserverSession(bluesky_httpserver_url="http://127.0.0.1:9")
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.status()
+    assert session.metrics.snapshot()["GET status"]["errors"] == {"ConnectionError": 1}
@@ -0,0 +1,95 @@
+import socket
+import time as ttime
+
+from exp_queueclient.fake_httpserver import FakeBlueskyHttpserver
+from exp_queueclient.pool import SessionPool
+
+
+def test_session_pool(bluesky_httpserver_url):
+    with FakeBlueskyHttpserver() as other_fake_httpserver, SessionPool(
+        [bluesky_httpserver_url, other_fake_httpserver.url]
+    ) as session_pool:
+        server_results = session_pool.status(typed=True)
+        assert list(server_results) == session_pool.urls
+        for url, server_result in server_results.items():
+            assert server_result, server_result
+            assert server_result.url == url
+            assert server_result.value.manager_state == "idle"
+            assert server_result.elapsed > 0
+
+        server_results = session_pool.queue_stop(urls=[other_fake_httpserver.url])
+        assert list(server_results) == [other_fake_httpserver.url]
+
+        server_results = session_pool.call(
+            lambda session, key: session.status().json()[key], "manager_state"
+        )
+        assert {server_result.value for server_result in server_results.values()} == {
+            "idle"
+        }
+
+
+def test_session_pool_errors(bluesky_httpserver_url):
+    # a server that accepts connections but never responds
+    hung_socket = socket.socket()
+    hung_socket.bind(("127.0.0.1", 0))
+    hung_socket.listen()
+    hung_url = "http://127.0.0.1:%d" % hung_socket.getsockname()[1]
+
+    # nothing listens on this port
+    closed_socket = socket.socket()
+    closed_socket.bind(("127.0.0.1", 0))
+    closed_url = "http://127.0.0.1:%d" % closed_socket.getsockname()[1]
+    closed_socket.close()
+
+    try:
+        with SessionPool(
+            [bluesky_httpserver_url, hung_url, closed_url], request_timeout=2.0
+        ) as session_pool:
+            server_results = session_pool.status(
+                timeout={bluesky_httpserver_url: 5.0, hung_url: 0.2, closed_url: 5.0}
+            )
+            assert server_results[bluesky_httpserver_url].success
+            assert server_results[hung_url].timed_out
+            assert server_results[hung_url].elapsed < 1.0
+            assert not server_results[closed_url]
+            assert not server_results[closed_url].timed_out
+    finally:
+        hung_socket.close()
+
+
+def test_session_pool_close(bluesky_httpserver_url):
+    called_urls = []
+
+    def slow_call(session):
+        called_urls.append(session._bluesky_httpserver_url)
+        ttime.sleep(0.5)
+
+    with FakeBlueskyHttpserver() as other_fake_httpserver:
+        session_pool = SessionPool(
+            [bluesky_httpserver_url, other_fake_httpserver.url], max_workers=1
+        )
+        server_results = session_pool.call(slow_call, timeout=0.1)
+        assert all(server_result.timed_out for server_result in server_results.values())
+        # the call waiting for a worker is cancelled
+        session_pool.close()
+        ttime.sleep(0.7)
+        assert len(called_urls) == 1
+
+
+def test_session_pool_hung_server(bluesky_httpserver_url):
+    hung_socket = socket.socket()
+    hung_socket.bind(("127.0.0.1", 0))
+    hung_socket.listen()
+    hung_url = "http://127.0.0.1:%d" % hung_socket.getsockname()[1]
+
+    try:
+        with SessionPool(
+            [bluesky_httpserver_url, hung_url], timeout=0.3, request_timeout=5.0
+        ) as session_pool:
+            # the calls on the hung server do not take the workers of the healthy one
+            for _ in range(4):
+                server_results = session_pool.status()
+                assert server_results[bluesky_httpserver_url].success
+                assert server_results[hung_url].timed_out
+    finally:
+        hung_socket.close()
@@ -0,0 +1,90 @@
+import asyncio
+import time as ttime
+
+import pytest
+
+from exp_queueclient import AsyncBlueskyHttpserverSession, BlueskyHttpserverSession
+from exp_queueclient.ratelimit import RateLimiter, RateLimitExceeded, TokenBucket
+
+
+def test_token_bucket():
+    token_bucket = TokenBucket(rate=10, capacity=2)
+    assert token_bucket.try_acquire()
+    assert token_bucket.try_acquire()
+    assert not token_bucket.try_acquire()
+
+    start_time = ttime.monotonic()
+    assert token_bucket.acquire()
+    assert token_bucket.acquire()
+    assert ttime.monotonic() - start_time >= 0.15
+    # the next token would take longer than the timeout
+    assert not token_bucket.acquire(timeout=0.01)
+
+    assert token_bucket.stats()["acquired"] == 4
+    assert token_bucket.stats()["throttled"] == 2
+    assert token_bucket.stats()["rejected"] == 2
+    assert token_bucket.stats()["wait_time"] > 0
+
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_token_bucket_async():
+    token_bucket = TokenBucket(rate=20, capacity=1)
+
+    async def acquire_tokens():
+        start_time = ttime.monotonic()
+        await asyncio.gather(*[token_bucket.acquire_async() for _ in range(3)])
+        return ttime.monotonic() - start_time
+
+    assert asyncio.run(acquire_tokens()) >= 0.09
+
+
+def test_rate_limiter_for_url():
+    rate_limiter = RateLimiter.for_url("http://beamline:60610", read_rate=5)
+    try:
+        assert RateLimiter.for_url("http://beamline:60610") is rate_limiter
+        assert rate_limiter.read_bucket.rate == 5
+        assert RateLimiter.for_url("http://other-beamline:60610") is not rate_limiter
+    finally:
+        RateLimiter.remove_url("http://beamline:60610")
+        RateLimiter.remove_url("http://other-beamline:60610")
+
+
+def test_session_rate_limit(bluesky_httpserver_url):
+    rate_limiter = RateLimiter(read_rate=10, read_burst=2, write_rate=None)
+    session = BlueskyHttpserverSession(
+        bluesky_httpserver_url=bluesky_httpserver_url, rate_limiter=rate_limiter
+    )
+    for _ in range(4):
+        session.status()
+    session.queue_clear()
+    assert session.rate_limit_stats() == {"read": rate_limiter.read_bucket.stats()}
+    assert session.rate_limit_stats()["read"]["acquired"] == 4
+    assert session.rate_limit_stats()["read"]["throttled"] >= 1
+
+    # a non-blocking limiter raises instead of waiting
+    other_session = BlueskyHttpserverSession(
+        bluesky_httpserver_url=bluesky_httpserver_url,
+        rate_limiter=RateLimiter(read_rate=0.1, read_burst=1, blocking=False),
+    )
+    other_session.status()
+    with pytest.raises(RateLimitExceeded):
+        other_session.status()
+    assert other_session.metrics.snapshot()["GET status"]["requests"] == 1
+
+
+def test_async_session_rate_limit(bluesky_httpserver_url):
+    async def _test_async_session_rate_limit():
+        session = AsyncBlueskyHttpserverSession(
+            bluesky_httpserver_url=bluesky_httpserver_url,
+            rate_limiter=RateLimiter(read_rate=20, read_burst=1),
+        )
+        start_time = ttime.monotonic()
+        try:
+            await asyncio.gather(*[session.status() for _ in range(3)])
+        finally:
+            await session.aclose()
+        return ttime.monotonic() - start_time
+
+    assert asyncio.run(_test_async_session_rate_limit()) >= 0.09
@@ -0,0 +1,160 @@
+import itertools
+import random
+
+import pytest
+
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.batch import BatchResult
+from exp_queueclient.reconcile import longest_increasing_subsequence, plan_queue_edits
+
+
+class _QueueSession:
+    """Applies batch edits to a list of queue items."""
+
+    def __init__(self, queue_items):
+        self.queue_items = list(queue_items)
+        self._new_item_uids = (f"new-{i}" for i in itertools.count())
+
+    def _index(self, uid):
+        return [queue_item["item_uid"] for queue_item in self.queue_items].index(uid)
+
+    def _insert(self, items, pos=None, pos_dest=None, after_uid=None):
+        if after_uid is not None:
+            index = self._index(after_uid) + 1
+        else:
+            assert "front" in (pos, pos_dest)
+            index = 0
+        self.queue_items[index:index] = items
+        batch_result = BatchResult()
+        batch_result.items = items
+        batch_result.results = [{"success": True, "msg": ""} for _ in items]
+        return batch_result
+
+    def queue_item_remove_batch(self, uids):
+        self.queue_items = [
+            queue_item
+            for queue_item in self.queue_items
+            if queue_item["item_uid"] not in uids
+        ]
+        return BatchResult()
+
+    def queue_item_move_batch(self, uids, **destination):
+        moved_items = [self.queue_items[self._index(uid)] for uid in uids]
+        self.queue_item_remove_batch(uids)
+        return self._insert(moved_items, **destination)
+
+    def queue_item_add_batch(self, items, **destination):
+        added_items = [dict(item, item_uid=next(self._new_item_uids)) for item in items]
+        return self._insert(added_items, **destination)
+
+
+def _queue_names(queue_items):
+    return [queue_item["name"] for queue_item in queue_items]
+
+
+def test_longest_increasing_subsequence():
+    assert longest_increasing_subsequence([]) == []
+    sequence = [3, 1, 4, 1, 5, 9, 2, 6]
+    subsequence = [sequence[i] for i in longest_increasing_subsequence(sequence)]
+    assert len(subsequence) == 4
+    assert subsequence == sorted(set(subsequence))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_plan_queue_edits(seed):
+    rng = random.Random(seed)
+    current_queue = [{"name": f"plan{i}", "item_uid": f"uid-{i}"} for i in range(20)]
+    desired_queue = rng.sample(current_queue, 15)
+    for _ in range(5):
+        desired_queue.insert(rng.randrange(len(desired_queue) + 1), {"name": "new"})
+
+    queue_edits = plan_queue_edits(current_queue, desired_queue)
+    session = _QueueSession(current_queue)
+    queue_edits.apply(session)
+    assert _queue_names(session.queue_items) == _queue_names(desired_queue)
+
+    kept_positions = [
+        int(item["item_uid"][4:]) for item in desired_queue if "item_uid" in item
+    ]
+    moved_count = sum(
+        len(desired_indices)
+        for step_type, desired_indices, _ in queue_edits.steps
+        if step_type == "move"
+    )
+    assert moved_count == len(kept_positions) - len(
+        longest_increasing_subsequence(kept_positions)
+    )
+
+
+def test_plan_queue_edits_no_change():
+    current_queue = [{"name": f"plan{i}", "item_uid": f"uid-{i}"} for i in range(5)]
+    queue_edits = plan_queue_edits(
+        current_queue, [item["item_uid"] for item in current_queue]
+    )
+    assert len(queue_edits) == 0
+
+
+def test_plan_queue_edits_unknown_uid():
+    with pytest.raises(ValueError):
+        plan_queue_edits([], ["no-such-uid"])
+
+
+def test_queue_reconcile(clean_bluesky_httpserver_session, bluesky_httpserver_url):
+    with clean_bluesky_httpserver_session():
+        session = BlueskyHttpserverSession(
+            bluesky_httpserver_url=bluesky_httpserver_url
+        )
+        batch_result = session.queue_item_add_batch(
+            [
+                {"name": "count", "args": [["det1"]], "kwargs": {"num": i}}
+                for i in range(5)
+            ]
+        )
+        item_uids = [item["item_uid"] for item in batch_result.items]
+
+        desired_queue = [
+            item_uids[4],
+            item_uids[0],
+            {"name": "count", "args": [["det2"]], "kwargs": {"num": 10}},
+            item_uids[2],
+        ]
+        queue_edits = session.queue_reconcile(desired_queue)
+        assert all(queue_edits.batch_results)
+
+        queue_items = session.queue_get().json()["items"]
+        assert [queue_item["kwargs"]["num"] for queue_item in queue_items] == [
+            4,
+            0,
+            10,
+            2,
+        ]
+        assert [queue_item["item_uid"] for queue_item in queue_items][:2] == item_uids[
+            4:5
+        ] + item_uids[:1]
+
+
+def test_queue_reconcile_rejected_add(
+    clean_bluesky_httpserver_session, bluesky_httpserver_url
+):
+    with clean_bluesky_httpserver_session():
+        session = BlueskyHttpserverSession(
+            bluesky_httpserver_url=bluesky_httpserver_url
+        )
+        batch_result = session.queue_item_add_batch(
+            [
+                {"name": "count", "args": [["det1"]], "kwargs": {"num": i}}
+                for i in range(2)
+            ]
+        )
+        item_uids = [item["item_uid"] for item in batch_result.items]
+
+        desired_queue = [
+            {"name": "no_such_plan"},
+            item_uids[1],
+            {"name": "count", "args": [["det2"]], "kwargs": {"num": 10}},
+            item_uids[0],
+        ]
+        queue_edits = session.queue_reconcile(desired_queue)
+        # the edits stop at the rejected add
+        assert not queue_edits.batch_results[-1].success
+        assert len(queue_edits.batch_results) < len(queue_edits)
@@ -0,0 +1,92 @@
+import pickle
+
+import httpx
+import pytest
+import requests
+
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.responses import PlanQueue, QueueStatus, memoize_json
+
+
+def _response(body):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    return response
+
+
+def test_memoize_json():
+    response = memoize_json(_response(b'{"items": [1, 2]}'))
+    assert isinstance(response, requests.Response)
+    assert response.json() is response.json()
+    assert response.json() == {"items": [1, 2]}
+    # keyword arguments bypass the memo
+    assert response.json(parse_int=str) == {"items": ["1", "2"]}
+    # the response keeps its class
+    assert type(memoize_json(response)) is requests.Response
+    assert memoize_json(response).json() is response.json()
+
+
+def test_memoize_json_httpx():
+    response = memoize_json(httpx.Response(200, content=b'{"items": [1, 2]}'))
+    assert response.json() is response.json()
+    unpickled_response = pickle.loads(pickle.dumps(response))
+    assert unpickled_response.json() == {"items": [1, 2]}
+    assert unpickled_response.json() is unpickled_response.json()
+
+
+def test_queue_status():
+    status_json = {
+        "manager_state": "idle",
+        "items_in_queue": 2,
+        "running_item_uid": None,
+        "future_key": "value",
+    }
+    queue_status = QueueStatus(status_json)
+    assert queue_status.manager_state == "idle"
+    assert queue_status.items_in_queue == 2
+    assert queue_status.re_state is None
+    assert queue_status.extra == {"future_key": "value"}
+    assert queue_status.as_dict()["future_key"] == "value"
+    assert queue_status == QueueStatus(dict(status_json))
+    assert "manager_state='idle'" in repr(queue_status)
+
+    with pytest.raises(AttributeError):
+        queue_status.unknown_field = 1
+    assert not hasattr(queue_status, "__dict__")
+
+
+def test_plan_queue():
+    plan_queue = PlanQueue({"items": [{"item_uid": "a"}], "plan_queue_uid": "uid-1"})
+    assert len(plan_queue) == 1
+    assert plan_queue.running_item is None
+    assert "items=<1 items>" in repr(plan_queue)
+
+
+def test_typed_endpoints(bluesky_httpserver_url):
+    session = BlueskyHttpserverSession(bluesky_httpserver_url=bluesky_httpserver_url)
+
+    queue_status = session.status(typed=True)
+    assert isinstance(queue_status, QueueStatus)
+    assert queue_status.response.status_code == 200
+    assert queue_status.response.json() is queue_status.response.json()
+
+    plan_queue = session.queue_get(typed=True)
+    assert plan_queue.plan_queue_uid == queue_status.plan_queue_uid
+    assert plan_queue.items == []
+
+    plan_history = session.history_get(status=queue_status, typed=True)
+    assert plan_history.plan_history_uid == queue_status.plan_history_uid
+
+    # memoizing responses still pickle
+    assert pickle.loads(pickle.dumps(queue_status.response)).status_code == 200
+
+
+def test_queue_get_cached_typed_status(bluesky_httpserver_url):
+    session = BlueskyHttpserverSession(
+        bluesky_httpserver_url=bluesky_httpserver_url, use_cache=True
+    )
+    queue_status = session.status(typed=True)
+    session.queue_get(status=queue_status)
+    session.queue_get(status=queue_status)
+    assert session.cache_stats()["hits"] == 1
@@ -0,0 +1,209 @@
+import socket
+import time as ttime
+
+import pytest
+import requests
+
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.fake_httpserver import FakeBlueskyHttpserver
+from exp_queueclient.metrics import SessionMetrics
+from exp_queueclient.retry import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RequestAttempts,
+    RetryBudget,
+    RetryPolicy,
+    retry_after_seconds,
+)
+
+
+def _closed_url():
+    closed_socket = socket.socket()
+    closed_socket.bind(("127.0.0.1", 0))
+    closed_url = "http://127.0.0.1:%d" % closed_socket.getsockname()[1]
+    closed_socket.close()
+    return closed_url
+
+
+def test_retry_policy():
+    retry_policy = RetryPolicy(max_retries=2)
+    assert retry_policy.should_retry("GET", "status", 0)
+    assert retry_policy.should_retry("GET", "status", 1, status_code=503)
+    assert not retry_policy.should_retry("GET", "status", 2)
+    assert not retry_policy.should_retry("GET", "status", 0, status_code=500)
+    assert retry_policy.should_retry("POST", "queue/stop", 0)
+    # adding an item twice adds two items
+    assert not retry_policy.should_retry("POST", "queue/item/add", 0)
+    assert retry_policy.should_retry("POST", "queue/item/add", 0, request_sent=False)
+    # a retried environment/open fails if the first one opened the environment
+    assert not retry_policy.should_retry("POST", "environment/open", 0)
+    assert not retry_policy.should_retry("POST", "queue/start", 0, status_code=503)
+    assert retry_policy.should_retry("POST", "environment/open", 0, request_sent=False)
+
+
+def test_retry_budget():
+    retry_budget = RetryBudget(ratio=0.5, min_retries_per_second=0, max_balance=2)
+    assert retry_budget.try_withdraw()
+    assert retry_budget.try_withdraw()
+    assert not retry_budget.try_withdraw()
+    retry_budget.record_request()
+    assert not retry_budget.try_withdraw()
+    retry_budget.record_request()
+    assert retry_budget.try_withdraw()
+
+    retry_policy = RetryPolicy(
+        budget=RetryBudget(ratio=0, min_retries_per_second=0, max_balance=1)
+    )
+    assert retry_policy.should_retry("GET", "status", 0)
+    assert not retry_policy.should_retry("GET", "status", 0)
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds({"Retry-After": "2"}) == 2.0
+    assert retry_after_seconds({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}) is None
+    assert retry_after_seconds({}) is None
+
+
+def test_circuit_breaker():
+    circuit_breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+    circuit_breaker.before_request()
+    circuit_breaker.record_failure()
+    assert circuit_breaker.state == "closed"
+    circuit_breaker.record_failure()
+    assert circuit_breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.before_request()
+
+    ttime.sleep(0.06)
+    assert circuit_breaker.state == "half_open"
+    # one trial request at a time
+    circuit_breaker.before_request()
+    with pytest.raises(CircuitOpenError):
+        circuit_breaker.before_request()
+    circuit_breaker.record_failure()
+    assert circuit_breaker.state == "open"
+
+    ttime.sleep(0.06)
+    circuit_breaker.before_request()
+    circuit_breaker.record_success()
+    assert circuit_breaker.stats() == {
+        "state": "closed",
+        "consecutive_failures": 0,
+        "times_opened": 2,
+        "rejected_requests": 2,
+    }
+
+
+class _Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_request_attempts():
+    circuit_breaker = CircuitBreaker(failure_threshold=10)
+    metrics = SessionMetrics()
+    request_attempts = RequestAttempts(
+        "POST",
+        "queue/item/add",
+        {"json": {}},
+        retry_policy=RetryPolicy(max_retries=2, initial_interval=0.01),
+        circuit_breaker=circuit_breaker,
+        metrics=metrics,
+    )
+    # a request that was never sent is retried even if it is not idempotent
+    assert request_attempts.failed(ConnectionError(), request_sent=False) > 0
+    # a non-idempotent request that may have been sent is not
+    assert request_attempts.failed(ConnectionError()) is None
+    assert request_attempts.responded(_Response(200)) is None
+    assert circuit_breaker.stats()["consecutive_failures"] == 0
+    assert metrics.snapshot()["POST queue/item/add"]["retries"] == 1
+
+    request_attempts = RequestAttempts(
+        "GET", "status", {}, retry_policy=RetryPolicy(max_retries=1), metrics=metrics
+    )
+    assert request_attempts.responded(_Response(503, {"Retry-After": "2"})) == 2.0
+    # max_retries is reached
+    assert request_attempts.responded(_Response(503)) is None
+    assert metrics.snapshot()["GET status"]["retries"] == 1
+
+
+def test_session_retry():
+    with FakeBlueskyHttpserver() as fake_httpserver:
+        session = BlueskyHttpserverSession(
+            fake_httpserver.url,
+            retry_policy=RetryPolicy(initial_interval=0.01),
+        )
+        fake_httpserver.fail_next_requests(2, status_code=503)
+        status_response = session.status()
+        assert status_response.status_code == 200
+        assert session.metrics.snapshot()["GET status"]["retries"] == 2
+        assert session.metrics.snapshot()["GET status"]["status_codes"] == {
+            503: 2,
+            200: 1,
+        }
+
+        # not idempotent, the 503 is returned
+        fake_httpserver.fail_next_requests(1, status_code=503)
+        queue_item_add_response = session.queue_item_add(
+            item_name="count", item_args=[["det1"]]
+        )
+        assert queue_item_add_response.status_code == 503
+        assert fake_httpserver.request_counts["queue/item/add"] == 1
+
+        # give up after max_retries
+        fake_httpserver.fail_next_requests(10, status_code=502, endpoint="queue/get")
+        assert session.queue_get().status_code == 502
+        assert fake_httpserver.request_counts["queue/get"] == 4
+
+
+def test_session_retry_connection_refused():
+    session = BlueskyHttpserverSession(
+        _closed_url(), retry_policy=RetryPolicy(max_retries=2, initial_interval=0.01)
+    )
+    # never sent, so even adding an item is retried
+    with pytest.raises(requests.ConnectionError):
+        session.queue_item_add(item_name="count")
+    assert session.metrics.snapshot()["POST queue/item/add"]["retries"] == 2
+
+
+def test_session_circuit_breaker():
+    circuit_breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=60)
+    session = BlueskyHttpserverSession(_closed_url(), circuit_breaker=circuit_breaker)
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            session.status()
+    with pytest.raises(CircuitOpenError):
+        session.status()
+    # rejected requests are not sent
+    assert session.metrics.snapshot()["GET status"]["errors"] == {"ConnectionError": 2}
+    assert circuit_breaker.stats()["rejected_requests"] == 1
+
+
+def test_session_circuit_breaker_interrupted(monkeypatch):
+    circuit_breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    session = BlueskyHttpserverSession(_closed_url(), circuit_breaker=circuit_breaker)
+
+    def interrupted_request(*args, **kwargs):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(session._http_session, "request", interrupted_request)
+    for _ in range(2):
+        with pytest.raises(KeyboardInterrupt):
+            session.status()
+    # an interrupted request is not a failure of the server
+    assert circuit_breaker.stats()["consecutive_failures"] == 0
+    assert circuit_breaker.state == "closed"
+
+    monkeypatch.undo()
+    with pytest.raises(requests.ConnectionError):
+        session.status()
+    assert circuit_breaker.state == "open"
+    ttime.sleep(0.1)
+    # an interrupted trial request lets the next one through
+    monkeypatch.setattr(session._http_session, "request", interrupted_request)
+    with pytest.raises(KeyboardInterrupt):
+        session.status()
+    assert circuit_breaker.state == "half_open"
+    with pytest.raises(KeyboardInterrupt):
+        session.status()
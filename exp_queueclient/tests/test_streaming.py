@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.streaming import MultipartFileStream, iter_json_object_members
+
+
+def test_multipart_file_stream(tmp_path):
+    spreadsheet_path = tmp_path / "plans.csv"
+    spreadsheet_path.write_bytes(b"plan_name,num\n" + b"count,3\n" * 1000)
+
+    progress = []
+    spreadsheet_stream = MultipartFileStream(
+        str(spreadsheet_path),
+        file_field_name="spreadsheet",
+        form_fields={"data_type": "csv", "ignored": None},
+        chunk_size=100,
+        progress_callback=lambda bytes_sent, total_bytes: progress.append(
+            (bytes_sent, total_bytes)
+        ),
+    )
+    body = b"".join(spreadsheet_stream)
+
+    assert len(body) == len(spreadsheet_stream)
+    assert progress[-1] == (len(body), len(body))
+    assert all(
+        bytes_sent - previous_bytes_sent <= 100
+        for (previous_bytes_sent, _), (bytes_sent, _) in zip(progress, progress[1:])
+    )
+    assert b'name="data_type"\r\n\r\ncsv\r\n' in body
+    assert b'name="ignored"' not in body
+    assert b'name="spreadsheet"; filename="plans.csv"' in body
+    assert body.endswith(f"--{spreadsheet_stream.boundary}--\r\n".encode())
+
+
+def _split(json_bytes, chunk_size):
+    return [
+        json_bytes[i : i + chunk_size]  # noqa: E203
+        for i in range(0, len(json_bytes), chunk_size)
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_iter_json_object_members(chunk_size):
+    response_json = {
+        "success": True,
+        "msg": "déjà vu",
+        "items": [{"name": "count", "kwargs": {"num": 12345}}, {"name": "scan"}],
+        "results": [],
+        "qsize": 12345,
+    }
+    json_bytes = json.dumps(response_json, ensure_ascii=False, indent=1).encode()
+    assert list(iter_json_object_members(_split(json_bytes, chunk_size))) == [
+        ("success", True),
+        ("msg", "déjà vu"),
+        ("items", {"name": "count", "kwargs": {"num": 12345}}),
+        ("items", {"name": "scan"}),
+        ("qsize", 12345),
+    ]
+
+
+def test_iter_json_object_members_split_numbers():
+    json_bytes = b'{"a": [1.5, -2.25e-3, 6E+2, 7], "b": 3.125}'
+    for split_offset in range(1, len(json_bytes)):
+        byte_chunks = [json_bytes[:split_offset], json_bytes[split_offset:]]
+        assert list(iter_json_object_members(byte_chunks)) == [
+            ("a", 1.5),
+            ("a", -2.25e-3),
+            ("a", 6e2),
+            ("a", 7),
+            ("b", 3.125),
+        ]
+
+
+def test_iter_json_object_members_truncated():
+    with pytest.raises(ValueError):
+        list(iter_json_object_members([b'{"items": [1, 2']))
+
+
+def test_queue_upload_spreadsheet(
+    clean_bluesky_httpserver_session, bluesky_httpserver_url, tmp_path
+):
+    spreadsheet_path = tmp_path / "plans.csv"
+    spreadsheet_path.write_text("plan_name,num\n" + "count,3\n" * 20)
+
+    with clean_bluesky_httpserver_session():
+        session = BlueskyHttpserverSession(
+            bluesky_httpserver_url=bluesky_httpserver_url
+        )
+        progress = []
+        upload_result = session.queue_upload_spreadsheet(
+            str(spreadsheet_path),
+            progress_callback=lambda bytes_sent, total_bytes: progress.append(
+                bytes_sent
+            ),
+        )
+        assert upload_result.success
+        assert len(upload_result.items) == 20
+        assert progress
+        assert session.status().json()["items_in_queue"] == 20
@@ -0,0 +1,43 @@
+import logging
+
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.tracing import summarize
+
+
+def test_summarize():
+    assert summarize(b"x" * 1000) == "<bytes of 1000 bytes>"
+    assert summarize({"items": [1, 2, 3]}) == "<dict with keys ['items']>"
+    assert summarize([1, 2, 3]) == "<list of 3 items>"
+    assert summarize(None) == "None"
+
+
+def test_request_tracing(bluesky_httpserver_url, caplog):
+    session = BlueskyHttpserverSession(bluesky_httpserver_url=bluesky_httpserver_url)
+    with caplog.at_level(logging.DEBUG, logger="BlueskyHttpserverSession"):
+        session.queue_item_add(item_name="count", item_args=[["det1"] * 1000])
+    request_messages = [
+        record.getMessage()
+        for record in caplog.records
+        if " url: " in record.getMessage()
+    ]
+    assert len(request_messages) == 1
+    # the payload is summarized, not formatted
+    assert "det1" not in request_messages[0]
+    assert "json=<dict with keys ['item']>" in request_messages[0]
+
+
+def test_request_tracing_sampling(bluesky_httpserver_url, caplog):
+    session = BlueskyHttpserverSession(
+        bluesky_httpserver_url=bluesky_httpserver_url, trace_sample_every=5
+    )
+    with caplog.at_level(logging.DEBUG, logger="BlueskyHttpserverSession"):
+        for _ in range(10):
+            session.status()
+    assert sum(" url: " in record.getMessage() for record in caplog.records) == 2
+
+
+def test_request_tracing_disabled(bluesky_httpserver_url, caplog):
+    session = BlueskyHttpserverSession(bluesky_httpserver_url=bluesky_httpserver_url)
+    with caplog.at_level(logging.INFO, logger="BlueskyHttpserverSession"):
+        session.status()
+    assert not caplog.records
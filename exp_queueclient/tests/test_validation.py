@@ -0,0 +1,154 @@
+import pytest
+
+from exp_queueclient import BlueskyHttpserverSession
+from exp_queueclient.fake_httpserver import FakeBlueskyHttpserver
+from exp_queueclient.validation import ItemValidationError, ItemValidator
+
+
+@pytest.fixture
+def fake_httpserver():
+    with FakeBlueskyHttpserver(time_scale=0.1) as fake_httpserver:
+        yield fake_httpserver
+
+
+@pytest.fixture
+def item_validator(fake_httpserver):
+    with BlueskyHttpserverSession(fake_httpserver.url) as session:
+        return session.item_validator()
+
+
+def test_item_validator_valid_items(item_validator):
+    assert item_validator.validate({"name": "count", "args": [["det1", "det2"]]}) == []
+    assert (
+        item_validator.validate(
+            {"name": "count", "args": [["det1"]], "kwargs": {"num": 3, "md": {}}}
+        )
+        == []
+    )
+    assert (
+        item_validator.validate({"name": "count", "kwargs": {"detectors": ["det"]}})
+        == []
+    )
+    # device components belong to their device
+    assert (
+        item_validator.validate({"name": "count", "args": [["motor.velocity"]]}) == []
+    )
+    assert (
+        item_validator.validate({"name": "scan", "args": [["det"], "motor", -1, 1]})
+        == []
+    )
+    # other item types are not checked
+    assert (
+        item_validator.validate({"name": "queue_stop", "item_type": "instruction"})
+        == []
+    )
+
+
+def test_item_validator_invalid_items(item_validator):
+    (error,) = item_validator.validate({"name": "cuont", "args": [["det1"]]})
+    assert "'cuont' is not in the list of allowed plans" in error
+    assert "did you mean 'count'" in error
+
+    (error,) = item_validator.validate({"name": "count", "args": [["det1", "dte2"]]})
+    assert "device 'dte2'" in error
+    assert "did you mean 'det2'" in error
+
+    (error,) = item_validator.validate(
+        {"name": "count", "args": [["det1"]], "kwargs": {"nmu": 3}}
+    )
+    assert "unexpected keyword argument 'nmu'" in error
+
+    (error,) = item_validator.validate({"name": "count", "kwargs": {"num": 3}})
+    assert "missing the required argument 'detectors'" in error
+
+    (error,) = item_validator.validate({"name": "count", "args": [["det"], 1, 2, 3]})
+    assert "takes 3 positional arguments but 4 were given" in error
+
+    (error,) = item_validator.validate(
+        {"name": "count", "args": [["det"], 1], "kwargs": {"num": 3}}
+    )
+    assert "multiple values for argument 'num'" in error
+
+    assert item_validator.validate({"args": []}) == ["the item name is missing"]
+    assert len(item_validator.validate_items([{"name": "count"}, {"name": "x"}])) == 2
+
+    with pytest.raises(ItemValidationError) as exc_info:
+        item_validator.check({"name": "count", "args": [["det1", "det3"]]})
+    assert len(exc_info.value.errors) == 1
+
+
+def test_item_validator_without_devices():
+    item_validator = ItemValidator(
+        {"count": {"parameters": [{"name": "detectors", "kind": {"value": 1}}]}}
+    )
+    assert item_validator.validate({"name": "count", "args": [["anything"]]}) == []
+    assert item_validator.device_names == set()
+
+
+def test_plans_and_devices_allowed_cached(fake_httpserver):
+    with BlueskyHttpserverSession(fake_httpserver.url, use_cache=True) as session:
+        status = session.status().json()
+        plans_allowed_json = session.plans_allowed(status=status).json()
+        assert plans_allowed_json["plans_allowed_uid"] == status["plans_allowed_uid"]
+        assert "count" in plans_allowed_json["plans_allowed"]
+        assert session.plans_allowec(status=status).json() == plans_allowed_json
+        assert (
+            "det1" in session.devices_allowed(status=status).json()["devices_allowed"]
+        )
+        session.devices_allowed(status=status)
+        assert fake_httpserver.request_counts["plans/allowed"] == 1
+        assert fake_httpserver.request_counts["devices/allowed"] == 1
+
+
+def test_item_validator_refresh(fake_httpserver):
+    with BlueskyHttpserverSession(
+        fake_httpserver.url, validation_max_age=60
+    ) as session:
+        item_validator = session.item_validator()
+        assert session.item_validator() is item_validator
+        assert fake_httpserver.request_counts["plans/allowed"] == 1
+
+        # with a status the uids are checked, unchanged uids keep the validator
+        assert (
+            session.item_validator(status=session.status(typed=True)) is item_validator
+        )
+        assert fake_httpserver.request_counts["plans/allowed"] == 1
+
+        fake_httpserver.set_allowed(plans=["count"], devices=["det1"])
+        refreshed_validator = session.item_validator(status=session.status().json())
+        assert refreshed_validator is not item_validator
+        assert refreshed_validator.plan_names == {"count"}
+        assert refreshed_validator.device_names == {"det1"}
+        assert fake_httpserver.request_counts["plans/allowed"] == 2
+
+
+def test_queue_item_add_validate(fake_httpserver):
+    with BlueskyHttpserverSession(fake_httpserver.url) as session:
+        with pytest.raises(ItemValidationError, match="did you mean 'count'"):
+            session.queue_item_add("cnt", [["det1"]], validate=True)
+        assert "queue/item/add" not in fake_httpserver.request_counts
+
+        assert session.queue_item_add("count", [["det1"]], validate=True).json()[
+            "success"
+        ]
+
+
+def test_queue_item_add_batch_validate(fake_httpserver):
+    items = [{"name": "count", "args": [["det1"]]} for _ in range(1000)]
+    items[500] = {"name": "count", "args": [["det5"]]}
+    with BlueskyHttpserverSession(fake_httpserver.url) as session:
+        batch_result = session.queue_item_add_batch(items, validate=True)
+        assert not batch_result
+        assert (
+            batch_result.msg
+            == "1 of 1000 items are invalid, the batch was not submitted"
+        )
+        assert not batch_result.responses
+        assert "det5" in batch_result.results[500]["msg"]
+        assert not batch_result.results[0]["success"]
+        assert "queue/item/add/batch" not in fake_httpserver.request_counts
+
+        del items[500]
+        batch_result = session.queue_item_add_batch(iter(items), validate=True)
+        assert batch_result
+        assert batch_result.qsize == 999
@@ -0,0 +1,84 @@
+from exp_queueclient.wait import (
+    StatusWaiter,
+    get_status_value,
+    poll_intervals,
+    status_matches,
+)
+
+
+status_json = {
+    "items_in_queue": 1,
+    "manager_state": "idle",
+    "plan_queue_mode": {"loop": False},
+    "running_item_uid": None,
+    "worker_environment_exists": True,
+}
+
+
+def test_get_status_value():
+    assert get_status_value(status_json, "items_in_queue") == 1
+    assert get_status_value(status_json, "plan_queue_mode.loop") is False
+    assert get_status_value(status_json, ("plan_queue_mode", "loop")) is False
+    assert not status_matches(status_json, {"plan_queue_mode.missing": None})
+
+
+def test_status_matches():
+    assert status_matches(status_json, {"manager_state": "idle"})
+    assert status_matches(status_json, {"plan_queue_mode.loop": False})
+    assert status_matches(status_json, {"items_in_queue": lambda n: n > 0})
+    assert not status_matches(status_json, {"manager_state": "executing_queue"})
+    assert not status_matches(status_json, {"no_such_key": None})
+    assert status_matches(
+        status_json, predicate=lambda s: s["running_item_uid"] is None
+    )
+    assert not status_matches(
+        status_json, {"manager_state": "idle"}, predicate=lambda s: False
+    )
+
+
+def test_poll_intervals():
+    intervals = poll_intervals(initial_interval=0.1, max_interval=1.0, jitter=0.1)
+    first_intervals = [next(intervals) for _ in range(8)]
+    assert 0.09 <= first_intervals[0] <= 0.11
+    assert 0.18 <= first_intervals[1] <= 0.22
+    assert all(0.9 <= interval <= 1.1 for interval in first_intervals[-3:])
+
+
+def test_status_waiter_match():
+    status_waiter = StatusWaiter(target_status={"manager_state": "idle"})
+    assert status_waiter.check(status_json) is None
+    assert status_waiter.result
+    assert status_waiter.result.status is status_json
+    assert status_waiter.result.status_checks == 1
+
+
+def test_status_waiter_max_status_checks():
+    status_waiter = StatusWaiter(
+        target_status={"manager_state": "executing_queue"}, max_status_checks=3
+    )
+    assert status_waiter.check(status_json) > 0
+    assert status_waiter.check(status_json) > 0
+    assert status_waiter.check(status_json) is None
+    assert not status_waiter.result
+    assert status_waiter.result.status_checks == 3
+
+
+def test_status_waiter_timeout():
+    status_waiter = StatusWaiter(
+        target_status={"manager_state": "executing_queue"},
+        timeout=0.0,
+    )
+    assert status_waiter.check(status_json) is None
+    assert not status_waiter.result
+
+
+def test_status_waiter_log_interval(caplog):
+    status_waiter = StatusWaiter(
+        target_status={"manager_state": "executing_queue"},
+        max_status_checks=10,
+        log_interval=60,
+    )
+    with caplog.at_level("INFO"):
+        for _ in range(10):
+            status_waiter.check(status_json)
+    assert len(caplog.records) == 1
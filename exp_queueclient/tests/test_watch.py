@@ -0,0 +1,236 @@
+import asyncio
+import queue
+import threading
+import time as ttime
+
+import pytest
+
+from exp_queueclient import AsyncBlueskyHttpserverSession, BlueskyHttpserverSession
+from exp_queueclient.fake_httpserver import FakeBlueskyHttpserver
+from exp_queueclient.watch import StatusWatcher, status_changes
+
+
+@pytest.fixture
+def fake_httpserver():
+    with FakeBlueskyHttpserver(time_scale=0.1) as fake_httpserver:
+        yield fake_httpserver
+        StatusWatcher.remove_url(fake_httpserver.url)
+
+
+def test_status_changes():
+    previous_status = {"re_state": "idle", "plan_queue_mode": {"loop": False}, "x": 1}
+    status = {"re_state": "running", "plan_queue_mode": {"loop": False}, "y": 2}
+    assert status_changes(previous_status, status) == {
+        "re_state": ("idle", "running"),
+        "x": (1, None),
+        "y": (None, 2),
+    }
+    assert status_changes(previous_status, status, keys=["plan_queue_mode.loop"]) == {}
+    assert status_changes(status, status) == {}
+
+
+def test_status_watcher_subscriptions(fake_httpserver):
+    session = BlueskyHttpserverSession(fake_httpserver.url)
+    status_watcher = session.status_watcher(interval=0.05)
+    assert (
+        BlueskyHttpserverSession(fake_httpserver.url).status_watcher() is status_watcher
+    )
+
+    queue_changes = queue.Queue()
+    callback_changes = []
+    queue_subscription = status_watcher.subscribe(
+        queue=queue_changes, keys=["items_in_queue"]
+    )
+    callback_subscription = status_watcher.subscribe(callback_changes.append)
+    assert status_watcher.wait_for(predicate=lambda status: True, timeout=5)
+
+    session.queue_item_add(item_name="count", item_args=[["det1"]])
+    status_change = queue_changes.get(timeout=5)
+    assert status_change.changes == {"items_in_queue": (0, 1)}
+    assert status_change.status["items_in_queue"] == 1
+    assert status_change.timestamp > 0
+
+    assert status_watcher.wait_for({"items_in_queue": 1}, timeout=5)
+    assert any(
+        "plan_queue_uid" in callback_change for callback_change in callback_changes
+    )
+
+    queue_subscription.cancel()
+    callback_subscription.cancel()
+    session.queue_clear()
+    assert queue_changes.empty()
+
+
+def test_status_watcher_polls_once(fake_httpserver):
+    session = BlueskyHttpserverSession(fake_httpserver.url)
+    status_watcher = StatusWatcher(session, interval=0.1)
+    subscriptions = [status_watcher.subscribe(lambda _: None) for _ in range(20)]
+    wait_results = []
+
+    def wait_for_queue_item():
+        wait_results.append(status_watcher.wait_for({"items_in_queue": 1}, timeout=5))
+
+    waiter_threads = [threading.Thread(target=wait_for_queue_item) for _ in range(10)]
+    for waiter_thread in waiter_threads:
+        waiter_thread.start()
+    status_watcher.wait_for(predicate=lambda status: True, timeout=5)
+    session.queue_item_add(item_name="count", item_args=[["det1"]])
+    for waiter_thread in waiter_threads:
+        waiter_thread.join()
+    assert all(wait_results) and len(wait_results) == 10
+
+    # 30 consumers cost one status request per interval
+    status_request_count = fake_httpserver.request_counts["status"]
+    assert status_request_count < 30
+
+    for subscription in subscriptions:
+        subscription.cancel()
+    # the polling thread stops without consumers
+    deadline = ttime.monotonic() + 5
+    while status_watcher.running and ttime.monotonic() < deadline:
+        ttime.sleep(0.05)
+    assert not status_watcher.running
+
+
+def test_status_watcher_subscriber_failure(fake_httpserver):
+    session = BlueskyHttpserverSession(fake_httpserver.url)
+    status_watcher = StatusWatcher(session, interval=0.05)
+
+    def failing_callback(status_change):
+        raise RuntimeError("subscriber failed")
+
+    queue_changes = queue.Queue()
+    with status_watcher.subscribe(failing_callback, keys=["items_in_queue"]):
+        with status_watcher.subscribe(queue=queue_changes, keys=["items_in_queue"]):
+            status_watcher.wait_for(predicate=lambda status: True, timeout=5)
+            session.queue_item_add(item_name="count", item_args=[["det1"]])
+            assert queue_changes.get(timeout=5)["items_in_queue"] == (0, 1)
+
+    assert not status_watcher.wait_for({"items_in_queue": 5}, timeout=0.2)
+
+
+def test_async_watch(fake_httpserver):
+    async def _test_async_watch():
+        session = AsyncBlueskyHttpserverSession(fake_httpserver.url)
+        try:
+            status_change_stream = session.watch(
+                keys=["items_in_queue", "manager_state"],
+                interval=0.05,
+                include_initial=True,
+            )
+            status_change = await asyncio.wait_for(status_change_stream.__anext__(), 5)
+            assert status_change.changes == {
+                "items_in_queue": (None, 0),
+                "manager_state": (None, "idle"),
+            }
+
+            # a stream opened on the running watcher starts from its latest status
+            async with session.watch(
+                keys=["manager_state"], include_initial=True
+            ) as second_status_change_stream:
+                status_change = await asyncio.wait_for(
+                    second_status_change_stream.__anext__(), 5
+                )
+                assert status_change.changes == {"manager_state": (None, "idle")}
+
+            await session.queue_item_add(item_name="count", item_args=[["det1"]])
+            async for status_change in status_change_stream:
+                assert status_change.changes == {"items_in_queue": (0, 1)}
+                assert status_change.timestamp > 0
+                break
+            await status_change_stream.aclose()
+            assert [status_change async for status_change in status_change_stream] == []
+        finally:
+            await session.aclose()
+
+    asyncio.run(_test_async_watch())
+
+
+def test_async_watch_shared_poller(fake_httpserver):
+    async def _test_async_watch_shared_poller():
+        session = AsyncBlueskyHttpserverSession(fake_httpserver.url)
+
+        async def next_change(keys):
+            async with session.watch(keys=keys, interval=0.05) as status_change_stream:
+                async for status_change in status_change_stream:
+                    return status_change
+
+        try:
+            watch_tasks = [
+                asyncio.create_task(next_change(["items_in_queue"])) for _ in range(20)
+            ]
+            await asyncio.sleep(0.3)
+            await session.queue_item_add(item_name="count", item_args=[["det1"]])
+            status_changes = await asyncio.wait_for(asyncio.gather(*watch_tasks), 5)
+            assert all(
+                status_change["items_in_queue"] == (0, 1)
+                for status_change in status_changes
+            )
+            # 20 consumers cost one status request per interval
+            assert fake_httpserver.request_counts["status"] < 20
+
+            # the polling task stops without consumers
+            status_watcher = session.watch().status_watcher
+            await asyncio.sleep(0.2)
+            assert not status_watcher.running
+        finally:
+            await session.aclose()
+
+    asyncio.run(_test_async_watch_shared_poller())
+
+
+def test_async_watch_coalesces(fake_httpserver):
+    async def _test_async_watch_coalesces():
+        session = AsyncBlueskyHttpserverSession(fake_httpserver.url)
+        try:
+            status_change_stream = session.watch(
+                keys=["items_in_queue", "plan_queue_uid"], interval=0.02
+            )
+            # start the polling task
+            first_change_task = asyncio.create_task(status_change_stream.__anext__())
+            await asyncio.sleep(0.1)
+            await session.queue_item_add(item_name="count", item_args=[["det1"]])
+            first_change = await asyncio.wait_for(first_change_task, 5)
+            assert first_change["items_in_queue"] == (0, 1)
+
+            # a slow consumer gets the latest values, not every intermediate change
+            for _ in range(2):
+                await session.queue_item_add(item_name="count", item_args=[["det1"]])
+                await asyncio.sleep(0.1)
+            status_change = await asyncio.wait_for(status_change_stream.__anext__(), 5)
+            assert status_change["items_in_queue"] == (1, 3)
+            assert status_change_stream.coalesced >= 1
+            await status_change_stream.aclose()
+        finally:
+            await session.aclose()
+
+    asyncio.run(_test_async_watch_coalesces())
+
+
+def test_async_watch_closed_session(fake_httpserver):
+    async def _test_async_watch_closed_session():
+        first_session = AsyncBlueskyHttpserverSession(fake_httpserver.url)
+        async with first_session.watch(interval=0.05) as status_change_stream:
+            status_change_task = asyncio.create_task(status_change_stream.__anext__())
+            await asyncio.sleep(0.1)
+            status_change_task.cancel()
+        await first_session.aclose()
+
+        # the watcher created with the closed session polls with the open one
+        second_session = AsyncBlueskyHttpserverSession(fake_httpserver.url)
+        try:
+            status_change_stream = second_session.watch(
+                keys=["items_in_queue"], interval=0.05
+            )
+            assert status_change_stream.status_watcher.session is second_session
+            status_change_task = asyncio.create_task(status_change_stream.__anext__())
+            await asyncio.sleep(0.1)
+            await second_session.queue_item_add(item_name="count", item_args=[["det1"]])
+            status_change = await asyncio.wait_for(status_change_task, 5)
+            assert status_change["items_in_queue"] == (0, 1)
+            assert status_change_stream.status_watcher.poll_errors == 0
+            await status_change_stream.aclose()
+        finally:
+            await second_session.aclose()
+
+    asyncio.run(_test_async_watch_closed_session())
@@ -0,0 +1,62 @@
+import itertools
+import logging
+
+
+def summarize(value):
+    """Describe a request payload without copying or formatting its content."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{type(value).__name__} of {len(value)} bytes>"
+    if isinstance(value, str):
+        return f"<str of {len(value)} characters>"
+    if isinstance(value, dict):
+        return f"<dict with keys {list(value)[:8]}>"
+    if isinstance(value, (list, tuple)):
+        return f"<{type(value).__name__} of {len(value)} items>"
+    if value is None or isinstance(value, (bool, int, float)):
+        return repr(value)
+    return f"<{type(value).__name__}>"
+
+
+class RequestTracer:
+    """Logs requests and responses at DEBUG level, optionally only one in sample_every.
+
+    Nothing is counted or formatted while DEBUG logging is disabled for the logger.
+
+    Parameters
+    ----------
+    log: logging.Logger
+    sample_every: int
+        trace one request in sample_every requests
+    """
+
+    def __init__(self, log, sample_every=1):
+        self.log = log
+        self.sample_every = sample_every
+        self._request_counter = itertools.count()
+
+    def sampled(self):
+        """Return True if the next request should be traced."""
+        if not self.log.isEnabledFor(logging.DEBUG):
+            return False
+        return (
+            self.sample_every <= 1
+            or next(self._request_counter) % self.sample_every == 0
+        )
+
+    def trace_request(self, method, endpoint_url, request_kwargs):
+        self.log.debug(
+            "%s url: '%s', kwargs: '%s'",
+            method,
+            endpoint_url,
+            ", ".join(
+                f"{key}={summarize(value)}" for key, value in request_kwargs.items()
+            ),
+        )
+
+    def trace_response(self, method, endpoint_response, elapsed):
+        self.log.debug(
+            "%s response: '%s', elapsed time: '%.6f's",
+            method,
+            endpoint_response,
+            elapsed,
+        )
@@ -0,0 +1,198 @@
+import difflib
+
+# parameter kinds of plans/allowed, like inspect.Parameter kinds
+_POSITIONAL_ONLY = 0
+_POSITIONAL_OR_KEYWORD = 1
+_VAR_POSITIONAL = 2
+_KEYWORD_ONLY = 3
+_VAR_KEYWORD = 4
+
+# parameters taking devices, by name or by annotation
+DEVICE_PARAMETER_NAMES = frozenset(
+    {"detector", "detectors", "device", "devices", "motor", "motors"}
+)
+_device_annotation_words = ("Readable", "Movable", "Flyable", "Device")
+
+
+class ItemValidationError(ValueError):
+    """Raised for queue items that local validation rejects, errors lists the reasons."""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _did_you_mean(name, names):
+    close_matches = difflib.get_close_matches(name, names, n=1)
+    return f", did you mean '{close_matches[0]}'?" if close_matches else ""
+
+
+class _PlanSignature:
+    """The parameters of an allowed plan, indexed for argument checks."""
+
+    __slots__ = (
+        "positional_names",
+        "keyword_names",
+        "required_names",
+        "device_names",
+        "var_positional",
+        "var_keyword",
+    )
+
+    def __init__(self, parameters):
+        self.positional_names = []
+        self.keyword_names = set()
+        self.required_names = set()
+        self.device_names = set()
+        self.var_positional = False
+        self.var_keyword = False
+        for parameter in parameters:
+            parameter_name = parameter["name"]
+            parameter_kind = parameter.get("kind", {}).get(
+                "value", _POSITIONAL_OR_KEYWORD
+            )
+            if parameter_kind == _VAR_POSITIONAL:
+                self.var_positional = True
+                continue
+            if parameter_kind == _VAR_KEYWORD:
+                self.var_keyword = True
+                continue
+            if parameter_kind in (_POSITIONAL_ONLY, _POSITIONAL_OR_KEYWORD):
+                self.positional_names.append(parameter_name)
+            if parameter_kind != _POSITIONAL_ONLY:
+                self.keyword_names.add(parameter_name)
+            if "default" not in parameter:
+                self.required_names.add(parameter_name)
+            annotation_type = str((parameter.get("annotation") or {}).get("type", ""))
+            if parameter_name in DEVICE_PARAMETER_NAMES or any(
+                word in annotation_type for word in _device_annotation_words
+            ):
+                self.device_names.add(parameter_name)
+
+
+def _iter_strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for element in value:
+            yield from _iter_strings(element)
+
+
+class ItemValidator:
+    """Checks queue items against the allowed plans and devices without the server.
+
+    A plan item is checked for its plan name, for the number of positional arguments,
+    for keyword argument names, for missing required arguments and for the device
+    names passed to device parameters, those named like "detectors" or annotated as
+    devices. Other item types are not checked. Checks cover common mistakes, not
+    everything the server checks.
+
+    Parameters
+    ----------
+    plans_allowed: dict
+        the plans_allowed member of a plans/allowed response
+    devices_allowed: dict, optional
+        the devices_allowed member of a devices/allowed response, None does not
+        check device names
+    plans_allowed_uid, devices_allowed_uid: str, optional
+        the uids the lists were downloaded with
+    """
+
+    def __init__(
+        self,
+        plans_allowed,
+        devices_allowed=None,
+        plans_allowed_uid=None,
+        devices_allowed_uid=None,
+    ):
+        self.plans_allowed_uid = plans_allowed_uid
+        self.devices_allowed_uid = devices_allowed_uid
+        self._plan_signatures = {
+            plan_name: _PlanSignature(plan.get("parameters", []))
+            for plan_name, plan in plans_allowed.items()
+        }
+        self._device_names = (
+            None if devices_allowed is None else frozenset(devices_allowed)
+        )
+
+    @property
+    def plan_names(self):
+        return set(self._plan_signatures)
+
+    @property
+    def device_names(self):
+        return set(self._device_names or ())
+
+    def validate(self, item):
+        """Return a list of reasons the item is invalid, empty if it is valid."""
+        if not isinstance(item, dict) or "name" not in item:
+            return ["the item name is missing"]
+        if item.get("item_type", "plan") != "plan":
+            return []
+
+        plan_name = item["name"]
+        plan_signature = self._plan_signatures.get(plan_name)
+        if plan_signature is None:
+            return [
+                f"plan '{plan_name}' is not in the list of allowed plans"
+                + _did_you_mean(plan_name, self._plan_signatures)
+            ]
+
+        item_args = item.get("args") or []
+        item_kwargs = item.get("kwargs") or {}
+        if not isinstance(item_args, (list, tuple)):
+            return [f"plan '{plan_name}': args must be a list"]
+        if not isinstance(item_kwargs, dict):
+            return [f"plan '{plan_name}': kwargs must be a dictionary"]
+
+        errors = []
+        positional_names = plan_signature.positional_names
+        if len(item_args) > len(positional_names) and not plan_signature.var_positional:
+            errors.append(
+                f"plan '{plan_name}' takes {len(positional_names)} positional "
+                f"arguments but {len(item_args)} were given"
+            )
+        bound_names = positional_names[: len(item_args)]
+        arguments = dict(zip(bound_names, item_args))
+
+        for kwarg_name, kwarg_value in item_kwargs.items():
+            if kwarg_name in arguments:
+                errors.append(
+                    f"plan '{plan_name}' got multiple values for argument '{kwarg_name}'"
+                )
+            elif (
+                kwarg_name not in plan_signature.keyword_names
+                and not plan_signature.var_keyword
+            ):
+                errors.append(
+                    f"plan '{plan_name}' got an unexpected keyword argument '{kwarg_name}'"
+                    + _did_you_mean(kwarg_name, plan_signature.keyword_names)
+                )
+            arguments[kwarg_name] = kwarg_value
+
+        for required_name in sorted(plan_signature.required_names - set(arguments)):
+            errors.append(
+                f"plan '{plan_name}' is missing the required argument '{required_name}'"
+            )
+
+        if self._device_names is not None:
+            for argument_name in plan_signature.device_names.intersection(arguments):
+                for device_name in _iter_strings(arguments[argument_name]):
+                    # components like "motor.velocity" belong to their device
+                    if device_name.split(".", 1)[0] not in self._device_names:
+                        errors.append(
+                            f"plan '{plan_name}': device '{device_name}' in argument "
+                            f"'{argument_name}' is not in the list of allowed devices"
+                            + _did_you_mean(device_name, self._device_names)
+                        )
+        return errors
+
+    def validate_items(self, items):
+        """Return the list of reasons for every item, in the order of the items."""
+        return [self.validate(item) for item in items]
+
+    def check(self, item):
+        """Raise ItemValidationError if the item is invalid."""
+        errors = self.validate(item)
+        if errors:
+            raise ItemValidationError(errors)
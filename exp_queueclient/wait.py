@@ -0,0 +1,207 @@
+import logging
+import random
+import time as ttime
+
+
+_missing = object()
+
+
+def get_status_value(status, key):
+    """Look up a possibly nested key in a status dictionary.
+
+    Parameters
+    ----------
+    status: dict
+        status response JSON
+    key: str or tuple
+        a top level key, a dotted path like "plan_queue_mode.loop",
+        or a tuple path like ("plan_queue_mode", "loop")
+
+    Returns
+    -------
+        the value, or a sentinel that compares unequal to everything if the key is missing
+    """
+    if isinstance(key, str):
+        if key in status:
+            return status[key]
+        key = key.split(".")
+
+    value = status
+    for key_part in key:
+        try:
+            value = value[key_part]
+        except (KeyError, IndexError, TypeError):
+            return _missing
+    return value
+
+
+def status_matches(status, target_status=None, predicate=None):
+    """Return True if status matches every entry of target_status and the predicate.
+
+    A target value may be a callable taking the status value and returning a bool,
+    for example {"running_item_uid": lambda uid: uid is not None}.
+    """
+    if target_status:
+        for target_status_key, target_status_value in target_status.items():
+            status_value = get_status_value(status, target_status_key)
+            if callable(target_status_value):
+                if status_value is _missing or not target_status_value(status_value):
+                    return False
+            elif status_value is _missing or status_value != target_status_value:
+                return False
+
+    if predicate is not None and not predicate(status):
+        return False
+
+    return True
+
+
+def poll_intervals(
+    initial_interval=0.05, max_interval=1.0, backoff_factor=2.0, jitter=0.1
+):
+    """Generate sleep intervals growing exponentially from initial_interval to max_interval.
+
+    Each interval is randomly stretched or shrunk by up to the jitter fraction so that
+    many clients polling the same server do not synchronize.
+    """
+    interval = initial_interval
+    while True:
+        yield interval * (1.0 + random.uniform(-jitter, jitter))
+        interval = min(interval * backoff_factor, max_interval)
+
+
+class WaitResult:
+    """Outcome of a wait_for_status call, truthy if the target status was reached."""
+
+    def __init__(self, success, status, status_checks, elapsed):
+        self.success = success
+        self.status = status
+        self.status_checks = status_checks
+        self.elapsed = elapsed
+
+    def __bool__(self):
+        return self.success
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(success={self.success}, "
+            f"status_checks={self.status_checks}, elapsed={self.elapsed:.3f})"
+        )
+
+
+class StatusWaiter:
+    """Deadline based polling state shared by the synchronous and asyncio sessions.
+
+    The caller fetches a status, passes it to check() and sleeps for the returned
+    number of seconds, until check() returns None:
+
+        status_waiter = StatusWaiter(target_status={"re_state": "idle"}, timeout=10)
+        while True:
+            delay = status_waiter.check(session.status().json())
+            if delay is None:
+                break
+            ttime.sleep(delay)
+        wait_result = status_waiter.result
+
+    Parameters
+    ----------
+    target_status: dict, optional
+        status keys (possibly nested) mapped to expected values or to callables
+    predicate: callable, optional
+        takes the status dict and returns True when the wait is over
+    timeout: float, optional
+        wall-clock seconds before giving up, 3 seconds if neither timeout nor
+        max_status_checks is given
+    max_status_checks: int, optional
+        give up after this many status checks
+    initial_interval, max_interval: float
+        first and largest sleep between status checks
+    log_interval: float or None
+        log a status mismatch at most once every log_interval seconds, None disables it
+    log: logging.Logger, optional
+    """
+
+    backoff_factor = 2.0
+    jitter = 0.1
+
+    def __init__(
+        self,
+        target_status=None,
+        predicate=None,
+        timeout=None,
+        max_status_checks=None,
+        initial_interval=0.05,
+        max_interval=1.0,
+        log_interval=5.0,
+        log=None,
+    ):
+        if timeout is None and max_status_checks is None:
+            timeout = 3.0
+
+        self.target_status = target_status
+        self.predicate = predicate
+        self.max_status_checks = max_status_checks
+        self.log_interval = log_interval
+        self.log = log if log is not None else logging.getLogger(__name__)
+
+        self._start_time = ttime.monotonic()
+        self._deadline = None if timeout is None else self._start_time + timeout
+        self._poll_intervals = poll_intervals(
+            initial_interval=initial_interval,
+            max_interval=max_interval,
+            backoff_factor=self.backoff_factor,
+            jitter=self.jitter,
+        )
+        self._last_log_time = None
+        self._status_checks = 0
+        self.result = None
+
+    def check(self, status):
+        """Record a status check.
+
+        Returns
+        -------
+            seconds to sleep before the next status check, or None if the wait is over
+        """
+        self._status_checks += 1
+        now = ttime.monotonic()
+
+        if status_matches(status, self.target_status, self.predicate):
+            self._finish(True, status, now)
+            return None
+
+        if self.log_interval is not None and (
+            self._last_log_time is None
+            or now - self._last_log_time >= self.log_interval
+        ):
+            self._last_log_time = now
+            self.log.info(
+                "status check %d: status %s does not match target status %s",
+                self._status_checks,
+                status,
+                self.target_status,
+            )
+
+        if (
+            self.max_status_checks is not None
+            and self._status_checks >= self.max_status_checks
+        ):
+            self._finish(False, status, now)
+            return None
+
+        delay = next(self._poll_intervals)
+        if self._deadline is not None:
+            remaining = self._deadline - now
+            if remaining <= 0:
+                self._finish(False, status, now)
+                return None
+            delay = min(delay, remaining)
+        return delay
+
+    def _finish(self, success, status, now):
+        self.result = WaitResult(
+            success=success,
+            status=status,
+            status_checks=self._status_checks,
+            elapsed=now - self._start_time,
+        )
@@ -0,0 +1,484 @@
+import asyncio
+import logging
+import threading
+import time as ttime
+import weakref
+
+from .wait import WaitResult, _missing, get_status_value, status_matches
+
+
+def status_changes(previous_status, status, keys=None):
+    """Return {key: (previous value, value)} for the status keys whose values differ.
+
+    Parameters
+    ----------
+    previous_status, status: dict
+        status response JSON
+    keys: iterable, optional
+        keys to compare, possibly nested like "plan_queue_mode.loop", by default all
+        top level keys. Missing values are reported as None.
+    """
+    if keys is None:
+        keys = status.keys() | previous_status.keys()
+    changes = {}
+    for key in keys:
+        previous_value = get_status_value(previous_status, key)
+        value = get_status_value(status, key)
+        if previous_value is _missing and value is _missing:
+            continue
+        if previous_value is _missing or value is _missing or previous_value != value:
+            changes[key] = (
+                None if previous_value is _missing else previous_value,
+                None if value is _missing else value,
+            )
+    return changes
+
+
+class StatusChange:
+    """Status values that changed between two polls.
+
+    Attributes
+    ----------
+    changes: dict
+        status keys mapped to (previous value, value)
+    status: dict
+        the status response JSON with the changes
+    timestamp: float
+        time.time() the status was received
+    """
+
+    __slots__ = ("changes", "status", "timestamp")
+
+    def __init__(self, changes, status, timestamp):
+        self.changes = changes
+        self.status = status
+        self.timestamp = timestamp
+
+    def __contains__(self, key):
+        return key in self.changes
+
+    def __getitem__(self, key):
+        return self.changes[key]
+
+    def __iter__(self):
+        return iter(self.changes)
+
+    def __len__(self):
+        return len(self.changes)
+
+    def __repr__(self):
+        changes_repr = ", ".join(
+            f"{key}: {previous_value!r} -> {value!r}"
+            for key, (previous_value, value) in self.changes.items()
+        )
+        return f"{self.__class__.__name__}({changes_repr})"
+
+
+class StatusSubscription:
+    """A callback or queue receiving StatusChange events from a StatusWatcher."""
+
+    def __init__(self, status_watcher, keys=None, callback=None, queue=None):
+        self.status_watcher = status_watcher
+        self.keys = None if keys is None else tuple(keys)
+        self.callback = callback
+        self.queue = queue
+
+    def cancel(self):
+        """Stop receiving changes."""
+        self.status_watcher.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cancel()
+        return False
+
+
+class StatusWatcher:
+    """Polls the status of a server in one background thread and reports what changed.
+
+    Consecutive status responses are compared and every subscription whose keys
+    changed receives a StatusChange, passed to its callback or put on its queue:
+
+        status_watcher = session.status_watcher()
+        status_watcher.subscribe(print, keys=["re_state", "items_in_queue"])
+        change_queue = queue.Queue()
+        status_watcher.subscribe(queue=change_queue, keys=["running_item_uid"])
+
+    Callbacks are called in the polling thread and should return quickly. The thread
+    runs while there are subscriptions or wait_for() calls, however many there are.
+    for_session() returns the watcher shared by all sessions of a process that use
+    the same server, so they poll the server once.
+
+    Parameters
+    ----------
+    session: BlueskyHttpserverSession
+    interval: float
+        seconds between status requests
+    """
+
+    _shared_watchers = {}
+    _shared_watchers_lock = threading.Lock()
+
+    def __init__(self, session, interval=1.0):
+        self.session = session
+        self.interval = interval
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._status_changed = threading.Condition(threading.Lock())
+        self._subscriptions = []
+        self._waiter_count = 0
+        self._poll_thread = None
+        self._status = None
+        self._poll_count = 0
+        self.poll_errors = 0
+
+    @classmethod
+    def for_session(cls, session, **kwargs):
+        """Return the process-wide watcher of the server of session, creating it if needed.
+
+        The watcher polls with the session it was created with, the kwargs are ignored
+        if the watcher already exists.
+        """
+        bluesky_httpserver_url = session._bluesky_httpserver_url
+        with cls._shared_watchers_lock:
+            status_watcher = cls._shared_watchers.get(bluesky_httpserver_url)
+            if status_watcher is None:
+                status_watcher = cls._shared_watchers[bluesky_httpserver_url] = cls(
+                    session, **kwargs
+                )
+            return status_watcher
+
+    @classmethod
+    def remove_url(cls, bluesky_httpserver_url):
+        """Forget the process-wide watcher of a server."""
+        with cls._shared_watchers_lock:
+            cls._shared_watchers.pop(bluesky_httpserver_url, None)
+
+    @property
+    def status(self):
+        """The most recent status response JSON, None before the first poll."""
+        return self._status
+
+    @property
+    def running(self):
+        return self._poll_thread is not None
+
+    def subscribe(self, callback=None, keys=None, queue=None):
+        """Report status changes to a callback taking a StatusChange or to a queue.
+
+        Parameters
+        ----------
+        callback: callable, optional
+        keys: iterable, optional
+            status keys to watch, possibly nested like "plan_queue_mode.loop", by
+            default all top level keys
+        queue: object with a put() method, optional
+            for example a queue.Queue
+
+        Returns
+        -------
+            StatusSubscription, cancel() it to stop receiving changes
+        """
+        if callback is None and queue is None:
+            raise ValueError("a callback or a queue must be specified")
+        subscription = StatusSubscription(
+            self, keys=keys, callback=callback, queue=queue
+        )
+        with self._status_changed:
+            self._subscriptions = self._subscriptions + [subscription]
+            self._start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._status_changed:
+            self._subscriptions = [
+                other for other in self._subscriptions if other is not subscription
+            ]
+
+    def wait_for(self, target_status=None, predicate=None, timeout=3.0):
+        """Wait for a status polled from now on to match, like session.wait_for_status().
+
+        Returns
+        -------
+            WaitResult
+        """
+        start_time = ttime.monotonic()
+        deadline = None if timeout is None else start_time + timeout
+        status_checks = 0
+        status = None
+        with self._status_changed:
+            self._waiter_count += 1
+            self._start()
+            try:
+                poll_count = self._poll_count
+                while True:
+                    remaining = (
+                        None if deadline is None else deadline - ttime.monotonic()
+                    )
+                    if remaining is not None and remaining <= 0:
+                        success = False
+                        break
+                    self._status_changed.wait_for(
+                        lambda: self._poll_count > poll_count, remaining
+                    )
+                    if self._poll_count == poll_count:
+                        continue
+                    poll_count = self._poll_count
+                    status = self._status
+                    status_checks += 1
+                    if status_matches(status, target_status, predicate):
+                        success = True
+                        break
+            finally:
+                self._waiter_count -= 1
+        return WaitResult(
+            success=success,
+            status=status,
+            status_checks=status_checks,
+            elapsed=ttime.monotonic() - start_time,
+        )
+
+    def _start(self):
+        # called with the lock held
+        if self._poll_thread is None:
+            self._poll_thread = threading.Thread(
+                target=self._poll, name=self.__class__.__name__, daemon=True
+            )
+            self._poll_thread.start()
+
+    def _poll(self):
+        while True:
+            with self._status_changed:
+                if not self._subscriptions and self._waiter_count == 0:
+                    self._poll_thread = None
+                    return
+            try:
+                status = self.session.status().json()
+            except Exception:
+                self.poll_errors += 1
+                self._log.warning("status request failed", exc_info=True)
+            else:
+                self._update(status, ttime.time())
+            ttime.sleep(self.interval)
+
+    def _update(self, status, timestamp):
+        with self._status_changed:
+            previous_status = self._status
+            self._status = status
+            self._poll_count += 1
+            self._status_changed.notify_all()
+            subscriptions = self._subscriptions
+        if previous_status is None:
+            return
+        changes = status_changes(previous_status, status)
+        if not changes:
+            return
+
+        for subscription in subscriptions:
+            if subscription.keys is None:
+                subscription_changes = changes
+            else:
+                subscription_changes = status_changes(
+                    previous_status, status, subscription.keys
+                )
+                if not subscription_changes:
+                    continue
+            status_change = StatusChange(subscription_changes, status, timestamp)
+            try:
+                if subscription.callback is not None:
+                    subscription.callback(status_change)
+                if subscription.queue is not None:
+                    subscription.queue.put(status_change)
+            except Exception:
+                self._log.exception("status change subscriber failed")
+
+
+class StatusChangeStream:
+    """Async iterator over the status changes of an AsyncStatusWatcher.
+
+    Changes are merged until the consumer asks for them, so a slow consumer gets one
+    StatusChange with each key's value before the merged polls and its latest value
+    rather than a growing backlog. Keys changed back and forth in between are dropped.
+    Iteration ends after aclose(), which the async context manager calls, and
+    cancelling the consuming task or dropping the stream also stops it.
+    """
+
+    def __init__(self, status_watcher, keys=None, include_initial=False):
+        self.status_watcher = status_watcher
+        self.keys = None if keys is None else tuple(keys)
+        self._changes = {}
+        self._status = None
+        self._timestamp = None
+        self._changes_pending = asyncio.Event()
+        self._closed = False
+        # polls merged into changes the consumer had not taken yet
+        self.coalesced = 0
+        # report the first status _add() gets as changed from None
+        self._include_initial = include_initial
+        if include_initial and status_watcher.status is not None:
+            self._add(
+                status_watcher.status, status_watcher.timestamp, status_watcher.status
+            )
+
+    def _add(self, status, timestamp, previous_status):
+        if self._include_initial:
+            previous_status = {}
+            self._include_initial = False
+        changes = status_changes(previous_status, status, self.keys)
+        if not changes:
+            return
+        if self._changes:
+            self.coalesced += 1
+        for key, (previous_value, value) in changes.items():
+            pending_change = self._changes.get(key)
+            if pending_change is None:
+                self._changes[key] = (previous_value, value)
+            elif pending_change[0] == value:
+                del self._changes[key]
+            else:
+                self._changes[key] = (pending_change[0], value)
+        self._status = status
+        self._timestamp = timestamp
+        if self._changes:
+            self._changes_pending.set()
+        else:
+            self._changes_pending.clear()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._closed:
+            raise StopAsyncIteration
+        self.status_watcher._start()
+        while not self._changes:
+            self._changes_pending.clear()
+            await self._changes_pending.wait()
+            if self._closed:
+                raise StopAsyncIteration
+        changes, self._changes = self._changes, {}
+        return StatusChange(changes, self._status, self._timestamp)
+
+    async def aclose(self):
+        self._closed = True
+        self.status_watcher._remove(self)
+        self._changes_pending.set()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+        return False
+
+
+class AsyncStatusWatcher:
+    """Polls the status of a server in one task and streams what changed to consumers.
+
+        async for status_change in session.watch(keys=["re_state", "items_in_queue"]):
+            print(status_change.timestamp, status_change.changes)
+
+    The polling task runs while there are StatusChangeStreams, for_session() returns
+    the watcher shared by all sessions of the event loop that use the same server. It
+    polls with any of those sessions that is not closed.
+
+    Parameters
+    ----------
+    session: AsyncBlueskyHttpserverSession
+    interval: float
+        seconds between status requests
+    """
+
+    # event loop -> {url: watcher}
+    _shared_watchers = weakref.WeakKeyDictionary()
+
+    def __init__(self, session, interval=1.0):
+        self.interval = interval
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._sessions = weakref.WeakSet([session])
+        # streams dropped by their consumers disappear from the set
+        self._streams = weakref.WeakSet()
+        self._poll_task = None
+        self.status = None
+        self.timestamp = None
+        self.poll_errors = 0
+
+    @classmethod
+    def for_session(cls, session, **kwargs):
+        """Return the watcher of the server of session for the running event loop.
+
+        The kwargs are ignored if the watcher already exists.
+        """
+        loop_watchers = cls._shared_watchers.setdefault(asyncio.get_running_loop(), {})
+        bluesky_httpserver_url = session._bluesky_httpserver_url
+        status_watcher = loop_watchers.get(bluesky_httpserver_url)
+        if status_watcher is None:
+            status_watcher = loop_watchers[bluesky_httpserver_url] = cls(
+                session, **kwargs
+            )
+        else:
+            status_watcher._sessions.add(session)
+        return status_watcher
+
+    @property
+    def session(self):
+        """A session of the watcher that is not closed, None if they all are."""
+        for session in list(self._sessions):
+            if not session.closed:
+                return session
+        return None
+
+    @property
+    def running(self):
+        return self._poll_task is not None
+
+    def watch(self, keys=None, include_initial=False):
+        """Return a StatusChangeStream of the changes of keys.
+
+        Parameters
+        ----------
+        keys: iterable, optional
+            status keys to watch, possibly nested like "plan_queue_mode.loop", by
+            default all top level keys
+        include_initial: bool
+            if True the first change reports the current values of the keys, changed
+            from None
+        """
+        status_change_stream = StatusChangeStream(
+            self, keys=keys, include_initial=include_initial
+        )
+        self._streams.add(status_change_stream)
+        return status_change_stream
+
+    def _remove(self, status_change_stream):
+        self._streams.discard(status_change_stream)
+
+    def _start(self):
+        if self._poll_task is None and self._streams:
+            self._poll_task = asyncio.get_running_loop().create_task(self._poll())
+
+    async def _poll(self):
+        try:
+            while self._streams:
+                try:
+                    session = self.session
+                    if session is None:
+                        raise RuntimeError("all sessions of the watcher are closed")
+                    status_response = await session.status()
+                    status = status_response.json()
+                except Exception:
+                    self.poll_errors += 1
+                    self._log.warning("status request failed", exc_info=True)
+                else:
+                    previous_status, self.status = self.status, status
+                    self.timestamp = ttime.time()
+                    for status_change_stream in list(self._streams):
+                        status_change_stream._add(
+                            status,
+                            self.timestamp,
+                            status if previous_status is None else previous_status,
+                        )
+                await asyncio.sleep(self.interval)
+        finally:
+            self._poll_task = None